@@ -0,0 +1,624 @@
+import hmac
+import json
+import os
+from datetime import date, datetime
+from psycopg2.extras import RealDictCursor
+
+import batch
+import db
+import dispatch
+import partitions
+import search
+import tracing
+from catalog_cache import cache as catalog_cache, load_table
+from export import EXPORT_FORMATS, decode_cursor, export_bookings, export_response
+from responses import compressed, etag_response, success_response, error_response
+from tokens import get_user_from_token
+
+STATS_GRANULARITIES = ('day', 'week', 'month')
+TIMER_EVENT_TYPE = 'yandex.cloud.events.serverless.triggers.TimerMessage'
+
+
+def is_timer_event(event: dict) -> bool:
+    """Сообщение триггера-таймера; если задан PARTITIONS_TIMER_SECRET, он должен прийти в payload таймера"""
+    
+    if event.get('httpMethod'):
+        return False
+    
+    messages = event.get('messages')
+    if not isinstance(messages, list) or not messages:
+        return False
+    
+    for message in messages:
+        if not isinstance(message, dict) or (message.get('event_metadata') or {}).get('event_type') != TIMER_EVENT_TYPE:
+            return False
+    
+    secret = os.environ.get('PARTITIONS_TIMER_SECRET')
+    if secret:
+        payload = (messages[0].get('details') or {}).get('payload') or ''
+        return hmac.compare_digest(str(payload).encode('utf-8'), secret.encode('utf-8'))
+    
+    return True
+
+
+@tracing.traced('admin')
+@compressed
+def handler(event: dict, context) -> dict:
+    """API для административной панели управления трансфером"""
+    
+    method = event.get('httpMethod', 'GET')
+    
+    try:
+        # Вызов по таймеру только обслуживает секции bookings; прочие события без httpMethod требуют токен
+        timer = is_timer_event(event)
+        user = None if timer else get_user_from_token(event)
+        
+        if not timer and (not user or user['role'] != 'admin'):
+            return error_response('Admin access required', 403)
+        
+        db_url = os.environ.get('DATABASE_URL')
+        schema = os.environ.get('MAIN_DB_SCHEMA', 'public')
+        
+        if not db_url:
+            return error_response('Database configuration error', 500)
+        
+        conn = db.acquire(db_url)
+        
+        if timer:
+            return maintain_partitions(conn, schema)
+        
+        query_params = event.get('queryStringParameters', {}) or {}
+        path_params = event.get('pathParams', {}) or {}
+        resource = query_params.get('resource', path_params.get('resource', ''))
+        item_id = query_params.get('id', path_params.get('id'))
+        
+        if resource == 'tariffs':
+            return handle_tariffs(conn, schema, method, item_id, event)
+        elif resource == 'vehicles':
+            return handle_vehicles(conn, schema, method, item_id, event)
+        elif resource == 'advertisements':
+            return handle_advertisements(conn, schema, method, item_id, event)
+        elif resource == 'bookings':
+            return handle_bookings(conn, schema, method, event)
+        elif resource == 'batch':
+            return handle_batch(conn, schema, method, event)
+        elif resource == 'dispatch':
+            return handle_dispatch(conn, schema, method, event)
+        elif resource == 'stats':
+            return get_statistics(conn, schema, event)
+        elif resource == 'cache':
+            return success_response({'catalog_cache': catalog_cache.stats(), 'db_pool': db.get_pool(db_url).stats()})
+        elif resource == 'ratelimits':
+            return get_rate_limits(conn, schema, event)
+        elif resource == 'partitions':
+            return handle_partitions(conn, schema, method, event)
+        else:
+            return error_response('Unknown resource', 400)
+    
+    except Exception as e:
+        return error_response(f'Server error: {str(e)}', 500)
+    finally:
+        if 'conn' in locals():
+            db.release(conn)
+
+
+def handle_tariffs(conn, schema: str, method: str, item_id: str, event: dict) -> dict:
+    """Управление тарифами"""
+    
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    
+    try:
+        if method == 'GET':
+            tariffs = catalog_cache.get(conn, schema, 'tariffs', ('tariffs',), load_table('tariffs', 'created_at DESC'))
+            etag = catalog_cache.etag(schema, 'tariffs', f'-{item_id}' if item_id else '')
+            if item_id:
+                tariff = next((t for t in tariffs if str(t['id']) == str(item_id)), None)
+                if not tariff:
+                    return error_response('Tariff not found', 404)
+                return etag_response(tariff, event, etag)
+            else:
+                return etag_response({'tariffs': tariffs}, event, etag)
+        
+        elif method == 'POST':
+            data = json.loads(event.get('body', '{}'))
+            cursor.execute(f'''
+                INSERT INTO {schema}.tariffs 
+                (name, category, description, base_price, price_per_km, max_passengers, features, is_active)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+            ''', (
+                data['name'], data['category'], data.get('description'),
+                data['base_price'], data.get('price_per_km'), data['max_passengers'],
+                data.get('features', []), data.get('is_active', True)
+            ))
+            result = cursor.fetchone()
+            conn.commit()
+            catalog_cache.invalidate('tariffs')
+            return success_response({'id': result['id'], 'message': 'Tariff created'})
+        
+        elif method == 'PUT' and item_id:
+            data = json.loads(event.get('body', '{}'))
+            
+            update_fields = []
+            values = []
+            
+            for field in ['name', 'category', 'description', 'base_price', 'price_per_km', 'max_passengers', 'features', 'is_active']:
+                if field in data:
+                    update_fields.append(f'{field} = %s')
+                    values.append(data[field])
+            
+            if not update_fields:
+                return error_response('No fields to update', 400)
+            
+            values.append(item_id)
+            
+            cursor.execute(f'''
+                UPDATE {schema}.tariffs
+                SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+                RETURNING id
+            ''', values)
+            
+            result = cursor.fetchone()
+            conn.commit()
+            catalog_cache.invalidate('tariffs')
+            
+            if not result:
+                return error_response('Tariff not found', 404)
+            
+            return success_response({'message': 'Tariff updated'})
+        
+        elif method == 'DELETE' and item_id:
+            cursor.execute(f'DELETE FROM {schema}.tariffs WHERE id = %s RETURNING id', (item_id,))
+            result = cursor.fetchone()
+            conn.commit()
+            catalog_cache.invalidate('tariffs')
+            
+            if not result:
+                return error_response('Tariff not found', 404)
+            
+            return success_response({'message': 'Tariff deleted'})
+        
+        else:
+            return error_response('Method not allowed', 405)
+    
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Operation failed: {str(e)}', 500)
+
+
+def handle_vehicles(conn, schema: str, method: str, item_id: str, event: dict) -> dict:
+    """Управление автопарком"""
+    
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    
+    try:
+        if method == 'GET':
+            vehicles = catalog_cache.get(conn, schema, 'vehicles', ('vehicles',), load_table('vehicles', 'created_at DESC'))
+            etag = catalog_cache.etag(schema, 'vehicles', f'-{item_id}' if item_id else '')
+            if item_id:
+                vehicle = next((v for v in vehicles if str(v['id']) == str(item_id)), None)
+                if not vehicle:
+                    return error_response('Vehicle not found', 404)
+                return etag_response(vehicle, event, etag)
+            else:
+                return etag_response({'vehicles': vehicles}, event, etag)
+        
+        elif method == 'POST':
+            data = json.loads(event.get('body', '{}'))
+            cursor.execute(f'''
+                INSERT INTO {schema}.vehicles 
+                (name, model, category, seats, image_url, features, is_active)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+            ''', (
+                data['name'], data['model'], data['category'], data['seats'],
+                data.get('image_url'), data.get('features', []), data.get('is_active', True)
+            ))
+            result = cursor.fetchone()
+            conn.commit()
+            catalog_cache.invalidate('vehicles')
+            return success_response({'id': result['id'], 'message': 'Vehicle added'})
+        
+        elif method == 'PUT' and item_id:
+            data = json.loads(event.get('body', '{}'))
+            
+            update_fields = []
+            values = []
+            
+            for field in ['name', 'model', 'category', 'seats', 'image_url', 'features', 'is_active']:
+                if field in data:
+                    update_fields.append(f'{field} = %s')
+                    values.append(data[field])
+            
+            if not update_fields:
+                return error_response('No fields to update', 400)
+            
+            values.append(item_id)
+            
+            cursor.execute(f'''
+                UPDATE {schema}.vehicles
+                SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+                RETURNING id
+            ''', values)
+            
+            result = cursor.fetchone()
+            conn.commit()
+            catalog_cache.invalidate('vehicles')
+            
+            if not result:
+                return error_response('Vehicle not found', 404)
+            
+            return success_response({'message': 'Vehicle updated'})
+        
+        elif method == 'DELETE' and item_id:
+            cursor.execute(f'DELETE FROM {schema}.vehicles WHERE id = %s RETURNING id', (item_id,))
+            result = cursor.fetchone()
+            conn.commit()
+            catalog_cache.invalidate('vehicles')
+            
+            if not result:
+                return error_response('Vehicle not found', 404)
+            
+            return success_response({'message': 'Vehicle deleted'})
+        
+        else:
+            return error_response('Method not allowed', 405)
+    
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Operation failed: {str(e)}', 500)
+
+
+def handle_advertisements(conn, schema: str, method: str, item_id: str, event: dict) -> dict:
+    """Управление рекламными блоками"""
+    
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    
+    try:
+        if method == 'GET':
+            ads = catalog_cache.get(conn, schema, 'advertisements', ('advertisements',), load_table('advertisements', 'display_order, created_at DESC'))
+            etag = catalog_cache.etag(schema, 'advertisements', f'-{item_id}' if item_id else '')
+            if item_id:
+                ad = next((a for a in ads if str(a['id']) == str(item_id)), None)
+                if not ad:
+                    return error_response('Advertisement not found', 404)
+                return etag_response(ad, event, etag)
+            else:
+                return etag_response({'advertisements': ads}, event, etag)
+        
+        elif method == 'POST':
+            data = json.loads(event.get('body', '{}'))
+            cursor.execute(f'''
+                INSERT INTO {schema}.advertisements 
+                (title, content, image_url, link_url, position, is_active, display_order)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+            ''', (
+                data['title'], data.get('content'), data.get('image_url'),
+                data.get('link_url'), data.get('position'), 
+                data.get('is_active', True), data.get('display_order', 0)
+            ))
+            result = cursor.fetchone()
+            conn.commit()
+            catalog_cache.invalidate('advertisements')
+            return success_response({'id': result['id'], 'message': 'Advertisement created'})
+        
+        elif method == 'PUT' and item_id:
+            data = json.loads(event.get('body', '{}'))
+            
+            update_fields = []
+            values = []
+            
+            for field in ['title', 'content', 'image_url', 'link_url', 'position', 'is_active', 'display_order']:
+                if field in data:
+                    update_fields.append(f'{field} = %s')
+                    values.append(data[field])
+            
+            if not update_fields:
+                return error_response('No fields to update', 400)
+            
+            values.append(item_id)
+            
+            cursor.execute(f'''
+                UPDATE {schema}.advertisements
+                SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+                RETURNING id
+            ''', values)
+            
+            result = cursor.fetchone()
+            conn.commit()
+            catalog_cache.invalidate('advertisements')
+            
+            if not result:
+                return error_response('Advertisement not found', 404)
+            
+            return success_response({'message': 'Advertisement updated'})
+        
+        elif method == 'DELETE' and item_id:
+            cursor.execute(f'DELETE FROM {schema}.advertisements WHERE id = %s RETURNING id', (item_id,))
+            result = cursor.fetchone()
+            conn.commit()
+            catalog_cache.invalidate('advertisements')
+            
+            if not result:
+                return error_response('Advertisement not found', 404)
+            
+            return success_response({'message': 'Advertisement deleted'})
+        
+        else:
+            return error_response('Method not allowed', 405)
+    
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Operation failed: {str(e)}', 500)
+
+
+def handle_bookings(conn, schema: str, method: str, event: dict) -> dict:
+    """Поиск заявок для диспетчерской (?q=) и выгрузка для бухгалтерии (?format=)"""
+    
+    if method != 'GET':
+        return error_response('Method not allowed', 405)
+    
+    query_params = event.get('queryStringParameters', {}) or {}
+    
+    if 'q' in query_params:
+        return search_bookings(conn, schema, query_params)
+    
+    export_format = query_params.get('format', '')
+    
+    if export_format not in EXPORT_FORMATS:
+        return error_response('Unsupported format, expected csv or ndjson', 400)
+    
+    after = None
+    if query_params.get('cursor'):
+        after = decode_cursor(query_params['cursor'])
+        if not after:
+            return error_response('Invalid cursor', 400)
+    
+    try:
+        body, rows, next_cursor = export_bookings(conn, schema, export_format,
+                                                  query_params.get('from'), query_params.get('to'), after)
+        return export_response(body, rows, export_format, next_cursor)
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Export failed: {str(e)}', 500)
+
+
+def search_bookings(conn, schema: str, query_params: dict) -> dict:
+    """Ранжированный поиск по имени, телефону, email и маршруту с пагинацией limit/offset"""
+    
+    q = search.normalize_query(query_params.get('q') or '')
+    
+    if len(q) < search.MIN_QUERY_LENGTH:
+        return error_response(f'Query must be at least {search.MIN_QUERY_LENGTH} characters', 400)
+    
+    try:
+        limit = min(max(int(query_params.get('limit', search.DEFAULT_LIMIT)), 1), search.MAX_LIMIT)
+        offset = max(int(query_params.get('offset', 0)), 0)
+    except ValueError:
+        return error_response('Invalid limit or offset', 400)
+    
+    try:
+        return success_response(search.search_bookings(conn, schema, q, limit, offset))
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Search failed: {str(e)}', 500)
+
+
+def get_rate_limits(conn, schema: str, event: dict) -> dict:
+    """Счётчики ограничения частоты: итоги по правилам и ключи с наибольшим числом отказов"""
+    
+    query_params = event.get('queryStringParameters', {}) or {}
+    
+    try:
+        limit = min(max(int(query_params.get('limit', 50)), 1), 500)
+    except ValueError:
+        return error_response('Invalid limit', 400)
+    
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cursor.execute(f'''
+            SELECT split_part(key, ':', 1) as rule, COUNT(*) as keys,
+                   SUM(allowed) as allowed, SUM(rejected) as rejected,
+                   COUNT(*) FILTER (WHERE NOT last_allowed) as limited_now
+            FROM {schema}.rate_limits
+            GROUP BY 1
+            ORDER BY 1
+        ''')
+        rules = cursor.fetchall()
+        
+        cursor.execute(f'''
+            SELECT key, allowed, rejected, last_allowed, tokens, capacity, updated_at
+            FROM {schema}.rate_limits
+            WHERE rejected > 0
+            ORDER BY rejected DESC, updated_at DESC
+            LIMIT %s
+        ''', (limit,))
+        top_keys = cursor.fetchall()
+        
+        return success_response({
+            'rules': [{**r, 'allowed': int(r['allowed']), 'rejected': int(r['rejected'])} for r in rules],
+            'top_rejected': [{**k, 'updated_at': k['updated_at'].isoformat()} for k in top_keys]
+        })
+    except Exception as e:
+        return error_response(f'Failed to fetch rate limits: {str(e)}', 500)
+
+
+def handle_partitions(conn, schema: str, method: str, event: dict) -> dict:
+    """Секции bookings: список (GET) и обслуживание — создание наперёд и архив старых (POST)"""
+    
+    try:
+        if method == 'GET':
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            result = partitions.status(cursor, schema)
+            cursor.close()
+            conn.commit()
+            return success_response(result)
+        
+        elif method == 'POST':
+            data = json.loads(event.get('body') or '{}')
+            
+            try:
+                ahead = int(data.get('ahead', partitions.AHEAD_MONTHS))
+                retain = int(data.get('retain', partitions.RETAIN_MONTHS))
+            except (TypeError, ValueError):
+                return error_response('ahead and retain must be integers', 400)
+            
+            if ahead < 0 or retain < 0:
+                return error_response('ahead and retain must not be negative', 400)
+            
+            return success_response(partitions.maintain(conn, schema, ahead, retain))
+        
+        else:
+            return error_response('Method not allowed', 405)
+    
+    except json.JSONDecodeError:
+        return error_response('Invalid JSON body', 400)
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Partition maintenance failed: {str(e)}', 500)
+
+
+def maintain_partitions(conn, schema: str) -> dict:
+    """Обслуживание секций по таймеру: глубина и срок хранения только из окружения"""
+    
+    try:
+        return success_response(partitions.maintain(conn, schema))
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Partition maintenance failed: {str(e)}', 500)
+
+
+def handle_batch(conn, schema: str, method: str, event: dict) -> dict:
+    """Пакет операций над заявками, тарифами и автомобилями в одной транзакции"""
+    
+    if method != 'POST':
+        return error_response('Method not allowed', 405)
+    
+    data = json.loads(event.get('body') or '{}')
+    operations = data.get('operations')
+    
+    if not isinstance(operations, list) or not operations:
+        return error_response('Field operations must be a non-empty array', 400)
+    
+    if len(operations) > batch.MAX_OPERATIONS:
+        return error_response(f'At most {batch.MAX_OPERATIONS} operations per batch', 400)
+    
+    try:
+        result = batch.apply(conn, schema, operations)
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Batch failed: {str(e)}', 500)
+    
+    for table in result.pop('touched'):
+        catalog_cache.invalidate(table)
+    
+    return success_response(result)
+
+
+def handle_dispatch(conn, schema: str, method: str, event: dict) -> dict:
+    """Автоматическое назначение машин на подтверждённые заявки дня"""
+    
+    if method != 'POST':
+        return error_response('Method not allowed', 405)
+    
+    query_params = event.get('queryStringParameters', {}) or {}
+    data = json.loads(event.get('body') or '{}')
+    day = data.get('date', query_params.get('date'))
+    
+    if not day:
+        return error_response('Parameter date is required', 400)
+    
+    try:
+        day = datetime.strptime(day, '%Y-%m-%d').date()
+    except ValueError:
+        return error_response('Invalid date, expected YYYY-MM-DD', 400)
+    
+    try:
+        return success_response(dispatch.auto_assign(conn, schema, day))
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Dispatch failed: {str(e)}', 500)
+
+
+def get_statistics(conn, schema: str, event: dict) -> dict:
+    """Получение статистики для админки из дневных агрегатов"""
+    
+    query_params = event.get('queryStringParameters', {}) or {}
+    date_from = query_params.get('from')
+    date_to = query_params.get('to')
+    granularity = query_params.get('granularity', 'day')
+    
+    if granularity not in STATS_GRANULARITIES:
+        return error_response('Invalid granularity', 400)
+    
+    try:
+        date_from = date.fromisoformat(date_from) if date_from else None
+        date_to = date.fromisoformat(date_to) if date_to else None
+    except ValueError:
+        return error_response('Invalid from/to, expected YYYY-MM-DD', 400)
+    
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    
+    try:
+        conditions = []
+        values = []
+        
+        if date_from:
+            conditions.append('day >= %s')
+            values.append(date_from)
+        
+        if date_to:
+            conditions.append('day <= %s')
+            values.append(date_to)
+        
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        cursor.execute(f'''
+            SELECT status, SUM(bookings_count) as count, SUM(revenue) as revenue
+            FROM {schema}.booking_daily_stats
+            {where_clause}
+            GROUP BY status
+        ''', values)
+        
+        by_status = {row['status']: row for row in cursor.fetchall()}
+        
+        def status_count(status: str) -> int:
+            return int(by_status[status]['count']) if status in by_status else 0
+        
+        total_revenue = by_status['completed']['revenue'] if 'completed' in by_status else 0
+        
+        cursor.execute(f'''
+            SELECT DATE_TRUNC(%s, day)::date as period,
+                   SUM(bookings_count) as count,
+                   COALESCE(SUM(revenue) FILTER (WHERE status = 'completed'), 0) as revenue
+            FROM {schema}.booking_daily_stats
+            WHERE day >= COALESCE(%s::date, CURRENT_DATE - INTERVAL '30 days')
+              AND day <= COALESCE(%s::date, CURRENT_DATE)
+            GROUP BY period
+            HAVING SUM(bookings_count) > 0
+            ORDER BY period DESC
+        ''', (granularity, date_from, date_to))
+        
+        series = cursor.fetchall()
+        
+        return success_response({
+            'total_bookings': sum(int(row['count']) for row in by_status.values()),
+            'new_bookings': status_count('new'),
+            'confirmed_bookings': status_count('confirmed'),
+            'completed_bookings': status_count('completed'),
+            'cancelled_bookings': status_count('cancelled'),
+            'total_revenue': float(total_revenue) if total_revenue else 0,
+            'granularity': granularity,
+            'daily_bookings': [
+                {'date': str(d['period']), 'count': int(d['count']), 'revenue': float(d['revenue'])}
+                for d in series
+            ]
+        })
+        
+    except Exception as e:
+        return error_response(f'Failed to fetch statistics: {str(e)}', 500)
@@ -0,0 +1,189 @@
+"""Пакетные операции над заявками и справочниками в одной транзакции"""
+
+from psycopg2.extras import execute_values
+
+MAX_OPERATIONS = 500
+
+RESOURCES = {
+    'bookings': {
+        'fields': {'status': 'varchar', 'notes': 'text'},
+        'actions': ('update',),
+        'required': (),
+        'defaults': {}
+    },
+    'tariffs': {
+        'fields': {
+            'name': 'varchar', 'category': 'varchar', 'description': 'text', 'base_price': 'numeric',
+            'price_per_km': 'numeric', 'max_passengers': 'integer', 'features': 'text[]', 'is_active': 'boolean'
+        },
+        'actions': ('create', 'update', 'delete'),
+        'required': ('name', 'category', 'base_price', 'max_passengers'),
+        'defaults': {'description': None, 'price_per_km': None, 'features': [], 'is_active': True}
+    },
+    'vehicles': {
+        'fields': {
+            'name': 'varchar', 'model': 'varchar', 'category': 'varchar', 'seats': 'integer',
+            'image_url': 'text', 'features': 'text[]', 'is_active': 'boolean'
+        },
+        'actions': ('create', 'update', 'delete'),
+        'required': ('name', 'model', 'category', 'seats'),
+        'defaults': {'image_url': None, 'features': [], 'is_active': True}
+    }
+}
+
+
+def validate(op: dict):
+    """(группа, строка значений) для допустимой операции или текст ошибки"""
+
+    if not isinstance(op, dict):
+        return 'Operation must be an object'
+
+    resource = op.get('resource')
+    action = op.get('action')
+    spec = RESOURCES.get(resource)
+
+    if not spec:
+        return f'Unknown resource: {resource}'
+    if action not in spec['actions']:
+        return f'Action {action} is not supported for {resource}'
+
+    data = op.get('data') or {}
+    unknown = set(data) - set(spec['fields'])
+    if unknown:
+        return f'Unknown fields: {", ".join(sorted(unknown))}'
+
+    if action == 'create':
+        missing = [f for f in spec['required'] if data.get(f) is None]
+        if missing:
+            return f'Missing fields: {", ".join(missing)}'
+        row = {**spec['defaults'], **data}
+        fields = tuple(f for f in spec['fields'] if f in row)
+        return (resource, action, fields), tuple(row[f] for f in fields)
+
+    item_id = op.get('id')
+    if not isinstance(item_id, int) and not (isinstance(item_id, str) and item_id.isdigit()):
+        return 'Field id is required'
+    item_id = int(item_id)
+
+    if action == 'delete':
+        return (resource, action, ()), (item_id,)
+
+    if not data:
+        return 'No fields to update'
+    fields = tuple(sorted(data))
+    return (resource, action, fields), (item_id,) + tuple(data[f] for f in fields)
+
+
+def apply(conn, schema: str, operations: list) -> dict:
+    """Проверка, группировка и применение операций
+
+    Группа выполняется одним запросом под своим savepoint. Если запрос падает
+    (ограничение, неверный тип значения), группа откатывается и её операции
+    повторяются по одной, каждая под своим savepoint, — ошибку получает только
+    виноватая операция.
+    """
+
+    results = [None] * len(operations)
+    groups = {}
+
+    for index, op in enumerate(operations):
+        checked = validate(op)
+        if isinstance(checked, str):
+            results[index] = {'index': index, 'ok': False, 'error': checked}
+        else:
+            group, row = checked
+            groups.setdefault(group, []).append((index, row))
+
+    cursor = conn.cursor()
+    touched = set()
+
+    for group_number, ((resource, action, fields), items) in enumerate(groups.items()):
+        savepoint = f'batch_group_{group_number}'
+        try:
+            _apply_savepoint(cursor, savepoint, schema, resource, action, fields, items, results)
+            touched.add(resource)
+            continue
+        except Exception as e:
+            if len(items) == 1:
+                _fail(results, items, e)
+                continue
+
+        for item_number, item in enumerate(items):
+            try:
+                _apply_savepoint(cursor, f'{savepoint}_{item_number}', schema, resource, action, fields, [item], results)
+                touched.add(resource)
+            except Exception as e:
+                _fail(results, [item], e)
+
+    conn.commit()
+
+    applied = sum(1 for r in results if r['ok'])
+    return {
+        'applied': applied,
+        'failed': len(results) - applied,
+        'touched': sorted(touched),
+        'results': results
+    }
+
+
+def _apply_savepoint(cursor, savepoint: str, schema: str, resource: str, action: str, fields: tuple,
+                     items: list, results: list) -> None:
+    """Операции под savepoint; при ошибке откат до него и исключение наружу"""
+
+    cursor.execute(f'SAVEPOINT {savepoint}')
+    try:
+        if action == 'create':
+            ids = _insert(cursor, schema, resource, fields, [row for _, row in items])
+            for (index, _), new_id in zip(items, ids):
+                results[index] = {'index': index, 'ok': True, 'id': new_id}
+        else:
+            if action == 'update':
+                found = _update(cursor, schema, resource, fields, [row for _, row in items])
+            else:
+                found = _delete(cursor, schema, resource, [row[0] for _, row in items])
+            for index, row in items:
+                if row[0] in found:
+                    results[index] = {'index': index, 'ok': True, 'id': row[0]}
+                else:
+                    results[index] = {'index': index, 'ok': False, 'id': row[0], 'error': 'Not found'}
+        cursor.execute(f'RELEASE SAVEPOINT {savepoint}')
+    except Exception:
+        cursor.execute(f'ROLLBACK TO SAVEPOINT {savepoint}')
+        raise
+
+
+def _fail(results: list, items: list, error: Exception) -> None:
+    for index, row in items:
+        results[index] = {'index': index, 'ok': False, 'error': str(error).strip()}
+
+
+def _cast_template(resource: str, fields: tuple, with_id: bool) -> str:
+    types = RESOURCES[resource]['fields']
+    casts = (['%s::integer'] if with_id else []) + [f'%s::{types[f]}' for f in fields]
+    return f"({', '.join(casts)})"
+
+
+def _insert(cursor, schema: str, resource: str, fields: tuple, rows: list) -> list:
+    returned = execute_values(cursor, f'''
+        INSERT INTO {schema}.{resource} ({', '.join(fields)})
+        VALUES %s
+        RETURNING id
+    ''', rows, template=_cast_template(resource, fields, False), page_size=len(rows), fetch=True)
+    return [r[0] for r in returned]
+
+
+def _update(cursor, schema: str, resource: str, fields: tuple, rows: list) -> set:
+    assignments = ', '.join(f'{f} = v.{f}' for f in fields)
+    returned = execute_values(cursor, f'''
+        UPDATE {schema}.{resource} AS t
+        SET {assignments}, updated_at = CURRENT_TIMESTAMP
+        FROM (VALUES %s) AS v(id, {', '.join(fields)})
+        WHERE t.id = v.id
+        RETURNING t.id
+    ''', rows, template=_cast_template(resource, fields, True), page_size=len(rows), fetch=True)
+    return {r[0] for r in returned}
+
+
+def _delete(cursor, schema: str, resource: str, ids: list) -> set:
+    cursor.execute(f'DELETE FROM {schema}.{resource} WHERE id = ANY(%s) RETURNING id', (ids,))
+    return {r[0] for r in cursor.fetchall()}
@@ -0,0 +1,102 @@
+"""Кэш справочников (тарифы, автомобили, маршруты, реклама) с TTL и версиями"""
+
+import os
+import threading
+import time
+
+from responses import encode_rows
+
+CATALOG_TABLES = ('tariffs', 'vehicles', 'routes', 'advertisements')
+
+
+class CatalogCache:
+    """Read-through кэш: в пределах TTL отвечает без БД, после — сверяет версии одним запросом"""
+
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'revalidations': 0, 'misses': 0, 'invalidations': 0, 'version_checks': 0}
+
+    def get(self, conn, schema: str, key: str, tables: tuple, loader):
+        """Значение по ключу; loader(conn, schema) вызывается только при смене версии таблиц"""
+
+        cache_key = (schema, key)
+        now = time.monotonic()
+        entry = self._entries.get(cache_key)
+
+        if entry and now - entry['checked_at'] < self.ttl:
+            self._count('hits')
+            return entry['value']
+
+        versions = self.fetch_versions(conn, schema)
+        stamp = tuple(versions.get(table, 0) for table in tables)
+
+        if entry and entry['stamp'] == stamp:
+            entry['checked_at'] = now
+            self._count('revalidations')
+            return entry['value']
+
+        value = loader(conn, schema)
+        with self._lock:
+            self._entries[cache_key] = {
+                'value': value,
+                'stamp': stamp,
+                'tables': tables,
+                'checked_at': now
+            }
+        self._count('misses')
+        return value
+
+    def fetch_versions(self, conn, schema: str) -> dict:
+        self._count('version_checks')
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT name, version FROM {schema}.catalog_versions')
+        versions = dict(cursor.fetchall())
+        cursor.close()
+        return versions
+
+    def invalidate(self, table: str) -> None:
+        """Сброс локальных записей, зависящих от таблицы; версию в БД поднимает триггер"""
+
+        with self._lock:
+            stale = [k for k, entry in self._entries.items() if table in entry['tables']]
+            for k in stale:
+                del self._entries[k]
+            self._stats['invalidations'] += 1
+
+    def etag(self, schema: str, key: str, suffix: str = '') -> str:
+        """Слабый ETag из версий таблиц записи; вызывать после get()"""
+
+        entry = self._entries.get((schema, key))
+        if not entry:
+            return None
+        versions = '.'.join(str(v) for v in entry['stamp'])
+        return f'W/"{key}-{versions}{suffix}"'
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = dict(self._stats)
+            result['entries'] = len(self._entries)
+            result['ttl'] = self.ttl
+        return result
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+
+cache = CatalogCache(ttl=float(os.environ.get('CATALOG_CACHE_TTL', '5')))
+
+
+def load_table(table: str, order_by: str):
+    """Загрузчик полного списка строк справочника"""
+
+    def loader(conn, schema: str) -> list:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT * FROM {schema}.{table} ORDER BY {order_by}')
+        rows = encode_rows(cursor)
+        cursor.close()
+        return rows
+
+    return loader
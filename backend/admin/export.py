@@ -0,0 +1,176 @@
+"""Потоковая выгрузка заявок в CSV/NDJSON для бухгалтерии
+
+Тело ответа функции собирается в памяти целиком, поэтому одна выгрузка
+ограничена EXPORT_MAX_ROWS строками (по умолчанию 50 000, порядок created_at, id).
+Если строк больше, в заголовке X-Export-Next-Cursor приходит курсор: следующая
+страница запрашивается с ?cursor=<значение> и теми же from/to.
+"""
+
+import base64
+import csv
+import gzip
+import io
+import json
+import os
+from datetime import datetime
+from itertools import islice
+
+from search import CUSTOMER_EMAIL, CUSTOMER_NAME, CUSTOMER_PHONE
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8'
+}
+
+EXPORT_COLUMNS = [
+    'id', 'created_at', 'travel_date', 'travel_time', 'from_location', 'to_location',
+    'passengers', 'tariff_id', 'tariff_name', 'vehicle_id', 'total_price',
+    'payment_method', 'payment_status', 'status', 'customer_name', 'customer_phone', 'customer_email'
+]
+
+ITERSIZE = int(os.environ.get('EXPORT_ITERSIZE', '2000'))
+GZIP_LEVEL = int(os.environ.get('EXPORT_GZIP_LEVEL', '6'))
+MAX_ROWS = int(os.environ.get('EXPORT_MAX_ROWS', '50000'))
+
+
+def encode_cursor(created_at: datetime, booking_id: int) -> str:
+    """Курсор на позицию (created_at, id) последней выгруженной заявки"""
+
+    raw = f'{created_at.isoformat()}|{booking_id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(value: str):
+    try:
+        raw = base64.urlsafe_b64decode(value.encode('ascii')).decode('utf-8')
+        created_at, booking_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), int(booking_id)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def export_bookings(conn, schema: str, export_format: str, date_from: str = None, date_to: str = None,
+                    after: tuple = None, max_rows: int = MAX_ROWS) -> tuple:
+    """Сжатое тело страницы выгрузки, число строк и курсор следующей страницы (None — последняя)
+
+    Строки читаются серверным курсором пачками по ITERSIZE, в ответ попадает не больше max_rows.
+    """
+
+    conditions = []
+    values = []
+
+    if after:
+        conditions.append('(b.created_at, b.id) > (%s, %s)')
+        values.extend(after)
+
+    if date_from:
+        conditions.append('b.created_at >= %s::date')
+        values.append(date_from)
+
+    if date_to:
+        conditions.append("b.created_at < %s::date + INTERVAL '1 day'")
+        values.append(date_to)
+
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    cursor = conn.cursor(name='bookings_export')
+    cursor.itersize = ITERSIZE
+    cursor.execute(f'''
+        SELECT b.id, b.created_at, b.travel_date, b.travel_time, b.from_location, b.to_location,
+               b.passengers, b.tariff_id, t.name, b.vehicle_id, b.total_price,
+               b.payment_method, b.payment_status, b.status,
+               {CUSTOMER_NAME},
+               {CUSTOMER_PHONE},
+               {CUSTOMER_EMAIL}
+        FROM {schema}.bookings b
+        LEFT JOIN {schema}.tariffs t ON b.tariff_id = t.id
+        LEFT JOIN {schema}.users u ON b.user_id = u.id
+        {where_clause}
+        ORDER BY b.created_at, b.id
+        LIMIT %s
+    ''', values + [max_rows + 1])
+
+    page = _Page(cursor, max_rows)
+    buffer = io.BytesIO()
+
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=GZIP_LEVEL) as compressed:
+        if export_format == 'csv':
+            rows = _write_csv(page, compressed)
+        else:
+            rows = _write_ndjson(page, compressed)
+
+    next_cursor = encode_cursor(page.last[1], page.last[0]) if page.has_more() else None
+    cursor.close()
+    return buffer.getvalue(), rows, next_cursor
+
+
+class _Page:
+    """Первые max_rows строк курсора с запоминанием последней"""
+
+    def __init__(self, cursor, max_rows: int):
+        self.cursor = iter(cursor)
+        self.max_rows = max_rows
+        self.last = None
+
+    def __iter__(self):
+        for row in islice(self.cursor, self.max_rows):
+            self.last = row
+            yield row
+
+    def has_more(self) -> bool:
+        return next(self.cursor, None) is not None
+
+
+def _write_csv(cursor, compressed) -> int:
+    chunk = io.StringIO()
+    writer = csv.writer(chunk)
+    writer.writerow(EXPORT_COLUMNS)
+    rows = 0
+
+    for row in cursor:
+        writer.writerow(['' if value is None else value for value in row])
+        rows += 1
+        if rows % ITERSIZE == 0:
+            compressed.write(chunk.getvalue().encode('utf-8'))
+            chunk.seek(0)
+            chunk.truncate()
+
+    compressed.write(chunk.getvalue().encode('utf-8'))
+    return rows
+
+
+def _write_ndjson(cursor, compressed) -> int:
+    lines = []
+    rows = 0
+
+    for row in cursor:
+        lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False, default=str))
+        rows += 1
+        if rows % ITERSIZE == 0:
+            compressed.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            lines = []
+
+    if lines:
+        compressed.write(('\n'.join(lines) + '\n').encode('utf-8'))
+    return rows
+
+
+def export_response(body: bytes, rows: int, export_format: str, next_cursor: str = None) -> dict:
+    headers = {
+        'Content-Type': EXPORT_FORMATS[export_format],
+        'Content-Encoding': 'gzip',
+        'Content-Disposition': f'attachment; filename="bookings.{export_format}"',
+        'X-Export-Rows': str(rows),
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'Content-Disposition, X-Export-Rows, X-Export-Next-Cursor'
+    }
+
+    if next_cursor:
+        headers['X-Export-Next-Cursor'] = next_cursor
+
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': base64.b64encode(body).decode('ascii'),
+        'isBase64Encoded': True
+    }
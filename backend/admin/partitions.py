@@ -0,0 +1,267 @@
+"""Секции bookings по месяцам created_at: создание наперёд и отсоединение старых в архив
+
+Секция месяца называется bookings_yYYYYmMM. Строки, для которых секции не
+нашлось, попадают в bookings_default; при создании секции они переносятся в неё.
+Старые секции отсоединяются и переименовываются в bookings_archive_yYYYYmMM —
+обычную таблицу без вторичных индексов и внешних ключей; из CLI архив можно
+выгрузить в CSV и удалить. Агрегаты статистики при этом не меняются.
+Архивирование включается явно: по умолчанию BOOKINGS_PARTITIONS_RETAIN=0,
+и секции не отсоединяются.
+
+    python backend/admin/partitions.py --ahead 3 --retain 24 --export-dir /var/backups/bookings
+"""
+
+import gzip
+import json
+import os
+import re
+from datetime import date
+
+AHEAD_MONTHS = int(os.environ.get('BOOKINGS_PARTITIONS_AHEAD', '3'))
+RETAIN_MONTHS = int(os.environ.get('BOOKINGS_PARTITIONS_RETAIN', '0'))
+LOCK_TIMEOUT = os.environ.get('BOOKINGS_PARTITIONS_LOCK_TIMEOUT', '5s')
+
+PARTITION_NAME = re.compile(r'^bookings_y(\d{4})m(\d{2})$')
+DEFAULT_PARTITION = 'bookings_default'
+ARCHIVE_PREFIX = 'bookings_archive_'
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f'bookings_y{month.year:04d}m{month.month:02d}'
+
+
+def partition_month(name: str):
+    match = PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def is_partitioned(cursor, schema: str) -> bool:
+    cursor.execute('SELECT relkind = %s FROM pg_class WHERE oid = %s::regclass', ('p', f'{schema}.bookings'))
+    return cursor.fetchone()[0]
+
+
+def list_partitions(cursor, schema: str) -> dict:
+    """Месячные секции: имя → первый день месяца"""
+
+    cursor.execute('''
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    ''', (f'{schema}.bookings',))
+    names = [row[0] for row in cursor.fetchall()]
+    return {name: partition_month(name) for name in names if partition_month(name)}
+
+
+def insert_columns(cursor, schema: str) -> list:
+    """Столбцы bookings без генерируемых — их значения пересчитываются при вставке"""
+
+    cursor.execute('''
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+        ORDER BY attnum
+    ''', (f'{schema}.bookings',))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def create_partition(cursor, schema: str, month: date) -> int:
+    """Секция месяца; возвращает число строк, перенесённых в неё из bookings_default
+
+    Если в bookings_default есть строки этого месяца, секция собирается отдельно:
+    default отсоединяется, строки переносятся без триггеров (агрегаты их уже
+    учитывают), затем обе таблицы присоединяются обратно.
+    """
+
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+
+    cursor.execute(f'''
+        SELECT EXISTS (SELECT 1 FROM {schema}.{DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s)
+    ''', (start, end))
+
+    if not cursor.fetchone()[0]:
+        cursor.execute(f'CREATE TABLE {schema}.{name} PARTITION OF {schema}.bookings FOR VALUES FROM (%s) TO (%s)',
+                       (start, end))
+        return 0
+
+    columns = ', '.join(insert_columns(cursor, schema))
+    cursor.execute(f'ALTER TABLE {schema}.bookings DETACH PARTITION {schema}.{DEFAULT_PARTITION}')
+    cursor.execute(f'''
+        CREATE TABLE {schema}.{name}
+        (LIKE {schema}.bookings INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)
+    ''')
+    cursor.execute(f'''
+        WITH moved AS (
+            DELETE FROM {schema}.{DEFAULT_PARTITION}
+            WHERE created_at >= %s AND created_at < %s
+            RETURNING {columns}
+        )
+        INSERT INTO {schema}.{name} ({columns})
+        SELECT {columns} FROM moved
+    ''', (start, end))
+    moved = cursor.rowcount
+    cursor.execute(f'ALTER TABLE {schema}.bookings ATTACH PARTITION {schema}.{name} FOR VALUES FROM (%s) TO (%s)',
+                   (start, end))
+    cursor.execute(f'ALTER TABLE {schema}.bookings ATTACH PARTITION {schema}.{DEFAULT_PARTITION} DEFAULT')
+    return moved
+
+
+def ensure_range(cursor, schema: str, first_month: date, last_month: date) -> list:
+    """Недостающие секции с first_month по last_month включительно, без commit"""
+
+    existing = set(list_partitions(cursor, schema).values())
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        if month not in existing:
+            create_partition(cursor, schema, month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def archive_partition(cursor, schema: str, name: str) -> str:
+    """Отсоединение секции в архивную таблицу без вторичных индексов и внешних ключей"""
+
+    archive = ARCHIVE_PREFIX + name[len('bookings_'):]
+    cursor.execute(f'ALTER TABLE {schema}.bookings DETACH PARTITION {schema}.{name}')
+    cursor.execute(f'ALTER TABLE {schema}.{name} RENAME TO {archive}')
+
+    cursor.execute('''
+        SELECT indexrelid::regclass::text FROM pg_index
+        WHERE indrelid = %s::regclass AND NOT indisprimary
+    ''', (f'{schema}.{archive}',))
+    for (index,) in cursor.fetchall():
+        cursor.execute(f'DROP INDEX {index}')
+
+    cursor.execute('''
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+    ''', (f'{schema}.{archive}',))
+    for (constraint,) in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE {schema}.{archive} DROP CONSTRAINT {constraint}')
+
+    return archive
+
+
+def maintain(conn, schema: str, ahead: int = AHEAD_MONTHS, retain: int = RETAIN_MONTHS, today: date = None) -> dict:
+    """Секции на ahead месяцев вперёд и для строк из bookings_default, архив старше retain месяцев
+
+    Каждая секция создаётся и отсоединяется в своей транзакции с lock_timeout,
+    чтобы не держать блокировку bookings дольше одной операции.
+    """
+
+    current = month_start(today or date.today())
+    cursor = conn.cursor()
+    result = {'created': [], 'moved_rows': 0, 'archived': []}
+
+    cursor.execute(f"SELECT DISTINCT date_trunc('month', created_at)::date FROM {schema}.{DEFAULT_PARTITION}")
+    months = {row[0] for row in cursor.fetchall()}
+    months.update(add_months(current, i) for i in range(ahead + 1))
+    months -= set(list_partitions(cursor, schema).values())
+    conn.commit()
+
+    for month in sorted(months):
+        cursor.execute('SET LOCAL lock_timeout = %s', (LOCK_TIMEOUT,))
+        result['moved_rows'] += create_partition(cursor, schema, month)
+        conn.commit()
+        result['created'].append(partition_name(month))
+
+    if retain > 0:
+        cutoff = add_months(current, -retain)
+        for name, month in sorted(list_partitions(cursor, schema).items(), key=lambda item: item[1]):
+            if month >= cutoff:
+                break
+            cursor.execute('SET LOCAL lock_timeout = %s', (LOCK_TIMEOUT,))
+            result['archived'].append(archive_partition(cursor, schema, name))
+            conn.commit()
+
+    cursor.close()
+    print(json.dumps({'event': 'bookings_partitions_maintained', **result}))
+    return result
+
+
+def export_archive(conn, schema: str, archive: str, directory: str) -> str:
+    """Выгрузка архивной таблицы в CSV (gzip) и её удаление"""
+
+    path = os.path.join(directory, f'{archive}.csv.gz')
+    cursor = conn.cursor()
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        cursor.copy_expert(f'COPY {schema}.{archive} TO STDOUT WITH (FORMAT csv, HEADER)', f)
+    cursor.execute(f'DROP TABLE {schema}.{archive}')
+    conn.commit()
+    cursor.close()
+    return path
+
+
+def status(cursor, schema: str) -> dict:
+    """Секции и архивные таблицы с оценкой числа строк и размером"""
+
+    cursor.execute('''
+        SELECT c.relname as name, pg_get_expr(c.relpartbound, c.oid) as bound,
+               GREATEST(c.reltuples, 0)::bigint as rows_estimate,
+               pg_total_relation_size(c.oid) as size_bytes
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        ORDER BY c.relname
+    ''', (f'{schema}.bookings',))
+    partitions = cursor.fetchall()
+
+    cursor.execute('''
+        SELECT c.relname as name, GREATEST(c.reltuples, 0)::bigint as rows_estimate,
+               pg_total_relation_size(c.oid) as size_bytes
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relkind = 'r' AND c.relname LIKE %s
+        ORDER BY c.relname
+    ''', (schema, ARCHIVE_PREFIX.replace('_', '\\_') + '%'))
+    archives = cursor.fetchall()
+
+    return {
+        'partitions': partitions,
+        'archives': archives,
+        'ahead_months': AHEAD_MONTHS,
+        'retain_months': RETAIN_MONTHS
+    }
+
+
+def main():
+    import argparse
+
+    import db
+
+    parser = argparse.ArgumentParser(description='Create upcoming bookings partitions and archive old ones')
+    parser.add_argument('--ahead', type=int, default=AHEAD_MONTHS, help='months to create in advance')
+    parser.add_argument('--retain', type=int, default=RETAIN_MONTHS, help='months to keep attached, 0 keeps all')
+    parser.add_argument('--export-dir', help='dump archived tables to CSV files here and drop them')
+    args = parser.parse_args()
+
+    db_url = os.environ['DATABASE_URL']
+    schema = os.environ.get('MAIN_DB_SCHEMA', 'public')
+
+    conn = db.acquire(db_url)
+    try:
+        maintain(conn, schema, args.ahead, args.retain)
+        if args.export_dir:
+            os.makedirs(args.export_dir, exist_ok=True)
+            cursor = conn.cursor()
+            archives = [row[0] for row in status(cursor, schema)['archives']]
+            cursor.close()
+            for archive in archives:
+                print(export_archive(conn, schema, archive, args.export_dir))
+    finally:
+        db.release(conn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+"""Ответы функций: быстрая сериализация JSON, сжатие, ETag и сборка строк из курсора"""
+
+import base64
+import functools
+import gzip
+import hashlib
+import json
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import tracing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+NUMERIC_OID = 1700
+COMPRESS_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('RESPONSE_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('RESPONSE_BROTLI_QUALITY', '5'))
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(data) -> str:
+    """JSON в UTF-8: orjson, если установлен, иначе стандартный json"""
+
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, default=_default)
+
+
+def row_plan(description) -> list:
+    """План конвертации по описанию колонок курсора: (имя, конвертер или None)"""
+
+    return [(column[0], float if column[1] == NUMERIC_OID else None) for column in description]
+
+
+def encode_rows(cursor, rows: list = None) -> list:
+    """Словари из строк обычного (кортежного) курсора по заранее собранному плану"""
+
+    plan = row_plan(cursor.description)
+    names = [name for name, _ in plan]
+    converted = [(i, name, convert) for i, (name, convert) in enumerate(plan) if convert]
+    rows = cursor.fetchall() if rows is None else rows
+
+    if not converted:
+        return [dict(zip(names, row)) for row in rows]
+
+    result = []
+    for row in rows:
+        item = dict(zip(names, row))
+        for i, name, convert in converted:
+            value = row[i]
+            if value is not None:
+                item[name] = convert(value)
+        result.append(item)
+    return result
+
+
+def get_header(event: dict, name: str) -> str:
+    """Значение заголовка без учёта регистра имени"""
+
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value or ''
+    return ''
+
+
+def _opaque_tag(etag: str) -> str:
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(event: dict, etag: str) -> bool:
+    """Слабое сравнение, как требует If-None-Match: префикс W/ не учитывается"""
+
+    if_none_match = get_header(event, 'If-None-Match')
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return _opaque_tag(etag) in [_opaque_tag(tag.strip()) for tag in if_none_match.split(',')]
+
+
+def etag_response(data: dict, event: dict, etag: str = None) -> dict:
+    """Ответ на GET с ETag: 304 при совпадении If-None-Match, иначе полный JSON
+
+    ETag слабый: тело потом может быть сжато по Accept-Encoding, а байты gzip, br
+    и несжатого ответа различаются при одном и том же содержимом.
+    """
+
+    if etag and etag_matches(event, etag):
+        return not_modified_response(etag)
+
+    response = success_response(data)
+
+    if not etag:
+        etag = 'W/"' + hashlib.sha256(response['body'].encode('utf-8')).hexdigest()[:32] + '"'
+        if etag_matches(event, etag):
+            return not_modified_response(etag)
+
+    response['headers']['ETag'] = etag
+    response['headers']['Cache-Control'] = 'private, no-cache'
+    response['headers']['Access-Control-Expose-Headers'] = 'ETag'
+    return response
+
+
+def accepted_encodings(event: dict) -> dict:
+    """Кодировки из Accept-Encoding с их q; q=0 означает запрет"""
+
+    encodings = {}
+    for part in get_header(event, 'Accept-Encoding').split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+def choose_encoding(event: dict):
+    """br, если есть модуль brotli и клиент его принимает, иначе gzip или None"""
+
+    encodings = accepted_encodings(event)
+    wildcard = encodings.get('*', 0.0)
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+
+    best, best_q = None, 0.0
+    for name in candidates:
+        q = encodings.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress_response(response: dict, event: dict) -> dict:
+    """Сжатие JSON-тела больше порога; тело уходит в base64, как требует среда функций
+
+    Vary ставится на любой ответ, который мог быть сжат, включая короткие и 304:
+    иначе кэш отдаст несжатую копию клиенту, которому полагалась сжатая, и наоборот.
+    """
+
+    headers = response.setdefault('headers', {})
+    body = response.get('body')
+
+    if response.get('isBase64Encoded') or 'Content-Encoding' in headers:
+        return response
+
+    headers['Vary'] = 'Accept-Encoding'
+
+    if not body:
+        return response
+
+    raw = body.encode('utf-8')
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return response
+
+    encoding = choose_encoding(event)
+    if encoding is None:
+        return response
+
+    with tracing.span('compress'):
+        if encoding == 'br':
+            packed = brotli.compress(raw, quality=BROTLI_QUALITY)
+        else:
+            packed = gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+
+    response['body'] = base64.b64encode(packed).decode('ascii')
+    response['isBase64Encoded'] = True
+    headers['Content-Encoding'] = encoding
+    return response
+
+
+def compressed(handler):
+    """Декоратор handler: ответы сжимаются по Accept-Encoding запроса"""
+
+    @functools.wraps(handler)
+    def wrapper(event: dict, context) -> dict:
+        return compress_response(handler(event, context), event)
+
+    return wrapper
+
+
+def replayed_response(status_code: int, body: str) -> dict:
+    """Сохранённый ответ на повтор запроса с тем же Idempotency-Key"""
+
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'Idempotent-Replayed',
+            'Idempotent-Replayed': 'true'
+        },
+        'body': body,
+        'isBase64Encoded': False
+    }
+
+
+def not_modified_response(etag: str) -> dict:
+    return {
+        'statusCode': 304,
+        'headers': {
+            'ETag': etag,
+            'Cache-Control': 'private, no-cache',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'ETag'
+        },
+        'body': '',
+        'isBase64Encoded': False
+    }
+
+
+def success_response(data: dict) -> dict:
+    with tracing.span('serialize'):
+        body = dumps(data)
+
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': body,
+        'isBase64Encoded': False
+    }
+
+
+def error_response(message: str, status_code: int) -> dict:
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': dumps({'error': message}),
+        'isBase64Encoded': False
+    }
+
+
+def too_many_requests_response(message: str, retry_after: int) -> dict:
+    response = error_response(message, 429)
+    response['headers']['Retry-After'] = str(retry_after)
+    response['headers']['Access-Control-Expose-Headers'] = 'Retry-After'
+    return response
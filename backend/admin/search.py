@@ -0,0 +1,86 @@
+"""Поиск заявок для диспетчерской по имени, телефону, email и маршруту"""
+
+import re
+
+from responses import encode_rows
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MIN_QUERY_LENGTH = 2
+MIN_PHONE_DIGITS = 3
+
+PHONE_QUERY = re.compile(r'^[\d\s()+\-]+$')
+
+# Контакты клиента по заявке (b) и её пользователю (u): сначала профиль, потом гостевые поля; общие с выгрузкой
+CUSTOMER_NAME = 'COALESCE(u.full_name, b.guest_name)'
+CUSTOMER_PHONE = 'COALESCE(u.phone, b.guest_phone)'
+CUSTOMER_PHONE_DIGITS = 'COALESCE(u.phone_digits, b.guest_phone_digits)'
+CUSTOMER_EMAIL = 'COALESCE(u.email, b.guest_email)'
+
+SEARCH_COLUMNS = f'''
+    b.id, b.created_at, b.travel_date, b.travel_time, b.from_location, b.to_location,
+    b.passengers, t.name as tariff_name, b.vehicle_id,
+    COALESCE(b.total_price, 0) as total_price, b.payment_status, b.status,
+    {CUSTOMER_NAME} as customer_name,
+    {CUSTOMER_PHONE} as customer_phone,
+    {CUSTOMER_EMAIL} as customer_email
+'''
+
+
+def normalize_query(q: str) -> str:
+    return ' '.join(q.split()).lower()
+
+
+def search_bookings(conn, schema: str, q: str, limit: int, offset: int) -> dict:
+    """Ранжированная страница заявок и смещение следующей страницы
+
+    Запрос из цифр и телефонных символов ищется по цифрам телефона клиента
+    (CUSTOMER_PHONE_DIGITS): кандидаты берутся по триграммным индексам
+    guest_phone_digits гостевых заявок и users.phone_digits. Остальное — по
+    search_vector (слова) и search_text (подстроки и опечатки, word_similarity).
+    """
+
+    q = normalize_query(q)
+    digits = re.sub(r'\D', '', q)
+    cursor = conn.cursor()
+
+    if PHONE_QUERY.match(q) and len(digits) >= MIN_PHONE_DIGITS:
+        cursor.execute(f'''
+            SELECT {SEARCH_COLUMNS}, similarity({CUSTOMER_PHONE_DIGITS}, %s) as rank
+            FROM {schema}.bookings b
+            LEFT JOIN {schema}.tariffs t ON b.tariff_id = t.id
+            LEFT JOIN {schema}.users u ON b.user_id = u.id
+            WHERE b.id IN (
+                SELECT gb.id FROM {schema}.bookings gb
+                WHERE gb.guest_phone_digits LIKE %s
+                UNION ALL
+                SELECT ub.id FROM {schema}.users pu
+                JOIN {schema}.bookings ub ON ub.user_id = pu.id
+                WHERE pu.phone_digits LIKE %s
+            )
+              AND {CUSTOMER_PHONE_DIGITS} LIKE %s
+            ORDER BY rank DESC, b.id DESC
+            LIMIT %s OFFSET %s
+        ''', (digits, f'%{digits}%', f'%{digits}%', f'%{digits}%', limit + 1, offset))
+    else:
+        cursor.execute(f'''
+            SELECT {SEARCH_COLUMNS},
+                   ts_rank(b.search_vector, query) + word_similarity(%s, b.search_text) as rank
+            FROM {schema}.bookings b
+            CROSS JOIN plainto_tsquery('simple', %s) query
+            LEFT JOIN {schema}.tariffs t ON b.tariff_id = t.id
+            LEFT JOIN {schema}.users u ON b.user_id = u.id
+            WHERE b.search_vector @@ query OR %s <%% b.search_text
+            ORDER BY rank DESC, b.id DESC
+            LIMIT %s OFFSET %s
+        ''', (q, q, q, limit + 1, offset))
+
+    rows = cursor.fetchall()
+    bookings = encode_rows(cursor, rows[:limit])
+    cursor.close()
+
+    return {
+        'query': q,
+        'bookings': bookings,
+        'next_offset': offset + limit if len(rows) > limit else None
+    }
@@ -0,0 +1,215 @@
+import json
+import os
+import jwt
+from datetime import datetime, timedelta
+from psycopg2.extras import RealDictCursor
+
+import db
+import passwords
+import ratelimit
+import tokens
+import tracing
+from responses import success_response, error_response, too_many_requests_response
+
+@tracing.traced('auth')
+def handler(event: dict, context) -> dict:
+    """API для регистрации и авторизации пользователей трансфера"""
+    
+    method = event.get('httpMethod', 'GET')
+    
+    try:
+        db_url = os.environ.get('DATABASE_URL')
+        schema = os.environ.get('MAIN_DB_SCHEMA', 'public')
+        jwt_secret = os.environ.get('JWT_SECRET_KEY')
+        
+        if not db_url or not jwt_secret:
+            return error_response('Server configuration error', 500)
+        
+        conn = db.acquire(db_url)
+        
+        query_params = event.get('queryStringParameters', {}) or {}
+        action = query_params.get('action', '')
+        
+        if method == 'POST':
+            body = json.loads(event.get('body', '{}'))
+            
+            client_ip = ratelimit.client_ip(event)
+            
+            if action == 'register':
+                return handle_register(conn, schema, body, jwt_secret, client_ip)
+            elif action == 'login':
+                return handle_login(conn, schema, body, jwt_secret, client_ip)
+            else:
+                return error_response('Unknown action', 400)
+        
+        elif method == 'GET' and action == 'verify':
+            return handle_verify(tokens.get_bearer_token(event), jwt_secret)
+        
+        else:
+            return error_response('Method not allowed', 405)
+    
+    except Exception as e:
+        return error_response(f'Server error: {str(e)}', 500)
+    finally:
+        if 'conn' in locals():
+            db.release(conn)
+
+
+def handle_register(conn, schema: str, data: dict, jwt_secret: str, client_ip: str) -> dict:
+    """Регистрация нового пользователя"""
+    
+    email = data.get('email', '').strip().lower()
+    password = data.get('password', '')
+    full_name = data.get('full_name', '').strip()
+    phone = data.get('phone', '').strip()
+    
+    if not all([email, password, full_name, phone]):
+        return error_response('All fields are required', 400)
+    
+    if len(password) < 6:
+        return error_response('Password must be at least 6 characters', 400)
+    
+    try:
+        ratelimit.check(conn, schema, [('register_ip', client_ip)])
+        
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cursor.execute(f'SELECT id FROM {schema}.users WHERE email = %s', (email,))
+        if cursor.fetchone():
+            return error_response('Email already registered', 400)
+        
+        password_hash = passwords.hash_password(password)
+        
+        cursor.execute(f'''
+            INSERT INTO {schema}.users (email, password_hash, full_name, phone, role)
+            VALUES (%s, %s, %s, %s, 'client')
+            RETURNING id, email, full_name, phone, role, created_at
+        ''', (email, password_hash, full_name, phone))
+        
+        user = cursor.fetchone()
+        conn.commit()
+        
+        token = generate_token(user['id'], user['email'], user['role'], jwt_secret)
+        
+        return success_response({
+            'token': token,
+            'user': {
+                'id': user['id'],
+                'email': user['email'],
+                'full_name': user['full_name'],
+                'phone': user['phone'],
+                'role': user['role']
+            }
+        })
+        
+    except ratelimit.RateLimited as e:
+        return too_many_requests_response('Too many registrations, try again later', e.retry_after)
+    except passwords.HasherBusy:
+        conn.rollback()
+        return error_response('Too many requests, try again later', 503)
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Registration failed: {str(e)}', 500)
+
+
+def handle_login(conn, schema: str, data: dict, jwt_secret: str, client_ip: str) -> dict:
+    """Вход пользователя"""
+    
+    email = data.get('email', '').strip().lower()
+    password = data.get('password', '')
+    
+    if not email or not password:
+        return error_response('Email and password are required', 400)
+    
+    try:
+        ratelimit.check(conn, schema, [('login_ip', client_ip), ('login_email', email)])
+        
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cursor.execute(f'''
+            SELECT id, email, password_hash, full_name, phone, role
+            FROM {schema}.users
+            WHERE email = %s
+        ''', (email,))
+        
+        user = cursor.fetchone()
+        
+        if not user:
+            passwords.verify_dummy(password)
+            return error_response('Invalid email or password', 401)
+        
+        if not passwords.verify_password(password, user['password_hash']):
+            return error_response('Invalid email or password', 401)
+        
+        if passwords.needs_rehash(user['password_hash']):
+            rehash_password(conn, schema, user['id'], password)
+        
+        token = generate_token(user['id'], user['email'], user['role'], jwt_secret)
+        
+        return success_response({
+            'token': token,
+            'user': {
+                'id': user['id'],
+                'email': user['email'],
+                'full_name': user['full_name'],
+                'phone': user['phone'],
+                'role': user['role']
+            }
+        })
+        
+    except ratelimit.RateLimited as e:
+        return too_many_requests_response('Too many login attempts, try again later', e.retry_after)
+    except passwords.HasherBusy:
+        return error_response('Too many login attempts, try again later', 503)
+    except Exception as e:
+        return error_response(f'Login failed: {str(e)}', 500)
+
+
+def rehash_password(conn, schema: str, user_id: int, password: str) -> None:
+    """Перехэширование пароля с целевой стоимостью после успешного входа"""
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            UPDATE {schema}.users
+            SET password_hash = %s, updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+        ''', (passwords.hash_password(password), user_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+
+
+def handle_verify(token: str, jwt_secret: str) -> dict:
+    """Проверка валидности токена"""
+    
+    if not token:
+        return error_response('Invalid authorization header', 401)
+    
+    try:
+        payload = tokens.decode_token(token, jwt_secret)
+        return success_response({
+            'valid': True,
+            'user': {
+                'id': payload['user_id'],
+                'email': payload['email'],
+                'role': payload['role']
+            }
+        })
+    except jwt.ExpiredSignatureError:
+        return error_response('Token expired', 401)
+    except jwt.InvalidTokenError:
+        return error_response('Invalid token', 401)
+
+
+def generate_token(user_id: int, email: str, role: str, jwt_secret: str) -> str:
+    """Генерация JWT токена"""
+    
+    payload = {
+        'user_id': user_id,
+        'email': email,
+        'role': role,
+        'exp': datetime.utcnow() + timedelta(days=30)
+    }
+    
+    return jwt.encode(payload, jwt_secret, algorithm='HS256')
@@ -0,0 +1,210 @@
+"""Пул соединений с PostgreSQL, переживающий вызовы в одном контейнере"""
+
+import json
+import os
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+import tracing
+
+
+class PoolTimeout(Exception):
+    """Не удалось получить соединение из пула за отведённое время"""
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений с проверкой здоровья при выдаче
+
+    Соединение пингуется, если пролежало без дела ping_after секунд или вернулось
+    в пул до последней ошибки соединения: после обрыва соседние соединения,
+    скорее всего, тоже мертвы.
+    """
+
+    def __init__(self, dsn: str, max_size: int = 2, ping_after: float = 30.0,
+                 checkout_timeout: float = 5.0, wait_log_ms: float = 50.0):
+        self.dsn = dsn
+        self.max_size = max(1, max_size)
+        self.ping_after = ping_after
+        self.checkout_timeout = checkout_timeout
+        self.wait_log_ms = wait_log_ms
+        self._idle = []
+        self._size = 0
+        self._error_at = None
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'connects': 0,
+            'reconnects': 0,
+            'timeouts': 0,
+            'wait_ms_total': 0.0,
+            'wait_ms_max': 0.0,
+            'last_wait_ms': 0.0
+        }
+
+    def acquire(self):
+        """Выдача соединения: свободное из пула, новое или ожидание освобождения"""
+
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        conn = None
+        released_at = None
+        suspect = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    suspect = self._error_at is not None and released_at <= self._error_at
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f'No free connection after {self.checkout_timeout}s')
+                self._cond.wait(remaining)
+
+        wait_ms = (time.monotonic() - started) * 1000
+
+        try:
+            if conn is not None and not self._is_healthy(conn, released_at, suspect):
+                self._close_quietly(conn)
+                conn = None
+                with self._cond:
+                    self._error_at = time.monotonic()
+                    self._stats['reconnects'] += 1
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            self._discard_slot()
+            raise
+
+        self._record_wait(wait_ms)
+        return conn
+
+    def release(self, conn) -> None:
+        """Возврат соединения в пул; сломанные соединения закрываются"""
+
+        if conn is None:
+            return
+
+        if not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                self._close_quietly(conn)
+
+        if conn.closed:
+            self._discard_slot()
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        """Счётчики пула для подбора размера и таймаутов"""
+
+        with self._cond:
+            result = dict(self._stats)
+            result['size'] = self._size
+            result['idle'] = len(self._idle)
+            result['max_size'] = self.max_size
+        return result
+
+    def close_all(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, connection_factory=tracing.connection_factory())
+        conn.autocommit = False
+        with self._cond:
+            self._stats['connects'] += 1
+        return conn
+
+    def _is_healthy(self, conn, released_at: float, suspect: bool) -> bool:
+        if conn.closed:
+            return False
+        if not suspect and time.monotonic() - released_at < self.ping_after:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard_slot(self) -> None:
+        """Освобождение места сломанного соединения; остальные проверяются при следующей выдаче"""
+
+        with self._cond:
+            self._size -= 1
+            self._error_at = time.monotonic()
+            self._cond.notify()
+
+    def _record_wait(self, wait_ms: float) -> None:
+        with self._cond:
+            self._stats['checkouts'] += 1
+            self._stats['wait_ms_total'] += wait_ms
+            self._stats['last_wait_ms'] = wait_ms
+            if wait_ms > self._stats['wait_ms_max']:
+                self._stats['wait_ms_max'] = wait_ms
+        if wait_ms >= self.wait_log_ms:
+            print(json.dumps({'event': 'db_pool_wait', 'wait_ms': round(wait_ms, 2), **self.stats()}))
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(db_url: str) -> ConnectionPool:
+    """Пул уровня модуля, общий для всех вызовов handler в контейнере"""
+
+    global _pool
+
+    if _pool is not None and _pool.dsn == db_url:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool.dsn != db_url:
+            if _pool is not None:
+                _pool.close_all()
+            _pool = ConnectionPool(
+                db_url,
+                max_size=int(os.environ.get('DB_POOL_MAX_SIZE', '2')),
+                ping_after=float(os.environ.get('DB_POOL_PING_AFTER', '30')),
+                checkout_timeout=float(os.environ.get('DB_POOL_CHECKOUT_TIMEOUT', '5')),
+                wait_log_ms=float(os.environ.get('DB_POOL_WAIT_LOG_MS', '50'))
+            )
+        return _pool
+
+
+def acquire(db_url: str):
+    with tracing.span('db_acquire'):
+        return get_pool(db_url).acquire()
+
+
+def release(conn) -> None:
+    if _pool is not None:
+        _pool.release(conn)
+    elif conn is not None:
+        conn.close()
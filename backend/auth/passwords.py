@@ -0,0 +1,95 @@
+"""Хэширование паролей bcrypt в ограниченном пуле потоков; bcrypt загружается в пуле вместе с заготовленным хэшем"""
+
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+TARGET_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+MAX_WORKERS = int(os.environ.get('BCRYPT_WORKERS', '2'))
+MAX_PENDING = int(os.environ.get('BCRYPT_MAX_PENDING', str(MAX_WORKERS * 4)))
+TIMEOUT_SECONDS = float(os.environ.get('BCRYPT_TIMEOUT', '10'))
+
+
+class HasherBusy(Exception):
+    """Очередь хэширования переполнена или хэш не успел за TIMEOUT_SECONDS"""
+
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='bcrypt')
+_pending = threading.BoundedSemaphore(MAX_PENDING)
+
+
+def _wait(future):
+    try:
+        return future.result(timeout=TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        raise HasherBusy('Password operation timed out')
+
+
+def _run(fn, *args):
+    """bcrypt отпускает GIL, поэтому потоки пула выполняют хэши параллельно
+
+    Место в очереди освобождается, когда хэш закончен, а не когда вызывающий
+    перестал ждать: после таймаута задача продолжает занимать поток.
+    """
+
+    if not _pending.acquire(blocking=False):
+        raise HasherBusy('Too many password operations in progress')
+    try:
+        future = _executor.submit(fn, *args)
+    except BaseException:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda _: _pending.release())
+    return _wait(future)
+
+
+def _make_dummy_hash() -> str:
+    import bcrypt
+
+    salt = bcrypt.gensalt(rounds=TARGET_ROUNDS)
+    return bcrypt.hashpw(secrets.token_urlsafe(16).encode('utf-8'), salt).decode('utf-8')
+
+
+# Считается при старте пула, а не на первом входе с неизвестным email
+_dummy_hash = _executor.submit(_make_dummy_hash)
+
+
+def hash_password(password: str) -> str:
+    import bcrypt
+
+    salt = bcrypt.gensalt(rounds=TARGET_ROUNDS)
+    return _run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    import bcrypt
+
+    try:
+        return _run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        return False
+
+
+def verify_dummy(password: str) -> bool:
+    """Проверка против заготовленного хэша, чтобы вход с неизвестным email стоил столько же"""
+
+    verify_password(password, get_dummy_hash())
+    return False
+
+
+def get_dummy_hash() -> str:
+    return _wait(_dummy_hash)
+
+
+def hash_rounds(password_hash: str):
+    """Стоимость из хэша вида $2b$12$..."""
+
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash: str) -> bool:
+    return hash_rounds(password_hash) != TARGET_ROUNDS
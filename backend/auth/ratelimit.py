@@ -0,0 +1,126 @@
+"""Ограничение частоты запросов: token bucket в UNLOGGED-таблице rate_limits
+
+Правило «ёмкость/секунды»: ведро вмещает capacity запросов и пополняется
+целиком за seconds. Переопределение: RATE_LIMIT_<ПРАВИЛО>=capacity/seconds,
+например RATE_LIMIT_LOGIN_EMAIL=5/900.
+"""
+
+import json
+import math
+import os
+import random
+import re
+
+ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+PURGE_PROBABILITY = float(os.environ.get('RATE_LIMIT_PURGE_PROBABILITY', '0.001'))
+PURGE_IDLE_HOURS = 24
+PURGE_BATCH = 1000
+
+DEFAULT_RULES = {
+    'login_ip': '30/300',
+    'login_email': '5/900',
+    'register_ip': '10/3600',
+    'booking_ip': '20/3600',
+    'booking_phone': '5/3600'
+}
+
+REFILLED = 'LEAST(excluded.capacity, r.tokens + EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - r.updated_at) * excluded.rate)'
+
+
+class RateLimited(Exception):
+    """Лимит исчерпан; retry_after — секунды до появления токена"""
+
+    def __init__(self, rule: str, retry_after: int):
+        super().__init__(f'Rate limit exceeded for {rule}')
+        self.rule = rule
+        self.retry_after = retry_after
+
+
+def parse_rule(value: str) -> tuple:
+    """'5/900' → (ёмкость, токенов в секунду)"""
+
+    capacity, seconds = value.split('/')
+    return float(capacity), float(capacity) / float(seconds)
+
+
+RULES = {
+    name: parse_rule(os.environ.get(f'RATE_LIMIT_{name.upper()}', default))
+    for name, default in DEFAULT_RULES.items()
+}
+
+
+def client_ip(event: dict) -> str:
+    identity = (event.get('requestContext') or {}).get('identity') or {}
+    if identity.get('sourceIp'):
+        return identity['sourceIp']
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == 'x-forwarded-for' and value:
+            return value.split(',')[0].strip()
+    return 'unknown'
+
+
+def normalize_phone(phone: str) -> str:
+    return re.sub(r'\D', '', phone or '')
+
+
+def check(conn, schema: str, checks: list) -> None:
+    """checks — [(правило, значение ключа)], пустые значения пропускаются
+
+    Все ведра обновляются одним INSERT ... ON CONFLICT, и транзакция сразу
+    фиксируется, чтобы счётчики не откатились вместе с основной работой.
+    Вызывается до bcrypt и вставки заявки; при нехватке токена хотя бы в одном
+    ведре — RateLimited с наибольшим Retry-After.
+    """
+
+    if not ENABLED:
+        return
+
+    keys = {}
+    for rule, value in checks:
+        if value:
+            keys[f'{rule}:{str(value).lower()[:250]}'] = rule
+    if not keys:
+        return
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        INSERT INTO {schema}.rate_limits AS r (key, capacity, rate, tokens, last_allowed, allowed, rejected, updated_at)
+        SELECT key, capacity, rate, capacity - 1, true, 1, 0, CURRENT_TIMESTAMP
+        FROM unnest(%s::varchar[], %s::float8[], %s::float8[]) AS k(key, capacity, rate)
+        ON CONFLICT (key) DO UPDATE SET
+            capacity = excluded.capacity,
+            rate = excluded.rate,
+            tokens = {REFILLED} - CASE WHEN {REFILLED} >= 1 THEN 1 ELSE 0 END,
+            last_allowed = {REFILLED} >= 1,
+            allowed = r.allowed + CASE WHEN {REFILLED} >= 1 THEN 1 ELSE 0 END,
+            rejected = r.rejected + CASE WHEN {REFILLED} >= 1 THEN 0 ELSE 1 END,
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING key, last_allowed, tokens, rate
+    ''', (list(keys), [RULES[r][0] for r in keys.values()], [RULES[r][1] for r in keys.values()]))
+    rows = cursor.fetchall()
+    conn.commit()
+
+    if random.random() < PURGE_PROBABILITY:
+        purge_idle(conn, schema)
+
+    denied = [(keys[key], math.ceil((1 - tokens) / rate)) for key, allowed, tokens, rate in rows if not allowed]
+    if denied:
+        rule, retry_after = max(denied, key=lambda d: d[1])
+        print(json.dumps({'event': 'rate_limited', 'rule': rule, 'retry_after': retry_after}))
+        raise RateLimited(rule, max(retry_after, 1))
+
+
+def purge_idle(conn, schema: str) -> int:
+    """Удаление пачки давно не тронутых ведер — они всё равно полные"""
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        DELETE FROM {schema}.rate_limits
+        WHERE key IN (
+            SELECT key FROM {schema}.rate_limits
+            WHERE updated_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 hour'
+            LIMIT %s
+        )
+    ''', (PURGE_IDLE_HOURS, PURGE_BATCH))
+    conn.commit()
+    return cursor.rowcount
@@ -0,0 +1,499 @@
+import base64
+import json
+import os
+from datetime import datetime
+from psycopg2.extras import RealDictCursor
+
+import availability
+import db
+import dispatch
+import idempotency
+import outbox
+import pricing
+import ratelimit
+import tracing
+from responses import compressed, encode_rows, get_header, etag_response, replayed_response, success_response, error_response, too_many_requests_response
+from tokens import get_user_from_token
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+AVAILABILITY_ENFORCED = os.environ.get('AVAILABILITY_ENFORCED', '0') == '1'
+
+@tracing.traced('bookings')
+@compressed
+def handler(event: dict, context) -> dict:
+    """API для управления заявками на трансфер"""
+    
+    method = event.get('httpMethod', 'GET')
+    
+    try:
+        db_url = os.environ.get('DATABASE_URL')
+        schema = os.environ.get('MAIN_DB_SCHEMA', 'public')
+        jwt_secret = os.environ.get('JWT_SECRET_KEY')
+        
+        if not db_url:
+            return error_response('Database configuration error', 500)
+        
+        conn = db.acquire(db_url)
+        
+        query_params = event.get('queryStringParameters', {}) or {}
+        path_params = event.get('pathParams', {}) or {}
+        booking_id = query_params.get('id', path_params.get('id'))
+        action = query_params.get('action', '')
+        
+        if method == 'POST':
+            body = json.loads(event.get('body', '{}'))
+            idempotency.maybe_purge(conn, schema)
+            return create_booking(conn, schema, body, event, jwt_secret)
+        
+        elif method == 'GET':
+            if action == 'quote':
+                return get_quote(conn, schema, query_params)
+            elif action == 'availability':
+                return get_availability(conn, schema, query_params)
+            elif booking_id:
+                return get_booking(conn, schema, booking_id, event)
+            else:
+                return list_bookings(conn, schema, event, jwt_secret)
+        
+        elif method == 'PUT' and booking_id:
+            body = json.loads(event.get('body', '{}'))
+            return update_booking(conn, schema, booking_id, body, event, jwt_secret)
+        
+        elif method == 'DELETE' and booking_id:
+            return delete_booking(conn, schema, booking_id, event, jwt_secret)
+        
+        else:
+            return error_response('Method not allowed', 405)
+    
+    except Exception as e:
+        return error_response(f'Server error: {str(e)}', 500)
+    finally:
+        if 'conn' in locals():
+            db.release(conn)
+
+
+def create_booking(conn, schema: str, data: dict, event: dict, jwt_secret: str) -> dict:
+    """Создание новой заявки"""
+    
+    user = get_user_from_token(event, jwt_secret)
+    idempotency_key = get_header(event, 'Idempotency-Key').strip()
+    
+    if len(idempotency_key) > idempotency.MAX_KEY_LENGTH:
+        return error_response('Idempotency-Key is too long', 400)
+    
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        
+        user_id = user['user_id'] if user else None
+        fingerprint = idempotency.request_hash(data, user_id)
+        
+        if idempotency_key:
+            stored = idempotency.lookup(conn, schema, 'create_booking', idempotency_key, fingerprint)
+            if stored:
+                conn.rollback()
+                return replayed_response(*stored)
+        
+        ratelimit.check(conn, schema, [
+            ('booking_ip', ratelimit.client_ip(event)),
+            ('booking_phone', ratelimit.normalize_phone(data.get('guest_phone', data.get('phone', ''))))
+        ])
+        
+        if idempotency_key:
+            stored = idempotency.claim(conn, schema, 'create_booking', idempotency_key, fingerprint)
+            if stored:
+                return replayed_response(*stored)
+        
+        guest_name = data.get('guest_name', data.get('name', ''))
+        guest_phone = data.get('guest_phone', data.get('phone', ''))
+        guest_email = data.get('guest_email', data.get('email', ''))
+        
+        from_location = data.get('from_location', '')
+        to_location = data.get('to_location', '')
+        travel_date = data.get('travel_date', '')
+        travel_time = data.get('travel_time', '')
+        passengers = data.get('passengers', 1)
+        tariff_id = data.get('tariff_id')
+        payment_method = data.get('payment_method', 'prepay_50')
+        notes = data.get('notes', '')
+        
+        if not all([from_location, to_location, travel_date, travel_time]):
+            return error_response('Missing required fields', 400)
+        
+        if not user_id and not all([guest_name, guest_phone]):
+            return error_response('Guest name and phone are required for non-registered users', 400)
+        
+        trip_start = parse_trip_start(travel_date, travel_time)
+        
+        if not trip_start:
+            return error_response('travel_date must be YYYY-MM-DD and travel_time HH:MM', 400)
+        
+        quote = pricing.get_engine(conn, schema).quote(from_location, to_location, tariff_id, passengers)
+        
+        if not quote:
+            return error_response('Invalid tariff', 400)
+        
+        total_price = quote['total_price']
+        duration_minutes = quote['duration_minutes'] or dispatch.DEFAULT_DURATION_MINUTES
+        
+        if AVAILABILITY_ENFORCED:
+            if not availability.has_capacity(conn, schema, trip_start, duration_minutes,
+                                             quote['category'], quote['vehicles']):
+                return error_response('No vehicles available for the selected date and time', 409)
+        
+        cursor.execute(f'''
+            INSERT INTO {schema}.bookings 
+            (user_id, guest_name, guest_phone, guest_email, from_location, to_location,
+             travel_date, travel_time, duration_minutes, passengers, tariff_id, total_price, payment_method, notes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING id, status, created_at
+        ''', (user_id, guest_name, guest_phone, guest_email, from_location, to_location,
+              travel_date, travel_time, duration_minutes, passengers, tariff_id, total_price, payment_method, notes))
+        
+        booking = cursor.fetchone()
+        
+        outbox.enqueue(conn, schema, outbox.BOOKING_CREATED, booking['id'], {
+            'booking_id': booking['id'],
+            'created_at': booking['created_at'],
+            'user_id': user_id,
+            'user_email': user['email'] if user else None,
+            'guest_name': guest_name,
+            'guest_phone': guest_phone,
+            'guest_email': guest_email,
+            'from_location': from_location,
+            'to_location': to_location,
+            'travel_date': travel_date,
+            'travel_time': travel_time,
+            'passengers': passengers,
+            'tariff_name': quote['tariff_name'],
+            'total_price': total_price,
+            'payment_method': payment_method,
+            'notes': notes
+        })
+        
+        response = success_response({
+            'booking_id': booking['id'],
+            'status': booking['status'],
+            'total_price': total_price,
+            'message': 'Заявка успешно создана. Мы свяжемся с вами в течение 5 минут.'
+        })
+        
+        if idempotency_key:
+            idempotency.store(conn, schema, 'create_booking', idempotency_key, response)
+        
+        conn.commit()
+        
+        return response
+        
+    except ratelimit.RateLimited as e:
+        return too_many_requests_response('Too many bookings, try again later', e.retry_after)
+    except idempotency.KeyConflict as e:
+        conn.rollback()
+        return error_response(str(e), 409)
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Failed to create booking: {str(e)}', 500)
+
+
+def parse_trip_start(travel_date, travel_time):
+    """Начало поездки из даты YYYY-MM-DD и времени HH:MM[:SS] или None"""
+    
+    for time_format in ('%H:%M', '%H:%M:%S'):
+        try:
+            return datetime.strptime(f'{travel_date} {travel_time}', f'%Y-%m-%d {time_format}')
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def get_quote(conn, schema: str, query_params: dict) -> dict:
+    """Расчёт стоимости поездки для формы бронирования"""
+    
+    from_location = query_params.get('from', '')
+    to_location = query_params.get('to', '')
+    tariff_id = query_params.get('tariff_id')
+    
+    if not from_location or not to_location:
+        return error_response('Parameters from and to are required', 400)
+    
+    try:
+        passengers = int(query_params.get('passengers', 1))
+    except ValueError:
+        return error_response('Invalid passengers', 400)
+    
+    try:
+        engine = pricing.get_engine(conn, schema)
+    except Exception as e:
+        return error_response(f'Failed to load pricing: {str(e)}', 500)
+    
+    if tariff_id:
+        quote = engine.quote(from_location, to_location, tariff_id, passengers)
+        if not quote:
+            return error_response('Invalid tariff', 400)
+        return success_response(quote)
+    
+    quotes = [engine.quote(from_location, to_location, t_id, passengers) for t_id in sorted(engine.tariffs)]
+    return success_response({'quotes': quotes})
+
+
+def get_availability(conn, schema: str, query_params: dict) -> dict:
+    """Остаток машин по дням и временным слотам для календаря бронирования"""
+    
+    try:
+        date_from = datetime.strptime(query_params.get('from', ''), '%Y-%m-%d').date()
+        date_to = datetime.strptime(query_params.get('to', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return error_response('Parameters from and to must be dates in YYYY-MM-DD format', 400)
+    
+    if date_to < date_from or (date_to - date_from).days >= availability.MAX_RANGE_DAYS:
+        return error_response(f'Date range must be from 1 to {availability.MAX_RANGE_DAYS} days', 400)
+    
+    try:
+        return success_response(availability.calendar(conn, schema, date_from, date_to, query_params.get('category')))
+    except Exception as e:
+        return error_response(f'Failed to fetch availability: {str(e)}', 500)
+
+
+def list_bookings(conn, schema: str, event: dict, jwt_secret: str) -> dict:
+    """Получение списка заявок с курсорной пагинацией и фильтрами"""
+    
+    user = get_user_from_token(event, jwt_secret)
+    
+    if not user:
+        return error_response('Authentication required', 401)
+    
+    query_params = event.get('queryStringParameters', {}) or {}
+    
+    try:
+        limit = min(max(int(query_params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return error_response('Invalid limit', 400)
+    
+    conditions = []
+    values = []
+    
+    if user['role'] != 'admin':
+        conditions.append('b.user_id = %s')
+        values.append(user['user_id'])
+    
+    for field in ['status', 'payment_status', 'tariff_id']:
+        if query_params.get(field):
+            conditions.append(f'b.{field} = %s')
+            values.append(query_params[field])
+    
+    if query_params.get('date_from'):
+        conditions.append('b.travel_date >= %s')
+        values.append(query_params['date_from'])
+    
+    if query_params.get('date_to'):
+        conditions.append('b.travel_date <= %s')
+        values.append(query_params['date_to'])
+    
+    if query_params.get('cursor'):
+        cursor_position = decode_cursor(query_params['cursor'])
+        if not cursor_position:
+            return error_response('Invalid cursor', 400)
+        conditions.append('(b.created_at, b.id) < (%s, %s)')
+        values.extend(cursor_position)
+    
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    values.append(limit + 1)
+    
+    try:
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+            SELECT b.id, b.from_location, b.to_location, b.travel_date, b.travel_time, b.passengers,
+                   t.name as tariff_name, t.category,
+                   COALESCE(b.total_price, 0) as total_price,
+                   b.status, b.payment_status, b.payment_method, b.created_at,
+                   COALESCE(u.full_name, b.guest_name) as user_name,
+                   COALESCE(u.email, b.guest_email) as user_email,
+                   b.guest_phone as phone
+            FROM {schema}.bookings b
+            LEFT JOIN {schema}.tariffs t ON b.tariff_id = t.id
+            LEFT JOIN {schema}.users u ON b.user_id = u.id
+            {where_clause}
+            ORDER BY b.created_at DESC, b.id DESC
+            LIMIT %s
+        ''', values)
+        
+        rows = cursor.fetchall()
+        result = encode_rows(cursor, rows[:limit])
+        
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(result[-1]['created_at'], result[-1]['id'])
+        
+        return etag_response({'bookings': result, 'next_cursor': next_cursor}, event)
+        
+    except Exception as e:
+        return error_response(f'Failed to fetch bookings: {str(e)}', 500)
+
+
+def encode_cursor(created_at: datetime, booking_id: int) -> str:
+    """Курсор на позицию (created_at, id) последней выданной заявки"""
+    
+    raw = f'{created_at.isoformat()}|{booking_id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(value: str):
+    try:
+        raw = base64.urlsafe_b64decode(value.encode('ascii')).decode('utf-8')
+        created_at, booking_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), int(booking_id)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def get_booking(conn, schema: str, booking_id: str, event: dict) -> dict:
+    """Получение одной заявки"""
+    
+    try:
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+            SELECT b.id, b.user_id, b.guest_name, b.guest_phone, b.guest_email,
+                   b.from_location, b.to_location, b.travel_date, b.travel_time, b.passengers,
+                   b.tariff_id, b.vehicle_id, b.total_price, b.payment_method, b.payment_status,
+                   b.status, b.notes, b.created_at, b.updated_at,
+                   t.name as tariff_name, t.category, t.features,
+                   v.name as vehicle_name, v.model
+            FROM {schema}.bookings b
+            LEFT JOIN {schema}.tariffs t ON b.tariff_id = t.id
+            LEFT JOIN {schema}.vehicles v ON b.vehicle_id = v.id
+            WHERE b.id = %s
+        ''', (booking_id,))
+        
+        rows = encode_rows(cursor)
+        
+        if not rows:
+            return error_response('Booking not found', 404)
+        
+        result = rows[0]
+        result['total_price'] = result['total_price'] or 0
+        
+        return etag_response(result, event)
+        
+    except Exception as e:
+        return error_response(f'Failed to fetch booking: {str(e)}', 500)
+
+
+def update_booking(conn, schema: str, booking_id: str, data: dict, event: dict, jwt_secret: str) -> dict:
+    """Обновление заявки"""
+    
+    user = get_user_from_token(event, jwt_secret)
+    
+    if not user or user['role'] != 'admin':
+        return error_response('Admin access required', 403)
+    
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        
+        update_fields = []
+        values = []
+        
+        if 'status' in data:
+            update_fields.append('status = %s')
+            values.append(data['status'])
+        
+        if 'payment_status' in data:
+            # у онлайн-оплаты статус считается из платежей (payments.sync_booking_statuses)
+            cursor.execute(f'SELECT payment_method FROM {schema}.bookings WHERE id = %s', (booking_id,))
+            booking = cursor.fetchone()
+            if booking and booking['payment_method'] != 'cash':
+                return error_response('payment_status is set by payments for online-paid bookings', 409)
+            update_fields.append('payment_status = %s')
+            values.append(data['payment_status'])
+        
+        vehicle_id = data.get('vehicle_id')
+        
+        if vehicle_id is not None:
+            try:
+                vehicle_id = int(vehicle_id)
+            except (TypeError, ValueError):
+                return error_response('vehicle_id must be an integer', 400)
+            
+            rejection = dispatch.check_assignment(conn, schema, booking_id, vehicle_id)
+            if rejection:
+                conn.rollback()
+                status_code, message = rejection
+                return error_response(message, status_code)
+        
+        if 'vehicle_id' in data:
+            update_fields.append('vehicle_id = %s')
+            values.append(vehicle_id)
+        
+        if 'notes' in data:
+            update_fields.append('notes = %s')
+            values.append(data['notes'])
+        
+        if not update_fields:
+            return error_response('No fields to update', 400)
+        
+        update_fields.append('updated_at = CURRENT_TIMESTAMP')
+        values.append(booking_id)
+        
+        query = f'''
+            UPDATE {schema}.bookings
+            SET {', '.join(update_fields)}
+            WHERE id = %s
+            RETURNING id, status, payment_status
+        '''
+        
+        cursor.execute(query, values)
+        result = cursor.fetchone()
+        conn.commit()
+        
+        if not result:
+            return error_response('Booking not found', 404)
+        
+        return success_response({
+            'booking_id': result['id'],
+            'status': result['status'],
+            'payment_status': result['payment_status']
+        })
+        
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Failed to update booking: {str(e)}', 500)
+
+
+def delete_booking(conn, schema: str, booking_id: str, event: dict, jwt_secret: str) -> dict:
+    """Отмена заявки"""
+    
+    user = get_user_from_token(event, jwt_secret)
+    
+    if not user:
+        return error_response('Authentication required', 401)
+    
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        
+        if user['role'] == 'admin':
+            cursor.execute(f'''
+                UPDATE {schema}.bookings
+                SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+                RETURNING id
+            ''', (booking_id,))
+        else:
+            cursor.execute(f'''
+                UPDATE {schema}.bookings
+                SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND user_id = %s
+                RETURNING id
+            ''', (booking_id, user['user_id']))
+        
+        result = cursor.fetchone()
+        conn.commit()
+        
+        if not result:
+            return error_response('Booking not found or access denied', 404)
+        
+        return success_response({'message': 'Booking cancelled successfully'})
+        
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Failed to cancel booking: {str(e)}', 500)
@@ -0,0 +1,147 @@
+"""Календарь доступности автопарка по дням, слотам и категориям тарифа
+
+booking_capacity_usage хранит занятость по часам: заявка учитывается в каждом
+часе поездки столько раз, сколько машин ей нужно (триггер из V0014). Занятость
+слота — пик по его часам.
+"""
+
+import os
+from datetime import date, datetime, timedelta
+
+from catalog_cache import cache as catalog_cache
+from dispatch import DEFAULT_DURATION_MINUTES, normalize_category
+
+SLOT_HOURS = int(os.environ.get('AVAILABILITY_SLOT_HOURS', '3'))
+MAX_RANGE_DAYS = 93
+
+
+def slot_of(hour: int) -> int:
+    return hour // SLOT_HOURS
+
+
+def trip_hours(start: datetime, duration_minutes) -> list:
+    """(день, час) всех часов, которые задевает поездка; то же, что booking_trip_hours в БД"""
+
+    end = start + timedelta(minutes=duration_minutes or DEFAULT_DURATION_MINUTES)
+    hours = []
+    moment = start.replace(minute=0, second=0, microsecond=0)
+    while moment < end:
+        hours.append((moment.date(), moment.hour))
+        moment += timedelta(hours=1)
+    return hours
+
+
+def slot_label(slot: int) -> str:
+    start = slot * SLOT_HOURS
+    end = min(start + SLOT_HOURS, 24)
+    return f'{start:02d}:00-{end:02d}:00'
+
+
+def load_supply(conn, schema: str) -> dict:
+    """Число активных машин и мест по нормализованной категории"""
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT category, COUNT(*), COALESCE(SUM(seats), 0)
+        FROM {schema}.vehicles
+        WHERE is_active = true
+        GROUP BY category
+    ''')
+    supply = {}
+    for category, vehicles, seats in cursor.fetchall():
+        entry = supply.setdefault(normalize_category(category), {'vehicles': 0, 'seats': 0})
+        entry['vehicles'] += vehicles
+        entry['seats'] += seats
+    cursor.close()
+    return supply
+
+
+def get_supply(conn, schema: str) -> dict:
+    return catalog_cache.get(conn, schema, 'vehicle_supply', ('vehicles',), load_supply)
+
+
+def load_usage(conn, schema: str, date_from: date, date_to: date, category: str = None) -> dict:
+    """Одно чтение диапазона по первичному ключу: {(день, категория, час): [машины, пассажиры]}"""
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT day, category, hour, trips, passengers
+        FROM {schema}.booking_capacity_usage
+        WHERE day BETWEEN %s AND %s
+    ''', (date_from, date_to))
+
+    usage = {}
+    for day, row_category, hour, trips, passengers in cursor.fetchall():
+        key = (day, normalize_category(row_category), hour)
+        if category and key[1] != category:
+            continue
+        totals = usage.setdefault(key, [0, 0])
+        totals[0] += trips
+        totals[1] += passengers
+    cursor.close()
+    return usage
+
+
+def calendar(conn, schema: str, date_from: date, date_to: date, category: str = None) -> dict:
+    """Остаток машин и мест по дням и слотам; занятость слота — пик по его часам"""
+
+    category = normalize_category(category) if category else None
+    supply = get_supply(conn, schema)
+    usage = load_usage(conn, schema, date_from, date_to, category)
+    categories = [category] if category else sorted(supply)
+    slots = range(slot_of(23) + 1)
+
+    days = []
+    day = date_from
+    while day <= date_to:
+        by_category = {}
+        for cat in categories:
+            capacity = supply.get(cat, {'vehicles': 0, 'seats': 0})
+            slot_items = []
+            for slot in slots:
+                hours = [usage.get((day, cat, hour), (0, 0)) for hour in range(slot * SLOT_HOURS, min((slot + 1) * SLOT_HOURS, 24))]
+                trips = max(h[0] for h in hours)
+                passengers = max(h[1] for h in hours)
+                slot_items.append({
+                    'slot': slot_label(slot),
+                    'booked_trips': trips,
+                    'booked_passengers': passengers,
+                    'remaining_vehicles': max(capacity['vehicles'] - trips, 0)
+                })
+            by_category[cat] = {
+                'vehicles': capacity['vehicles'],
+                'seats': capacity['seats'],
+                'remaining_vehicles': sum(s['remaining_vehicles'] for s in slot_items),
+                'slots': slot_items
+            }
+        days.append({'date': str(day), 'categories': by_category})
+        day += timedelta(days=1)
+
+    return {'slot_hours': SLOT_HOURS, 'days': days}
+
+
+def lock_days(conn, schema: str, days, category: str) -> None:
+    """Блокировка (день, категория) до конца транзакции: проверка и вставка заявки не пересекаются с соседними"""
+
+    with conn.cursor() as cursor:
+        for day in sorted(set(days)):
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', (f'{schema}:capacity:{day}:{category}',))
+
+
+def has_capacity(conn, schema: str, start: datetime, duration_minutes, category: str, vehicles: int) -> bool:
+    """Хватает ли свободных машин категории на все часы, которые займёт поездка
+
+    Дни поездки остаются заблокированными до commit/rollback вызывающего.
+    """
+
+    category = normalize_category(category)
+    capacity = get_supply(conn, schema).get(category, {'vehicles': 0})['vehicles']
+    hours = trip_hours(start, duration_minutes)
+    lock_days(conn, schema, [day for day, _ in hours], category)
+    usage = load_usage(conn, schema, hours[0][0], hours[-1][0], category)
+
+    for day, hour in hours:
+        trips, _ = usage.get((day, category, hour), (0, 0))
+        if trips + vehicles > capacity:
+            return False
+    return True
@@ -0,0 +1,221 @@
+"""Распределение автомобилей по заявкам с индексом занятости по интервалам"""
+
+import bisect
+import os
+from datetime import datetime, timedelta
+
+from psycopg2.extras import RealDictCursor, execute_values
+
+import pricing
+
+DEFAULT_DURATION_MINUTES = int(os.environ.get('DISPATCH_DEFAULT_DURATION', '120'))
+BUFFER_MINUTES = int(os.environ.get('DISPATCH_BUFFER_MINUTES', '30'))
+
+CATEGORY_ALIASES = {
+    'эконом': 'economy',
+    'комфорт': 'comfort',
+    'вип': 'vip'
+}
+
+
+def normalize_category(value: str) -> str:
+    key = (value or '').strip().lower()
+    return CATEGORY_ALIASES.get(key, key)
+
+
+class VehicleSchedule:
+    """Интервалы одной машины, отсортированные по началу, с нарастающим максимумом концов
+
+    Уже назначенные поездки могут пересекаться между собой (ручные правки, длинные
+    маршруты), поэтому соседей по началу недостаточно: max_ends[j] — самый поздний
+    конец среди интервалов 0..j, и просмотр влево останавливается, как только он
+    не дотягивает до начала проверяемого интервала.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.intervals = []
+        self.max_ends = []
+
+    def conflict(self, start: datetime, end: datetime, ignore_booking_id=None):
+        """Заявка, пересекающаяся с [start, end), или None"""
+
+        j = bisect.bisect_left(self.starts, end) - 1
+        while j >= 0 and self.max_ends[j] > start:
+            other_start, other_end, booking_id = self.intervals[j]
+            if booking_id != ignore_booking_id and other_end > start:
+                return booking_id
+            j -= 1
+        return None
+
+    def add(self, start: datetime, end: datetime, booking_id) -> None:
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.intervals.insert(i, (start, end, booking_id))
+        self.max_ends.insert(i, end)
+        running = self.max_ends[i - 1] if i else end
+        for j in range(i, len(self.max_ends)):
+            running = max(running, self.intervals[j][1])
+            self.max_ends[j] = running
+
+
+def trip_window(engine, booking: dict) -> tuple:
+    """Интервал занятости машины; длительность берётся из маршрута с той же нормализацией точек, что и в расчёте цены"""
+
+    route = engine.find_route(booking['from_location'], booking['to_location'])
+    duration_minutes = route['duration_minutes'] if route else None
+    start = datetime.combine(booking['travel_date'], booking['travel_time'])
+    minutes = (duration_minutes or DEFAULT_DURATION_MINUTES) + BUFFER_MINUTES
+    return start, start + timedelta(minutes=minutes)
+
+
+def load_schedules(conn, schema: str, date_from, date_to, vehicle_id=None) -> dict:
+    """Занятость машин по назначенным активным заявкам в диапазоне дат (±1 день на ночные поездки)"""
+
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    vehicle_filter = 'AND b.vehicle_id = %s' if vehicle_id is not None else ''
+    values = [date_from, date_to] + ([vehicle_id] if vehicle_id is not None else [])
+
+    cursor.execute(f'''
+        SELECT b.id, b.vehicle_id, b.travel_date, b.travel_time, b.from_location, b.to_location
+        FROM {schema}.bookings b
+        WHERE b.vehicle_id IS NOT NULL
+          AND b.status <> 'cancelled'
+          AND b.travel_date BETWEEN %s::date - 1 AND %s::date + 1
+          {vehicle_filter}
+    ''', values)
+
+    engine = pricing.get_engine(conn, schema)
+    schedules = {}
+    for row in cursor.fetchall():
+        start, end = trip_window(engine, row)
+        schedules.setdefault(row['vehicle_id'], VehicleSchedule()).add(start, end, row['id'])
+    cursor.close()
+    return schedules
+
+
+def lock_days(conn, schema: str, day) -> None:
+    """Блокировка дня и соседних (окно load_schedules) до конца транзакции вместо блокировки машин"""
+
+    with conn.cursor() as cursor:
+        for offset in (-1, 0, 1):
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', (f'{schema}:dispatch:{day + timedelta(days=offset)}',))
+
+
+def check_assignment(conn, schema: str, booking_id, vehicle_id):
+    """Код ответа и текст причины отказа в ручном назначении машины или None, если назначение допустимо
+
+    Строка заявки и дни вокруг поездки (lock_days) блокируются до конца транзакции
+    вызывающего: параллельные назначения на эти дни (и auto_assign) проверяют
+    расписание по очереди.
+    """
+
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute(f'''
+        SELECT b.id, b.travel_date, b.travel_time, b.from_location, b.to_location, b.passengers, t.category
+        FROM {schema}.bookings b
+        LEFT JOIN {schema}.tariffs t ON b.tariff_id = t.id
+        WHERE b.id = %s
+        FOR UPDATE OF b
+    ''', (booking_id,))
+    booking = cursor.fetchone()
+
+    if not booking:
+        cursor.close()
+        return 404, 'Booking not found'
+
+    lock_days(conn, schema, booking['travel_date'])
+    cursor.execute(f'SELECT id, category, seats, is_active FROM {schema}.vehicles WHERE id = %s', (vehicle_id,))
+    vehicle = cursor.fetchone()
+    cursor.close()
+
+    if not vehicle:
+        return 409, 'Vehicle not found'
+    if not vehicle['is_active']:
+        return 409, 'Vehicle is not active'
+    if vehicle['seats'] < booking['passengers']:
+        return 409, 'Vehicle does not have enough seats'
+    if booking['category'] and normalize_category(vehicle['category']) != normalize_category(booking['category']):
+        return 409, 'Vehicle category does not match tariff'
+
+    schedule = load_schedules(conn, schema, booking['travel_date'], booking['travel_date'], vehicle['id']).get(vehicle['id'])
+    if schedule:
+        start, end = trip_window(pricing.get_engine(conn, schema), booking)
+        conflict_id = schedule.conflict(start, end, ignore_booking_id=booking['id'])
+        if conflict_id:
+            return 409, f'Vehicle is already assigned to booking {conflict_id} at that time'
+
+    return None
+
+
+def auto_assign(conn, schema: str, day) -> dict:
+    """Жадное распределение неназначенных подтверждённых заявок дня по свободным машинам"""
+
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    cursor.execute(f'''
+        SELECT b.id, b.travel_date, b.travel_time, b.from_location, b.to_location, b.passengers, t.category
+        FROM {schema}.bookings b
+        LEFT JOIN {schema}.tariffs t ON b.tariff_id = t.id
+        WHERE b.travel_date = %s
+          AND b.status = 'confirmed'
+          AND b.vehicle_id IS NULL
+        ORDER BY b.travel_time, b.id
+        FOR UPDATE OF b
+    ''', (day,))
+    pending = cursor.fetchall()
+
+    # дни блокируются после заявок — в том же порядке, что и в check_assignment
+    lock_days(conn, schema, day)
+    cursor.execute(f'''
+        SELECT id, category, seats FROM {schema}.vehicles
+        WHERE is_active = true
+        ORDER BY seats, id
+    ''')
+    vehicles = cursor.fetchall()
+    cursor.close()
+
+    engine = pricing.get_engine(conn, schema)
+    schedules = load_schedules(conn, schema, day, day)
+    assigned = []
+    unassigned = []
+
+    for booking in pending:
+        start, end = trip_window(engine, booking)
+        category = normalize_category(booking['category'])
+        chosen = None
+
+        # машины отсортированы по числу мест: берём самую маленькую подходящую свободную
+        for vehicle in vehicles:
+            if vehicle['seats'] < booking['passengers']:
+                continue
+            if category and normalize_category(vehicle['category']) != category:
+                continue
+            schedule = schedules.setdefault(vehicle['id'], VehicleSchedule())
+            if schedule.conflict(start, end) is None:
+                chosen = vehicle
+                schedule.add(start, end, booking['id'])
+                break
+
+        if chosen:
+            assigned.append((booking['id'], chosen['id']))
+        else:
+            unassigned.append({'booking_id': booking['id'], 'reason': 'No free vehicle of matching category and size'})
+
+    if assigned:
+        cursor = conn.cursor()
+        execute_values(cursor, f'''
+            UPDATE {schema}.bookings AS b
+            SET vehicle_id = v.vehicle_id, updated_at = CURRENT_TIMESTAMP
+            FROM (VALUES %s) AS v(id, vehicle_id)
+            WHERE b.id = v.id
+        ''', assigned)
+        cursor.close()
+
+    conn.commit()
+
+    return {
+        'date': str(day),
+        'assigned': [{'booking_id': b, 'vehicle_id': v} for b, v in assigned],
+        'unassigned': unassigned
+    }
@@ -0,0 +1,126 @@
+"""Идемпотентное создание заявок по заголовку Idempotency-Key"""
+
+import hashlib
+import json
+import os
+import random
+
+TTL_HOURS = int(os.environ.get('IDEMPOTENCY_TTL_HOURS', '24'))
+PURGE_PROBABILITY = float(os.environ.get('IDEMPOTENCY_PURGE_PROBABILITY', '0.01'))
+PURGE_BATCH = int(os.environ.get('IDEMPOTENCY_PURGE_BATCH', '1000'))
+MAX_KEY_LENGTH = 255
+
+
+class KeyConflict(Exception):
+    """Ключ уже использован с другим телом запроса"""
+
+
+def request_hash(data: dict, user_id) -> str:
+    canonical = json.dumps({'user_id': user_id, 'body': data}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def lookup(conn, schema: str, scope: str, key: str, fingerprint: str):
+    """Сохранённый ответ завершённого запроса по ключу без захвата ключа или None
+
+    Повтор отдаётся до лимита частоты, чтобы клиент, переспрашивающий результат,
+    не расходовал ведро; новые и незавершённые запросы идут через claim.
+    """
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT request_hash, status_code, response_body
+        FROM {schema}.idempotency_keys
+        WHERE scope = %s AND key = %s AND status_code IS NOT NULL AND expires_at >= CURRENT_TIMESTAMP
+    ''', (scope, key))
+    row = cursor.fetchone()
+    cursor.close()
+
+    if row is None:
+        return None
+
+    stored_hash, status_code, response_body = row
+
+    if stored_hash != fingerprint:
+        raise KeyConflict('Idempotency-Key was already used with a different request')
+
+    return status_code, response_body
+
+
+def claim(conn, schema: str, scope: str, key: str, fingerprint: str):
+    """Занимает ключ в текущей транзакции; при повторе возвращает сохранённый ответ
+
+    Параллельный дубль ждёт на уникальном индексе, пока первая транзакция не
+    завершится, и затем видит её сохранённый ответ.
+    """
+
+    cursor = conn.cursor()
+
+    for _ in range(2):
+        cursor.execute(f'''
+            INSERT INTO {schema}.idempotency_keys (scope, key, request_hash, expires_at)
+            VALUES (%s, %s, %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 hour')
+            ON CONFLICT (scope, key) DO NOTHING
+            RETURNING key
+        ''', (scope, key, fingerprint, TTL_HOURS))
+
+        if cursor.fetchone():
+            return None
+
+        cursor.execute(f'''
+            SELECT request_hash, status_code, response_body, expires_at < CURRENT_TIMESTAMP
+            FROM {schema}.idempotency_keys
+            WHERE scope = %s AND key = %s
+        ''', (scope, key))
+        row = cursor.fetchone()
+
+        if row is None:
+            continue
+
+        stored_hash, status_code, response_body, expired = row
+
+        if expired:
+            cursor.execute(f'DELETE FROM {schema}.idempotency_keys WHERE scope = %s AND key = %s', (scope, key))
+            continue
+
+        if stored_hash != fingerprint:
+            raise KeyConflict('Idempotency-Key was already used with a different request')
+
+        return status_code, response_body
+
+    raise KeyConflict('Idempotency-Key is being processed, retry later')
+
+
+def store(conn, schema: str, scope: str, key: str, response: dict) -> None:
+    """Сохранение ответа в той же транзакции, что и сама заявка"""
+
+    body = response.get('body', '')
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        UPDATE {schema}.idempotency_keys
+        SET status_code = %s, response_body = %s, response_hash = %s
+        WHERE scope = %s AND key = %s
+    ''', (response['statusCode'], body, hashlib.sha256(body.encode('utf-8')).hexdigest(), scope, key))
+
+
+def maybe_purge(conn, schema: str) -> None:
+    """Изредка удаляет пачку просроченных ключей в том же соединении"""
+
+    if random.random() < PURGE_PROBABILITY:
+        purge_expired(conn, schema)
+
+
+def purge_expired(conn, schema: str) -> int:
+    """Удаление не больше PURGE_BATCH просроченных ключей; остальные уйдут при следующих запросах"""
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        DELETE FROM {schema}.idempotency_keys
+        WHERE ctid IN (
+            SELECT ctid FROM {schema}.idempotency_keys
+            WHERE expires_at < CURRENT_TIMESTAMP
+            LIMIT %s
+        )
+    ''', (PURGE_BATCH,))
+    conn.commit()
+    return cursor.rowcount
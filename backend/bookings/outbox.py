@@ -0,0 +1,15 @@
+"""Запись событий в outbox в транзакции вызывающего кода"""
+
+import json
+
+BOOKING_CREATED = 'booking.created'
+
+
+def enqueue(conn, schema: str, topic: str, aggregate_id: int, payload: dict) -> None:
+    """Событие видно воркеру только после commit той же транзакции"""
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        INSERT INTO {schema}.outbox_events (topic, aggregate_id, payload)
+        VALUES (%s, %s, %s::jsonb)
+    ''', (topic, aggregate_id, json.dumps(payload, ensure_ascii=False, default=str)))
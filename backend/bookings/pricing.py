@@ -0,0 +1,144 @@
+"""Расчёт стоимости трансфера по маршрутам и тарифам"""
+
+import math
+import re
+from decimal import Decimal, ROUND_HALF_UP
+
+from psycopg2.extras import RealDictCursor
+
+from catalog_cache import cache as catalog_cache
+
+LOCATION_ALIASES = {
+    'аэропорт адлер': 'аэропорт сочи',
+    'адлер аэропорт': 'аэропорт сочи',
+    'аэропорт сочи адлер': 'аэропорт сочи',
+    'сочи аэропорт': 'аэропорт сочи',
+    'aer': 'аэропорт сочи',
+    'sochi airport': 'аэропорт сочи',
+    'adler airport': 'аэропорт сочи',
+    'gagra': 'гагра',
+    'pitsunda': 'пицунда',
+    'сухуми': 'сухум',
+    'sukhum': 'сухум',
+    'sukhumi': 'сухум',
+    'new athos': 'новый афон',
+    'novy afon': 'новый афон',
+    'gudauta': 'гудаута',
+    'озеро рица': 'рица',
+    'lake ritsa': 'рица',
+    'ritsa': 'рица'
+}
+
+CENTS = Decimal('0.01')
+
+
+def normalize_location(value: str) -> str:
+    """Приведение названия точки к ключу индекса: регистр, пробелы, пунктуация, синонимы"""
+
+    key = (value or '').lower().replace('ё', 'е')
+    key = re.sub(r'[^\w\s]', ' ', key)
+    key = ' '.join(key.split())
+    return LOCATION_ALIASES.get(key, key)
+
+
+class PricingEngine:
+    """Маршруты и тарифы в памяти с заранее рассчитанной матрицей цен"""
+
+    def __init__(self):
+        self.routes = {}
+        self.tariffs = {}
+        self.prices = {}
+
+    def load(self, conn, schema: str) -> None:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+        cursor.execute(f'''
+            SELECT id, from_location, to_location, distance_km, duration_minutes, base_price
+            FROM {schema}.routes
+            WHERE is_active = true
+        ''')
+        route_rows = cursor.fetchall()
+
+        cursor.execute(f'''
+            SELECT id, name, category, base_price, price_per_km, max_passengers
+            FROM {schema}.tariffs
+            WHERE is_active = true
+        ''')
+        tariff_rows = cursor.fetchall()
+        cursor.close()
+
+        routes = {}
+        for route in route_rows:
+            from_key = normalize_location(route['from_location'])
+            to_key = normalize_location(route['to_location'])
+            routes[(from_key, to_key)] = route
+            routes.setdefault((to_key, from_key), route)
+
+        tariffs = {t['id']: t for t in tariff_rows}
+
+        prices = {}
+        for route in route_rows:
+            for tariff in tariff_rows:
+                prices[(route['id'], tariff['id'])] = vehicle_price(route, tariff)
+
+        self.routes, self.tariffs, self.prices = routes, tariffs, prices
+
+    def find_route(self, from_location: str, to_location: str):
+        return self.routes.get((normalize_location(from_location), normalize_location(to_location)))
+
+    def quote(self, from_location: str, to_location: str, tariff_id, passengers: int):
+        """Расчёт стоимости; None, если тариф неизвестен или не активен"""
+
+        try:
+            tariff = self.tariffs.get(int(tariff_id))
+        except (TypeError, ValueError):
+            return None
+
+        if not tariff:
+            return None
+
+        route = self.find_route(from_location, to_location)
+        passengers = max(int(passengers or 1), 1)
+        vehicles = math.ceil(passengers / tariff['max_passengers']) if tariff['max_passengers'] else 1
+
+        if route:
+            per_vehicle = self.prices[(route['id'], tariff['id'])]
+        else:
+            per_vehicle = Decimal(tariff['base_price'])
+
+        return {
+            'tariff_id': tariff['id'],
+            'tariff_name': tariff['name'],
+            'category': tariff['category'],
+            'route_id': route['id'] if route else None,
+            'distance_km': float(route['distance_km']) if route and route['distance_km'] is not None else None,
+            'duration_minutes': route['duration_minutes'] if route else None,
+            'passengers': passengers,
+            'vehicles': vehicles,
+            'price_per_vehicle': float(per_vehicle),
+            'total_price': float((per_vehicle * vehicles).quantize(CENTS, ROUND_HALF_UP))
+        }
+
+
+def vehicle_price(route: dict, tariff: dict) -> Decimal:
+    """Цена одной машины: километраж по тарифу, но не ниже минимальной стоимости тарифа"""
+
+    tariff_base = Decimal(tariff['base_price'])
+
+    if tariff['price_per_km'] is not None and route['distance_km'] is not None:
+        distance_price = Decimal(route['distance_km']) * Decimal(tariff['price_per_km'])
+        return max(tariff_base, distance_price).quantize(CENTS, ROUND_HALF_UP)
+
+    return max(tariff_base, Decimal(route['base_price'])).quantize(CENTS, ROUND_HALF_UP)
+
+
+def build_engine(conn, schema: str) -> PricingEngine:
+    engine = PricingEngine()
+    engine.load(conn, schema)
+    return engine
+
+
+def get_engine(conn, schema: str) -> PricingEngine:
+    """Движок из кэша справочников; пересобирается при смене версии маршрутов или тарифов"""
+
+    return catalog_cache.get(conn, schema, 'pricing', ('routes', 'tariffs'), build_engine)
@@ -0,0 +1,99 @@
+"""Проверка JWT с кэшем уже проверенных токенов; jwt загружается только при наличии токена"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import tracing
+
+AUTH_HEADERS = ('x-authorization', 'authorization')
+
+
+class VerifiedTokenCache:
+    """LRU токен → claims; записи живут не дольше exp токена, наружу отдаются копии claims"""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str, jwt_secret: str):
+        with self._lock:
+            item = self._items.get(token)
+            if item is None:
+                self.misses += 1
+                return None
+            claims, secret, expires_at = item
+            if secret != jwt_secret or (expires_at is not None and expires_at <= time.time()):
+                del self._items[token]
+                self.misses += 1
+                return None
+            self._items.move_to_end(token)
+            self.hits += 1
+            return dict(claims)
+
+    def put(self, token: str, jwt_secret: str, claims: dict) -> None:
+        expires_at = claims.get('exp')
+        with self._lock:
+            self._items[token] = (dict(claims), jwt_secret, expires_at)
+            self._items.move_to_end(token)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+token_cache = VerifiedTokenCache(max_size=int(os.environ.get('TOKEN_CACHE_SIZE', '256')))
+
+
+def get_bearer_token(event: dict):
+    """Токен из X-Authorization или Authorization, имена заголовков без учёта регистра"""
+
+    headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+
+    for name in AUTH_HEADERS:
+        value = (headers.get(name) or '').strip()
+        if value[:7].lower() == 'bearer ':
+            return value[7:].strip()
+
+    return None
+
+
+def decode_token(token: str, jwt_secret: str, quiet: bool = False):
+    """Claims токена; с quiet неверный токен даёт None, иначе исключения jwt пробрасываются как есть
+
+    jwt загружается только при промахе кэша.
+    """
+
+    claims = token_cache.get(token, jwt_secret)
+    if claims is not None:
+        return claims
+
+    import jwt
+
+    try:
+        with tracing.span('jwt'):
+            claims = jwt.decode(token, jwt_secret, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        if quiet:
+            return None
+        raise
+    token_cache.put(token, jwt_secret, claims)
+    return claims
+
+
+def get_user_from_token(event: dict, jwt_secret: str = None):
+    """Извлечение данных пользователя из JWT токена"""
+
+    jwt_secret = jwt_secret or os.environ.get('JWT_SECRET_KEY')
+
+    if not jwt_secret:
+        return None
+
+    token = get_bearer_token(event)
+
+    if not token:
+        return None
+
+    return decode_token(token, jwt_secret, quiet=True)
@@ -0,0 +1,47 @@
+"""Функция уведомлений: разбор outbox по таймеру или по HTTP-вызову с секретом"""
+
+import hmac
+import os
+
+import db
+import senders
+import tracing
+import worker
+from responses import get_header, success_response, error_response
+
+
+@tracing.traced('notifier')
+def handler(event: dict, context) -> dict:
+    """Отправка накопленных уведомлений о новых заявках"""
+
+    if event.get('httpMethod'):
+        secret = os.environ.get('NOTIFIER_SECRET')
+        provided = get_header(event, 'X-Notifier-Secret')
+
+        if not secret:
+            return error_response('Notifier secret is not configured', 500)
+
+        if not hmac.compare_digest(provided.encode('utf-8'), secret.encode('utf-8')):
+            return error_response('Forbidden', 403)
+
+    db_url = os.environ.get('DATABASE_URL')
+    schema = os.environ.get('MAIN_DB_SCHEMA', 'public')
+
+    if not db_url:
+        return error_response('Database configuration error', 500)
+
+    try:
+        channels = senders.from_env()
+    except ValueError as e:
+        return error_response(str(e), 500)
+
+    try:
+        conn = db.acquire(db_url)
+        return success_response(worker.drain(conn, schema, channels))
+    except Exception as e:
+        if 'conn' in locals():
+            conn.rollback()
+        return error_response(f'Drain failed: {str(e)}', 500)
+    finally:
+        if 'conn' in locals():
+            db.release(conn)
@@ -0,0 +1,152 @@
+"""Каналы доставки уведомлений; набор задаётся NOTIFY_SENDERS через запятую"""
+
+import json
+import os
+import smtplib
+import threading
+import urllib.parse
+import urllib.request
+from email.message import EmailMessage
+
+SEND_TIMEOUT = float(os.environ.get('NOTIFY_SEND_TIMEOUT', '10'))
+
+PAYMENT_METHODS = {
+    'prepay_50': 'предоплата 50%',
+    'full_payment': 'полная оплата',
+    'cash': 'наличными'
+}
+
+
+def format_message(topic: str, payload: dict) -> str:
+    """Текст уведомления для диспетчера"""
+
+    if topic != 'booking.created':
+        return f'{topic}: {json.dumps(payload, ensure_ascii=False)}'
+
+    customer = payload.get('guest_name') or payload.get('user_email') or '—'
+    lines = [
+        f'Новая заявка №{payload.get("booking_id")}',
+        f'{payload.get("from_location")} → {payload.get("to_location")}',
+        f'{payload.get("travel_date")} {payload.get("travel_time")}, пассажиров: {payload.get("passengers")}',
+        f'Тариф: {payload.get("tariff_name")}, {payload.get("total_price")} ₽, '
+        f'{PAYMENT_METHODS.get(payload.get("payment_method"), payload.get("payment_method"))}',
+        f'Клиент: {customer}, {payload.get("guest_phone") or "—"}, {payload.get("guest_email") or payload.get("user_email") or "—"}'
+    ]
+    if payload.get('notes'):
+        lines.append(f'Комментарий: {payload["notes"]}')
+    return '\n'.join(lines)
+
+
+class StdoutSender:
+    """Строка JSON в stdout — для локального запуска и логов функции"""
+
+    name = 'stdout'
+
+    def send(self, topic: str, payload: dict) -> None:
+        print(json.dumps({'event': 'notification', 'topic': topic, 'payload': payload}, ensure_ascii=False))
+
+    @classmethod
+    def from_env(cls):
+        return cls()
+
+
+class FileSender:
+    """Дописывает уведомления в NDJSON-файл; удобно проверять в тестах"""
+
+    name = 'file'
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, topic: str, payload: dict) -> None:
+        line = json.dumps({'topic': topic, 'payload': payload, 'text': format_message(topic, payload)}, ensure_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get('NOTIFY_FILE_PATH', '/tmp/notifications.ndjson'))
+
+
+class TelegramSender:
+    """Сообщение в чат диспетчеров через Bot API"""
+
+    name = 'telegram'
+
+    def __init__(self, bot_token: str, chat_id: str):
+        self.url = f'https://api.telegram.org/bot{bot_token}/sendMessage'
+        self.chat_id = chat_id
+
+    def send(self, topic: str, payload: dict) -> None:
+        data = urllib.parse.urlencode({'chat_id': self.chat_id, 'text': format_message(topic, payload)}).encode('utf-8')
+        with urllib.request.urlopen(self.url, data=data, timeout=SEND_TIMEOUT) as response:
+            result = json.loads(response.read().decode('utf-8'))
+        if not result.get('ok'):
+            raise RuntimeError(f'Telegram error: {result.get("description")}')
+
+    @classmethod
+    def from_env(cls):
+        return cls(_required('TELEGRAM_BOT_TOKEN'), _required('TELEGRAM_CHAT_ID'))
+
+
+class SmtpSender:
+    """Письмо на адрес диспетчерской через SMTP с STARTTLS"""
+
+    name = 'smtp'
+
+    def __init__(self, host: str, port: int, user: str, password: str, sender: str, recipients: list):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.sender = sender
+        self.recipients = recipients
+
+    def send(self, topic: str, payload: dict) -> None:
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message['Subject'] = format_message(topic, payload).split('\n', 1)[0]
+        message.set_content(format_message(topic, payload))
+
+        with smtplib.SMTP(self.host, self.port, timeout=SEND_TIMEOUT) as smtp:
+            smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+            smtp.send_message(message)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            _required('SMTP_HOST'),
+            int(os.environ.get('SMTP_PORT', '587')),
+            os.environ.get('SMTP_USER', ''),
+            os.environ.get('SMTP_PASSWORD', ''),
+            _required('NOTIFY_EMAIL_FROM'),
+            [a.strip() for a in _required('NOTIFY_EMAIL_TO').split(',') if a.strip()]
+        )
+
+
+SENDERS = {cls.name: cls for cls in (StdoutSender, FileSender, TelegramSender, SmtpSender)}
+
+
+def register(sender_class) -> None:
+    """Подключение своего канала: класс с name, send(topic, payload) и from_env()"""
+
+    SENDERS[sender_class.name] = sender_class
+
+
+def from_env() -> list:
+    names = [n.strip() for n in os.environ.get('NOTIFY_SENDERS', 'stdout').split(',') if n.strip()]
+    unknown = [n for n in names if n not in SENDERS]
+    if unknown:
+        raise ValueError(f'Unknown senders: {", ".join(unknown)}, expected one of: {", ".join(SENDERS)}')
+    return [SENDERS[n].from_env() for n in names]
+
+
+def _required(name: str) -> str:
+    value = os.environ.get(name)
+    if not value:
+        raise ValueError(f'{name} is not set')
+    return value
@@ -0,0 +1,165 @@
+"""Замеры фаз обработки запроса: Server-Timing и одна строка JSON-лога на вызов
+
+Включается переменной TRACING_ENABLED=1. В выключенном состоянии span() отдаёт
+общий пустой контекст, а пул создаёт обычные соединения без обёрток курсоров.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import re
+import threading
+import time
+
+import psycopg2.extensions
+
+ENABLED = os.environ.get('TRACING_ENABLED', '') in ('1', 'true', 'yes')
+SLOW_QUERY_MS = float(os.environ.get('TRACING_SLOW_QUERY_MS', '100'))
+MAX_LOGGED_QUERIES = int(os.environ.get('TRACING_MAX_QUERIES', '50'))
+
+_local = threading.local()
+_noop = contextlib.nullcontext()
+
+
+class Trace:
+    def __init__(self, function: str, event: dict):
+        self.function = function
+        self.method = event.get('httpMethod', 'GET')
+        self.query = event.get('queryStringParameters') or {}
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.queries = []
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - started) * 1000)
+
+    def add(self, name: str, duration_ms: float) -> None:
+        total, count = self.spans.get(name, (0.0, 0))
+        self.spans[name] = (total + duration_ms, count + 1)
+
+    def record_query(self, sql, rows: int, duration_ms: float) -> None:
+        self.add('db', duration_ms)
+        self.queries.append({
+            'sql': normalize_sql(sql),
+            'rows': rows,
+            'ms': round(duration_ms, 3),
+            'slow': duration_ms >= SLOW_QUERY_MS
+        })
+
+    def server_timing(self, total_ms: float) -> str:
+        parts = []
+        for name, (duration, count) in self.spans.items():
+            parts.append(f'{name};dur={duration:.2f};desc="{count}x"')
+        parts.append(f'total;dur={total_ms:.2f}')
+        return ', '.join(parts)
+
+    def log_record(self, status: int, total_ms: float) -> dict:
+        return {
+            'event': 'invocation',
+            'function': self.function,
+            'method': self.method,
+            'action': self.query.get('action') or self.query.get('resource'),
+            'status': status,
+            'duration_ms': round(total_ms, 3),
+            'spans': {name: round(duration, 3) for name, (duration, _) in self.spans.items()},
+            'query_count': len(self.queries),
+            'queries': self.queries[:MAX_LOGGED_QUERIES],
+            'slow_queries': [q for q in self.queries if q['slow']]
+        }
+
+
+def normalize_sql(sql) -> str:
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = ' '.join(str(sql).split())
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+\b', '?', sql)
+    return sql[:300]
+
+
+def current():
+    return getattr(_local, 'trace', None)
+
+
+def span(name: str):
+    """Контекст замера фазы; без активной трассировки ничего не делает"""
+
+    trace = getattr(_local, 'trace', None)
+    return trace.span(name) if trace is not None else _noop
+
+
+def traced(function: str):
+    """Декоратор handler: трассировка вызова, заголовок Server-Timing и строка лога"""
+
+    def decorator(handler):
+        if not ENABLED:
+            return handler
+
+        @functools.wraps(handler)
+        def wrapper(event: dict, context) -> dict:
+            if event.get('httpMethod') == 'OPTIONS':
+                return handler(event, context)
+
+            trace = Trace(function, event)
+            _local.trace = trace
+            try:
+                response = handler(event, context)
+            finally:
+                _local.trace = None
+
+            total_ms = (time.perf_counter() - trace.started) * 1000
+            headers = response.setdefault('headers', {})
+            headers['Server-Timing'] = trace.server_timing(total_ms)
+            headers['Access-Control-Expose-Headers'] = ', '.join(
+                filter(None, [headers.get('Access-Control-Expose-Headers'), 'Server-Timing']))
+            print(json.dumps(trace.log_record(response.get('statusCode', 200), total_ms), ensure_ascii=False, default=str))
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+_traced_cursor_classes = {}
+
+
+def traced_cursor_class(base):
+    """Подкласс курсора, замеряющий каждый execute"""
+
+    cls = _traced_cursor_classes.get(base)
+    if cls is not None:
+        return cls
+
+    class TracedCursor(base):
+        def execute(self, query, vars=None):
+            trace = getattr(_local, 'trace', None)
+            if trace is None:
+                return super().execute(query, vars)
+            started = time.perf_counter()
+            try:
+                return super().execute(query, vars)
+            finally:
+                trace.record_query(query, self.rowcount, (time.perf_counter() - started) * 1000)
+
+    TracedCursor.__name__ = f'Traced{base.__name__}'
+    _traced_cursor_classes[base] = TracedCursor
+    return TracedCursor
+
+
+class TracedConnection(psycopg2.extensions.connection):
+    """Соединение, выдающее курсоры с замером запросов при любой cursor_factory"""
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs['cursor_factory'] = traced_cursor_class(factory)
+        return super().cursor(*args, **kwargs)
+
+
+def connection_factory():
+    return TracedConnection if ENABLED else None
@@ -0,0 +1,199 @@
+"""Разбор outbox_events: пачки с арендой строк, повторы с экспоненциальной паузой
+
+Пачка захватывается коротким UPDATE ... FOR UPDATE SKIP LOCKED, который сдвигает
+available_at на LEASE_SECONDS вперёд, и сразу фиксируется. Отправка идёт уже без
+транзакции и блокировок, результаты пишутся отдельной транзакцией. Если воркер
+упал посреди пачки, аренда истекает и события снова попадают в очередь.
+
+Доставка «хотя бы один раз»: если один из каналов упал, событие повторяется во
+всех каналах. Несколько воркеров могут работать одновременно — SKIP LOCKED и
+аренда раздают им разные строки.
+
+    DATABASE_URL=postgresql://localhost/transfer NOTIFY_SENDERS=stdout \\
+        python backend/notifier/worker.py --loop --interval 5
+"""
+
+import json
+import os
+import random
+import time
+
+from psycopg2.extras import execute_values
+
+BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '50'))
+MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '8'))
+BACKOFF_SECONDS = float(os.environ.get('OUTBOX_BACKOFF_SECONDS', '30'))
+BACKOFF_MAX_SECONDS = float(os.environ.get('OUTBOX_BACKOFF_MAX_SECONDS', '3600'))
+TIME_BUDGET_SECONDS = float(os.environ.get('OUTBOX_TIME_BUDGET_SECONDS', '20'))
+LEASE_SECONDS = float(os.environ.get('OUTBOX_LEASE_SECONDS', '120'))
+RETENTION_DAYS = int(os.environ.get('OUTBOX_RETENTION_DAYS', '14'))
+PURGE_BATCH = 1000
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Экспонента от числа попыток с ограничением сверху и случайным разбросом"""
+
+    delay = min(BACKOFF_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    return random.uniform(delay / 2, delay)
+
+
+def deliver(senders: list, topic: str, payload: dict) -> None:
+    for sender in senders:
+        sender.send(topic, payload)
+
+
+def claim_batch(conn, schema: str, batch_size: int) -> list:
+    """Аренда пачки готовых событий на LEASE_SECONDS; транзакция фиксируется сразу"""
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        UPDATE {schema}.outbox_events
+        SET available_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+        WHERE id IN (
+            SELECT id
+            FROM {schema}.outbox_events
+            WHERE status = 'pending' AND available_at <= CURRENT_TIMESTAMP
+            ORDER BY available_at, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, topic, payload, attempts
+    ''', (LEASE_SECONDS, batch_size))
+    events = sorted(cursor.fetchall())
+    conn.commit()
+    return events
+
+
+def drain_batch(conn, schema: str, senders: list, batch_size: int = BATCH_SIZE, deadline: float = None) -> dict:
+    """Одна пачка: аренда, отправка вне транзакции, запись результатов
+
+    После deadline (time.monotonic()) оставшиеся события пачки не отправляются,
+    а возвращаются в очередь без увеличения attempts.
+    """
+
+    events = claim_batch(conn, schema, batch_size)
+
+    sent = []
+    retried = []
+    failed = []
+    released = []
+
+    for event_id, topic, payload, attempts in events:
+        if deadline is not None and time.monotonic() > deadline:
+            released.append(event_id)
+            continue
+        try:
+            deliver(senders, topic, payload)
+            sent.append(event_id)
+        except Exception as e:
+            attempts += 1
+            error = f'{type(e).__name__}: {e}'[:1000]
+            if attempts >= MAX_ATTEMPTS:
+                failed.append((event_id, attempts, error))
+            else:
+                retried.append((event_id, attempts, error, backoff_seconds(attempts)))
+            print(json.dumps({'event': 'outbox_send_failed', 'id': event_id, 'attempts': attempts, 'error': error},
+                             ensure_ascii=False))
+
+    cursor = conn.cursor()
+
+    if sent:
+        cursor.execute(f'''
+            UPDATE {schema}.outbox_events
+            SET status = 'sent', sent_at = CURRENT_TIMESTAMP, attempts = attempts + 1, last_error = NULL
+            WHERE id = ANY(%s)
+        ''', (sent,))
+
+    if released:
+        cursor.execute(f'''
+            UPDATE {schema}.outbox_events
+            SET available_at = CURRENT_TIMESTAMP
+            WHERE id = ANY(%s) AND status = 'pending'
+        ''', (released,))
+
+    if retried:
+        execute_values(cursor, f'''
+            UPDATE {schema}.outbox_events AS o
+            SET attempts = v.attempts, last_error = v.last_error,
+                available_at = CURRENT_TIMESTAMP + v.delay * INTERVAL '1 second'
+            FROM (VALUES %s) AS v(id, attempts, last_error, delay)
+            WHERE o.id = v.id
+        ''', retried, template='(%s::bigint, %s::integer, %s::text, %s::float8)')
+
+    if failed:
+        execute_values(cursor, f'''
+            UPDATE {schema}.outbox_events AS o
+            SET status = 'failed', attempts = v.attempts, last_error = v.last_error
+            FROM (VALUES %s) AS v(id, attempts, last_error)
+            WHERE o.id = v.id
+        ''', failed, template='(%s::bigint, %s::integer, %s::text)')
+
+    conn.commit()
+
+    return {'fetched': len(events), 'sent': len(sent), 'retried': len(retried), 'failed': len(failed),
+            'released': len(released)}
+
+
+def drain(conn, schema: str, senders: list, time_budget: float = TIME_BUDGET_SECONDS) -> dict:
+    """Пачки до опустошения очереди или исчерпания времени вызова"""
+
+    deadline = time.monotonic() + time_budget
+    totals = {'batches': 0, 'fetched': 0, 'sent': 0, 'retried': 0, 'failed': 0, 'released': 0}
+
+    while True:
+        result = drain_batch(conn, schema, senders, deadline=deadline)
+        totals['batches'] += 1
+        for key in ('fetched', 'sent', 'retried', 'failed', 'released'):
+            totals[key] += result[key]
+        if result['fetched'] < BATCH_SIZE or time.monotonic() > deadline:
+            break
+
+    totals['purged'] = purge_sent(conn, schema)
+    return totals
+
+
+def purge_sent(conn, schema: str) -> int:
+    """Удаление одной пачки отправленных событий старше RETENTION_DAYS"""
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        DELETE FROM {schema}.outbox_events
+        WHERE id IN (
+            SELECT id FROM {schema}.outbox_events
+            WHERE status = 'sent' AND sent_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 day'
+            LIMIT %s
+        )
+    ''', (RETENTION_DAYS, PURGE_BATCH))
+    conn.commit()
+    return cursor.rowcount
+
+
+def main():
+    import argparse
+
+    import db
+    import senders as sender_registry
+
+    parser = argparse.ArgumentParser(description='Drain the notification outbox')
+    parser.add_argument('--loop', action='store_true', help='keep polling instead of a single drain')
+    parser.add_argument('--interval', type=float, default=5, help='seconds between polls with --loop')
+    args = parser.parse_args()
+
+    db_url = os.environ['DATABASE_URL']
+    schema = os.environ.get('MAIN_DB_SCHEMA', 'public')
+    senders = sender_registry.from_env()
+
+    while True:
+        conn = db.acquire(db_url)
+        try:
+            totals = drain(conn, schema, senders)
+        finally:
+            db.release(conn)
+        print(json.dumps({'event': 'outbox_drained', **totals}))
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
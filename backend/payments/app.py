@@ -0,0 +1,148 @@
+import json
+import os
+
+import db
+import payments
+import providers
+import reconcile
+import tracing
+from responses import get_header, success_response, error_response
+from tokens import get_user_from_token
+
+@tracing.traced('payments')
+def handler(event: dict, context) -> dict:
+    """API оплаты заявок: намерения оплаты, вебхуки провайдера и сверка выписок"""
+    
+    method = event.get('httpMethod')
+    query_params = event.get('queryStringParameters', {}) or {}
+    action = query_params.get('action', '') if method else 'reconcile'
+    
+    try:
+        db_url = os.environ.get('DATABASE_URL')
+        schema = os.environ.get('MAIN_DB_SCHEMA', 'public')
+        
+        if not db_url:
+            return error_response('Database configuration error', 500)
+        
+        provider = providers.from_env()
+        
+        if method == 'POST' and action == 'webhook':
+            body = event.get('body') or ''
+            if not provider.verify_webhook(body, get_header(event, 'X-Payment-Signature')):
+                return error_response('Invalid signature', 401)
+        
+        elif method and action == 'reconcile':
+            user = get_user_from_token(event)
+            if not user or user['role'] != 'admin':
+                return error_response('Admin access required', 403)
+        
+        conn = db.acquire(db_url)
+        
+        if method == 'POST' and action == 'intent':
+            data = json.loads(event.get('body') or '{}')
+            return create_intent(conn, schema, provider, data, event)
+        elif method == 'POST' and action == 'webhook':
+            return handle_webhook(conn, schema, event)
+        elif method == 'GET' and action == 'status':
+            return get_payment_status(conn, schema, query_params, event)
+        elif action == 'reconcile' and method in (None, 'POST'):
+            data = json.loads(event.get('body') or '{}')
+            return run_reconcile(conn, schema, provider, data.get('since'))
+        else:
+            return error_response('Unknown action', 400)
+    
+    except json.JSONDecodeError:
+        return error_response('Invalid JSON body', 400)
+    except Exception as e:
+        return error_response(f'Server error: {str(e)}', 500)
+    finally:
+        if 'conn' in locals():
+            db.release(conn)
+
+
+def create_intent(conn, schema: str, provider, data: dict, event: dict) -> dict:
+    """Создание платежа для заявки с предоплатой или полной оплатой"""
+    
+    booking_id = data.get('booking_id')
+    
+    if not isinstance(booking_id, int):
+        return error_response('Field booking_id is required', 400)
+    
+    try:
+        return success_response(payments.create_intent(conn, schema, provider, booking_id, get_user_from_token(event),
+                                                       data.get('guest_phone', data.get('phone'))))
+    except payments.PaymentError as e:
+        conn.rollback()
+        return error_response(str(e), e.status_code)
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Failed to create payment: {str(e)}', 500)
+
+
+def handle_webhook(conn, schema: str, event: dict) -> dict:
+    """Уведомление провайдера о смене статуса платежа"""
+    
+    try:
+        return success_response(payments.apply_webhook(conn, schema, json.loads(event.get('body') or '{}')))
+    except payments.PaymentError as e:
+        return error_response(str(e), e.status_code)
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Webhook failed: {str(e)}', 500)
+
+
+def get_payment_status(conn, schema: str, query_params: dict, event: dict) -> dict:
+    """Статус оплаты заявки и её платежи"""
+    
+    try:
+        booking_id = int(query_params.get('booking_id', ''))
+    except ValueError:
+        return error_response('Parameter booking_id is required', 400)
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT user_id, guest_phone_digits, payment_status FROM {schema}.bookings WHERE id = %s', (booking_id,))
+        booking = cursor.fetchone()
+        
+        if not booking:
+            return error_response('Booking not found', 404)
+        
+        payments.check_access(booking[0], booking[1], get_user_from_token(event),
+                              query_params.get('guest_phone', query_params.get('phone')))
+        
+        cursor.execute(f'''
+            SELECT id, amount, payment_method, payment_status, paid_at, created_at
+            FROM {schema}.payments
+            WHERE booking_id = %s
+            ORDER BY id
+        ''', (booking_id,))
+        
+        return success_response({
+            'booking_id': booking_id,
+            'payment_status': booking[2],
+            'payments': [
+                {
+                    'id': row[0],
+                    'amount': float(row[1]),
+                    'payment_method': row[2],
+                    'payment_status': row[3],
+                    'paid_at': row[4].isoformat() if row[4] else None,
+                    'created_at': row[5].isoformat() if row[5] else None
+                }
+                for row in cursor.fetchall()
+            ]
+        })
+    except payments.PaymentError as e:
+        return error_response(str(e), e.status_code)
+    except Exception as e:
+        return error_response(f'Failed to fetch payments: {str(e)}', 500)
+
+
+def run_reconcile(conn, schema: str, provider, since: str = None) -> dict:
+    """Сверка выписки провайдера; вызывается таймером или администратором"""
+    
+    try:
+        return success_response(reconcile.reconcile(conn, schema, provider, since))
+    except Exception as e:
+        conn.rollback()
+        return error_response(f'Reconciliation failed: {str(e)}', 500)
@@ -0,0 +1,23 @@
+"""Точка входа функции: preflight отвечается до импорта psycopg2 и jwt, остальное — в app"""
+
+PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Authorization',
+    'Access-Control-Max-Age': '86400'
+}
+
+
+def handler(event: dict, context) -> dict:
+    """API оплаты заявок: намерения оплаты, вебхуки провайдера и сверка выписок"""
+
+    if event.get('httpMethod') == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': dict(PREFLIGHT_HEADERS),
+            'body': '',
+            'isBase64Encoded': False
+        }
+
+    import app
+    return app.handler(event, context)
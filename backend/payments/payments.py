@@ -0,0 +1,236 @@
+"""Намерения оплаты, вебхуки провайдера и пересчёт payment_status заявок"""
+
+import hmac
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+PAYABLE_METHODS = {'prepay_50': Decimal('0.5'), 'full_payment': Decimal('1')}
+
+# Допустимые переходы статуса платежа; повтор и откат назад игнорируются
+TRANSITIONS = {
+    ('pending', 'succeeded'),
+    ('pending', 'canceled'),
+    ('succeeded', 'refunded')
+}
+
+PROVIDER_STATUSES = ('pending', 'succeeded', 'canceled', 'refunded')
+
+# Платёж без transaction_id моложе этого считается создаваемым у провайдера прямо сейчас
+INTENT_IN_FLIGHT_SECONDS = 60
+
+
+class PaymentError(Exception):
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def check_access(owner_id, guest_phone_digits, user: dict = None, phone: str = None) -> None:
+    """Заявка доступна владельцу и администратору, гостевая — тому, кто указал её телефон"""
+
+    if user and (user['role'] == 'admin' or (owner_id and user['user_id'] == owner_id)):
+        return
+    if not owner_id and guest_phone_digits and hmac.compare_digest(re.sub(r'\D', '', phone or ''), guest_phone_digits):
+        return
+    raise PaymentError('Access denied', 403)
+
+
+def intent_amount(total_price: Decimal, payment_method: str, paid: Decimal) -> Decimal:
+    """Предоплата — доля от суммы, после частичной оплаты — остаток"""
+
+    total_price = total_price or Decimal('0')
+    if paid > 0:
+        amount = total_price - paid
+    else:
+        amount = total_price * PAYABLE_METHODS[payment_method]
+    return amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def parse_amount(value) -> Decimal:
+    """Сумма из вебхука; не число — ошибка 400, а не InvalidOperation"""
+
+    if isinstance(value, bool):
+        raise PaymentError('Field amount must be a number')
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        raise PaymentError('Field amount must be a number')
+    if not amount.is_finite():
+        raise PaymentError('Field amount must be a number')
+    return amount
+
+
+def create_intent(conn, schema: str, provider, booking_id: int, user: dict = None, phone: str = None) -> dict:
+    """Платёж в статусе pending и ссылка на оплату; незавершённый платёж на ту же сумму переиспользуется
+
+    Платёж фиксируется до обращения к провайдеру, и блокировка заявки снимается:
+    медленный провайдер не задерживает вебхуки и сверку по этой заявке. Если
+    провайдер ответил ошибкой, платёж отменяется.
+    """
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT user_id, guest_phone_digits, total_price, payment_method, payment_status, status
+        FROM {schema}.bookings
+        WHERE id = %s
+        FOR UPDATE
+    ''', (booking_id,))
+    booking = cursor.fetchone()
+
+    if not booking:
+        raise PaymentError('Booking not found', 404)
+
+    owner_id, guest_phone_digits, total_price, payment_method, payment_status, status = booking
+
+    check_access(owner_id, guest_phone_digits, user, phone)
+    if status == 'cancelled':
+        raise PaymentError('Booking is cancelled', 409)
+    if payment_method not in PAYABLE_METHODS:
+        raise PaymentError('Booking is not paid online', 400)
+    if payment_status == 'paid':
+        raise PaymentError('Booking is already paid', 409)
+
+    cursor.execute(f'''
+        SELECT COALESCE(SUM(amount) FILTER (WHERE payment_status = 'succeeded'), 0)
+        FROM {schema}.payments
+        WHERE booking_id = %s
+    ''', (booking_id,))
+    amount = intent_amount(total_price, payment_method, cursor.fetchone()[0])
+
+    if amount <= 0:
+        raise PaymentError('Nothing to pay', 409)
+
+    cursor.execute(f'''
+        SELECT id, transaction_id, confirmation_url
+        FROM {schema}.payments
+        WHERE booking_id = %s AND payment_status = 'pending' AND amount = %s AND provider = %s
+          AND (transaction_id IS NOT NULL OR created_at > CURRENT_TIMESTAMP - %s * INTERVAL '1 second')
+        ORDER BY id DESC
+        LIMIT 1
+    ''', (booking_id, amount, provider.name, INTENT_IN_FLIGHT_SECONDS))
+    existing = cursor.fetchone()
+
+    if existing and existing[1] is None:
+        raise PaymentError('Payment is being created, retry later', 409)
+
+    if existing:
+        conn.commit()
+        payment_id, transaction_id, confirmation_url = existing
+    else:
+        cursor.execute(f'''
+            INSERT INTO {schema}.payments (booking_id, amount, payment_method, payment_status, provider)
+            VALUES (%s, %s, %s, 'pending', %s)
+            RETURNING id
+        ''', (booking_id, amount, payment_method, provider.name))
+        payment_id = cursor.fetchone()[0]
+        conn.commit()
+
+        try:
+            created = provider.create_payment(payment_id, amount, f'Трансфер, заявка №{booking_id}')
+        except Exception:
+            cursor.execute(f'''
+                UPDATE {schema}.payments
+                SET payment_status = 'canceled', updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND payment_status = 'pending'
+            ''', (payment_id,))
+            conn.commit()
+            raise
+
+        transaction_id = created['transaction_id']
+        confirmation_url = created['confirmation_url']
+
+        cursor.execute(f'''
+            UPDATE {schema}.payments
+            SET transaction_id = %s, confirmation_url = %s, updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+        ''', (transaction_id, confirmation_url, payment_id))
+        conn.commit()
+
+    return {
+        'payment_id': payment_id,
+        'booking_id': booking_id,
+        'amount': float(amount),
+        'payment_method': payment_method,
+        'transaction_id': transaction_id,
+        'confirmation_url': confirmation_url,
+        'reused': bool(existing)
+    }
+
+
+def apply_webhook(conn, schema: str, data: dict) -> dict:
+    """Применение статуса из вебхука; повтор с тем же transaction_id ничего не меняет"""
+
+    transaction_id = data.get('transaction_id')
+    status = data.get('status')
+
+    if not transaction_id or status not in PROVIDER_STATUSES:
+        raise PaymentError('Fields transaction_id and status are required')
+
+    reported_amount = parse_amount(data['amount']) if 'amount' in data else None
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT id, booking_id, payment_status, amount
+        FROM {schema}.payments
+        WHERE transaction_id = %s
+        FOR UPDATE
+    ''', (transaction_id,))
+    payment = cursor.fetchone()
+
+    if not payment:
+        conn.rollback()
+        raise PaymentError('Unknown transaction', 404)
+
+    payment_id, booking_id, current_status, amount = payment
+
+    if reported_amount is not None and reported_amount != amount:
+        conn.rollback()
+        raise PaymentError('Amount does not match the payment', 409)
+
+    if (current_status, status) not in TRANSITIONS:
+        conn.rollback()
+        return {'payment_id': payment_id, 'status': current_status, 'applied': False}
+
+    cursor.execute(f'''
+        UPDATE {schema}.payments
+        SET payment_status = %s,
+            paid_at = CASE WHEN %s = 'succeeded' THEN COALESCE(paid_at, CURRENT_TIMESTAMP) ELSE paid_at END,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s
+    ''', (status, status, payment_id))
+    sync_booking_statuses(cursor, schema, [booking_id])
+    conn.commit()
+
+    return {'payment_id': payment_id, 'status': status, 'applied': True}
+
+
+def sync_booking_statuses(cursor, schema: str, booking_ids: list) -> int:
+    """payment_status заявок из суммы их платежей — одним UPDATE на весь набор"""
+
+    if not booking_ids:
+        return 0
+
+    cursor.execute(f'''
+        UPDATE {schema}.bookings b
+        SET payment_status = s.payment_status, updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT b.id,
+                   CASE
+                       WHEN p.paid > 0 AND p.paid >= COALESCE(b.total_price, 0) THEN 'paid'
+                       WHEN p.paid > 0 THEN 'partial'
+                       WHEN p.refunded > 0 THEN 'refunded'
+                       ELSE 'pending'
+                   END as payment_status
+            FROM {schema}.bookings b
+            JOIN (
+                SELECT booking_id,
+                       COALESCE(SUM(amount) FILTER (WHERE payment_status = 'succeeded'), 0) as paid,
+                       COALESCE(SUM(amount) FILTER (WHERE payment_status = 'refunded'), 0) as refunded
+                FROM {schema}.payments
+                WHERE booking_id = ANY(%s)
+                GROUP BY booking_id
+            ) p ON p.booking_id = b.id
+        ) s
+        WHERE b.id = s.id AND b.payment_status IS DISTINCT FROM s.payment_status
+    ''', (list(booking_ids),))
+    return cursor.rowcount
@@ -0,0 +1,88 @@
+"""Платёжные провайдеры; активный выбирается PAYMENT_PROVIDER
+
+Провайдер умеет три вещи: создать платёж у себя (create_payment), проверить
+подпись вебхука (verify_webhook) и отдать выписку операций (fetch_statement).
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import uuid
+from decimal import Decimal
+
+
+class FileProvider:
+    """Заглушка для локальной работы и тестов
+
+    Платёж «создаётся» генерацией transaction_id, вебхуки подписываются
+    HMAC-SHA256 от тела с PAYMENT_WEBHOOK_SECRET, выписка читается из NDJSON-файла
+    со строками {"transaction_id", "status", "amount", "paid_at"}.
+    """
+
+    name = 'file'
+
+    def __init__(self, statement_path: str, webhook_secret: str, confirmation_base_url: str):
+        self.statement_path = statement_path
+        self.webhook_secret = webhook_secret
+        self.confirmation_base_url = confirmation_base_url.rstrip('/')
+
+    def create_payment(self, payment_id: int, amount: Decimal, description: str) -> dict:
+        transaction_id = f'file_{payment_id}_{uuid.uuid4().hex[:12]}'
+        return {
+            'transaction_id': transaction_id,
+            'confirmation_url': f'{self.confirmation_base_url}/{transaction_id}'
+        }
+
+    def sign(self, body: str) -> str:
+        return hmac.new(self.webhook_secret.encode('utf-8'), body.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def verify_webhook(self, body: str, signature: str) -> bool:
+        if not self.webhook_secret or not signature:
+            return False
+        return hmac.compare_digest(self.sign(body), signature)
+
+    def fetch_statement(self, since=None):
+        """Операции выписки по одной; since — нижняя граница paid_at в ISO-формате"""
+
+        if not os.path.exists(self.statement_path):
+            return
+
+        with open(self.statement_path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                if since and (entry.get('paid_at') or '') < since:
+                    continue
+                yield {
+                    'transaction_id': entry['transaction_id'],
+                    'status': entry['status'],
+                    'amount': Decimal(str(entry['amount'])),
+                    'paid_at': entry.get('paid_at')
+                }
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.environ.get('PAYMENT_STATEMENT_PATH', '/tmp/payment_statement.ndjson'),
+            os.environ.get('PAYMENT_WEBHOOK_SECRET', ''),
+            os.environ.get('PAYMENT_CONFIRMATION_BASE_URL', 'http://localhost:5173/pay')
+        )
+
+
+PROVIDERS = {cls.name: cls for cls in (FileProvider,)}
+
+
+def register(provider_class) -> None:
+    """Подключение реального провайдера: класс с name, тремя методами выше и from_env()"""
+
+    PROVIDERS[provider_class.name] = provider_class
+
+
+def from_env():
+    name = os.environ.get('PAYMENT_PROVIDER', 'file')
+    if name not in PROVIDERS:
+        raise ValueError(f'Unknown payment provider: {name}, expected one of: {", ".join(PROVIDERS)}')
+    return PROVIDERS[name].from_env()
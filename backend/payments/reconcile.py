@@ -0,0 +1,97 @@
+"""Сверка выписки провайдера с таблицей payments пачками
+
+На каждую пачку выписки — один запрос платежей по transaction_id, сопоставление
+через словарь в памяти (hash join), один UPDATE платежей через VALUES и один
+пересчёт payment_status затронутых заявок.
+"""
+
+import json
+import os
+from itertools import islice
+
+from psycopg2.extras import execute_values
+
+from payments import TRANSITIONS, sync_booking_statuses
+
+BATCH_SIZE = int(os.environ.get('RECONCILE_BATCH_SIZE', '1000'))
+MAX_REPORTED = 50
+
+
+def batches(entries, size: int):
+    iterator = iter(entries)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def reconcile(conn, schema: str, provider, since: str = None, batch_size: int = BATCH_SIZE) -> dict:
+    totals = {'entries': 0, 'matched': 0, 'updated': 0, 'bookings_updated': 0,
+              'unknown': [], 'amount_mismatch': []}
+
+    for entries in batches(provider.fetch_statement(since), batch_size):
+        result = reconcile_batch(conn, schema, entries)
+        for key in ('entries', 'matched', 'updated', 'bookings_updated'):
+            totals[key] += result[key]
+        for key in ('unknown', 'amount_mismatch'):
+            totals[key].extend(result[key][:MAX_REPORTED - len(totals[key])])
+
+    print(json.dumps({'event': 'payments_reconciled', **{k: v if isinstance(v, int) else len(v) for k, v in totals.items()}}))
+    return totals
+
+
+def reconcile_batch(conn, schema: str, entries: list) -> dict:
+    # Последняя запись по транзакции в выписке — актуальная
+    statement = {entry['transaction_id']: entry for entry in entries}
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT transaction_id, id, booking_id, amount, payment_status
+        FROM {schema}.payments
+        WHERE transaction_id = ANY(%s)
+        FOR UPDATE
+    ''', (list(statement),))
+    known = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    updates = []
+    unknown = []
+    mismatched = []
+
+    for transaction_id, entry in statement.items():
+        payment = known.get(transaction_id)
+        if payment is None:
+            unknown.append(transaction_id)
+            continue
+        payment_id, booking_id, amount, status = payment
+        if entry['amount'] != amount:
+            mismatched.append(transaction_id)
+            continue
+        if (status, entry['status']) in TRANSITIONS:
+            updates.append((payment_id, entry['status'], entry.get('paid_at')))
+
+    booking_ids = []
+    if updates:
+        returned = execute_values(cursor, f'''
+            UPDATE {schema}.payments AS p
+            SET payment_status = v.status,
+                paid_at = CASE WHEN v.status = 'succeeded'
+                               THEN COALESCE(p.paid_at, v.paid_at, CURRENT_TIMESTAMP) ELSE p.paid_at END,
+                updated_at = CURRENT_TIMESTAMP
+            FROM (VALUES %s) AS v(id, status, paid_at)
+            WHERE p.id = v.id
+            RETURNING p.booking_id
+        ''', updates, template='(%s::integer, %s::varchar, %s::timestamp)', page_size=len(updates), fetch=True)
+        booking_ids = sorted({r[0] for r in returned if r[0] is not None})
+
+    bookings_updated = sync_booking_statuses(cursor, schema, booking_ids)
+    conn.commit()
+
+    return {
+        'entries': len(entries),
+        'matched': len(statement) - len(unknown),
+        'updated': len(updates),
+        'bookings_updated': bookings_updated,
+        'unknown': unknown,
+        'amount_mismatch': mismatched
+    }
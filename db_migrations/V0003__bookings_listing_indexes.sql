@@ -0,0 +1,13 @@
+-- Индексы для курсорной пагинации и фильтров списка заявок
+-- Порядок выдачи: created_at DESC, id DESC
+
+CREATE INDEX idx_bookings_created_at_id ON bookings(created_at DESC, id DESC);
+CREATE INDEX idx_bookings_user_created_at_id ON bookings(user_id, created_at DESC, id DESC);
+CREATE INDEX idx_bookings_status_created_at_id ON bookings(status, created_at DESC, id DESC);
+CREATE INDEX idx_bookings_payment_status_created_at_id ON bookings(payment_status, created_at DESC, id DESC);
+CREATE INDEX idx_bookings_tariff_created_at_id ON bookings(tariff_id, created_at DESC, id DESC);
+CREATE INDEX idx_bookings_travel_date_created_at_id ON bookings(travel_date, created_at DESC, id DESC);
+
+-- Заменены составными индексами выше
+DROP INDEX IF EXISTS idx_bookings_user_id;
+DROP INDEX IF EXISTS idx_bookings_status;
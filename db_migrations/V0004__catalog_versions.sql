@@ -0,0 +1,41 @@
+-- Версии справочников для инвалидации кэша в контейнерах функций
+
+CREATE TABLE catalog_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO catalog_versions (name) VALUES
+('tariffs'),
+('vehicles'),
+('routes'),
+('advertisements');
+
+-- Любое изменение справочника поднимает его версию и шлёт уведомление в канал catalog_changed
+CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS TRIGGER AS $$
+BEGIN
+    EXECUTE format(
+        'UPDATE %I.catalog_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE name = $1',
+        TG_TABLE_SCHEMA
+    ) USING TG_TABLE_NAME;
+    PERFORM pg_notify('catalog_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_tariffs_catalog_version
+AFTER INSERT OR UPDATE OR DELETE ON tariffs
+FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+CREATE TRIGGER trg_vehicles_catalog_version
+AFTER INSERT OR UPDATE OR DELETE ON vehicles
+FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+CREATE TRIGGER trg_routes_catalog_version
+AFTER INSERT OR UPDATE OR DELETE ON routes
+FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+CREATE TRIGGER trg_advertisements_catalog_version
+AFTER INSERT OR UPDATE OR DELETE ON advertisements
+FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
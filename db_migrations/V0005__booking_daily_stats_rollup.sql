@@ -0,0 +1,50 @@
+-- Агрегаты заявок по дням и статусам для статистики админки
+
+CREATE TABLE booking_daily_stats (
+    day DATE NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    bookings_count INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, status)
+);
+
+-- Инкрементальное обновление: старая версия строки вычитается, новая прибавляется
+CREATE OR REPLACE FUNCTION apply_booking_daily_stats() RETURNS TRIGGER AS $$
+DECLARE
+    upsert_sql TEXT := format(
+        'INSERT INTO %I.booking_daily_stats (day, status, bookings_count, revenue)
+         VALUES ($1, $2, $3, $4)
+         ON CONFLICT (day, status) DO UPDATE
+         SET bookings_count = booking_daily_stats.bookings_count + EXCLUDED.bookings_count,
+             revenue = booking_daily_stats.revenue + EXCLUDED.revenue',
+        TG_TABLE_SCHEMA
+    );
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND DATE(OLD.created_at) IS NOT DISTINCT FROM DATE(NEW.created_at)
+       AND OLD.status IS NOT DISTINCT FROM NEW.status
+       AND OLD.total_price IS NOT DISTINCT FROM NEW.total_price THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        EXECUTE upsert_sql USING DATE(OLD.created_at), OLD.status, -1, -COALESCE(OLD.total_price, 0);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE upsert_sql USING DATE(NEW.created_at), NEW.status, 1, COALESCE(NEW.total_price, 0);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_bookings_daily_stats
+AFTER INSERT OR UPDATE OR DELETE ON bookings
+FOR EACH ROW EXECUTE FUNCTION apply_booking_daily_stats();
+
+-- Заполнение по существующим заявкам
+INSERT INTO booking_daily_stats (day, status, bookings_count, revenue)
+SELECT DATE(created_at), status, COUNT(*), COALESCE(SUM(total_price), 0)
+FROM bookings
+GROUP BY DATE(created_at), status;
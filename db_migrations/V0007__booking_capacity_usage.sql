@@ -0,0 +1,55 @@
+-- Занятость автопарка по дням, часам и категориям тарифа для календаря доступности
+
+CREATE TABLE booking_capacity_usage (
+    day DATE NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    hour SMALLINT NOT NULL,
+    trips INTEGER NOT NULL DEFAULT 0,
+    passengers INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, category, hour)
+);
+
+-- Учитываются только неотменённые заявки; старая версия строки вычитается, новая прибавляется
+CREATE OR REPLACE FUNCTION apply_booking_capacity_usage() RETURNS TRIGGER AS $$
+DECLARE
+    upsert_sql TEXT := format(
+        'INSERT INTO %I.booking_capacity_usage (day, category, hour, trips, passengers)
+         SELECT $1, t.category, $2, $3, $4 FROM %I.tariffs t WHERE t.id = $5
+         ON CONFLICT (day, category, hour) DO UPDATE
+         SET trips = booking_capacity_usage.trips + EXCLUDED.trips,
+             passengers = booking_capacity_usage.passengers + EXCLUDED.passengers',
+        TG_TABLE_SCHEMA, TG_TABLE_SCHEMA
+    );
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.travel_date = NEW.travel_date
+       AND OLD.travel_time = NEW.travel_time
+       AND OLD.passengers = NEW.passengers
+       AND OLD.tariff_id IS NOT DISTINCT FROM NEW.tariff_id
+       AND (OLD.status = 'cancelled') = (NEW.status = 'cancelled') THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status IS DISTINCT FROM 'cancelled' THEN
+        EXECUTE upsert_sql USING OLD.travel_date, EXTRACT(HOUR FROM OLD.travel_time)::SMALLINT, -1, -OLD.passengers, OLD.tariff_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IS DISTINCT FROM 'cancelled' THEN
+        EXECUTE upsert_sql USING NEW.travel_date, EXTRACT(HOUR FROM NEW.travel_time)::SMALLINT, 1, NEW.passengers, NEW.tariff_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_bookings_capacity_usage
+AFTER INSERT OR UPDATE OR DELETE ON bookings
+FOR EACH ROW EXECUTE FUNCTION apply_booking_capacity_usage();
+
+-- Заполнение по существующим заявкам
+INSERT INTO booking_capacity_usage (day, category, hour, trips, passengers)
+SELECT b.travel_date, t.category, EXTRACT(HOUR FROM b.travel_time)::SMALLINT, COUNT(*), SUM(b.passengers)
+FROM bookings b
+JOIN tariffs t ON b.tariff_id = t.id
+WHERE b.status <> 'cancelled'
+GROUP BY b.travel_date, t.category, EXTRACT(HOUR FROM b.travel_time);
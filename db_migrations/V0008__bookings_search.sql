@@ -0,0 +1,25 @@
+-- Поиск заявок для диспетчерской: имя, телефон, email, откуда и куда
+-- guest_phone_digits — телефон только цифрами, чтобы «+7 (999) 123» находилось по «999123»
+-- search_text — нижний регистр для триграммного поиска подстрок и опечаток
+-- search_vector — словарь simple для поиска по словам с весами: имя > email > маршрут
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE bookings
+    ADD COLUMN guest_phone_digits VARCHAR(50)
+        GENERATED ALWAYS AS (regexp_replace(COALESCE(guest_phone, ''), '\D', '', 'g')) STORED,
+    ADD COLUMN search_text TEXT
+        GENERATED ALWAYS AS (lower(
+            COALESCE(guest_name, '') || ' ' || COALESCE(guest_email, '') || ' ' ||
+            from_location || ' ' || to_location
+        )) STORED,
+    ADD COLUMN search_vector TSVECTOR
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', COALESCE(guest_name, '')), 'A') ||
+            setweight(to_tsvector('simple', COALESCE(guest_email, '')), 'B') ||
+            setweight(to_tsvector('simple', from_location || ' ' || to_location), 'C')
+        ) STORED;
+
+CREATE INDEX idx_bookings_search_text_trgm ON bookings USING GIN (search_text gin_trgm_ops);
+CREATE INDEX idx_bookings_phone_digits_trgm ON bookings USING GIN (guest_phone_digits gin_trgm_ops);
+CREATE INDEX idx_bookings_search_vector ON bookings USING GIN (search_vector);
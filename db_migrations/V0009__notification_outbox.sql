@@ -0,0 +1,21 @@
+-- Транзакционный outbox: событие пишется в одной транзакции с заявкой,
+-- отправку выполняет отдельная функция notifier
+
+CREATE TABLE outbox_events (
+    id BIGSERIAL PRIMARY KEY,
+    topic VARCHAR(100) NOT NULL,
+    aggregate_id INTEGER,
+    payload JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    available_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP
+);
+
+-- Очередь к отправке: только ожидающие события, в порядке готовности
+CREATE INDEX idx_outbox_events_pending ON outbox_events(available_at, id) WHERE status = 'pending';
+
+-- Очистка отправленных
+CREATE INDEX idx_outbox_events_sent_at ON outbox_events(sent_at) WHERE status = 'sent';
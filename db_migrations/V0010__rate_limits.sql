@@ -0,0 +1,15 @@
+-- Ограничение частоты запросов: token bucket на ключ (правило + IP, email или телефон)
+-- UNLOGGED: без WAL, после сбоя сервера таблица очищается — для счётчиков это допустимо
+
+CREATE UNLOGGED TABLE rate_limits (
+    key VARCHAR(300) PRIMARY KEY,
+    capacity DOUBLE PRECISION NOT NULL,
+    rate DOUBLE PRECISION NOT NULL,
+    tokens DOUBLE PRECISION NOT NULL,
+    last_allowed BOOLEAN NOT NULL DEFAULT true,
+    allowed BIGINT NOT NULL DEFAULT 0,
+    rejected BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX idx_rate_limits_updated_at ON rate_limits(updated_at);
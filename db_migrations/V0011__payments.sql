@@ -0,0 +1,14 @@
+-- Платежи: намерения оплаты, вебхуки провайдера и сверка выписок
+
+UPDATE payments SET payment_status = 'pending' WHERE payment_status IS NULL;
+
+ALTER TABLE payments
+    ADD COLUMN provider VARCHAR(50),
+    ADD COLUMN confirmation_url TEXT,
+    ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    ALTER COLUMN payment_status SET NOT NULL,
+    ADD CONSTRAINT payments_payment_status_check
+        CHECK (payment_status IN ('pending', 'succeeded', 'canceled', 'refunded'));
+
+-- Вебхуки и сверка находят платёж по идентификатору провайдера; повтор не создаёт дубль
+CREATE UNIQUE INDEX idx_payments_transaction_id ON payments(transaction_id) WHERE transaction_id IS NOT NULL;
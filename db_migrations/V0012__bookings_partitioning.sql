@@ -0,0 +1,165 @@
+-- Секционирование заявок по месяцам created_at
+-- created_at задаётся при вставке и не меняется, поэтому новые заявки всегда пишутся в секцию текущего месяца,
+-- а список заявок (created_at DESC, id DESC) и окна статистики отсекают старые секции.
+-- Секции bookings_yYYYYmMM создаются заранее (backend/admin/partitions.py), bookings_default принимает строки
+-- вне созданных секций. Ключ секционирования входит в первичный ключ, поэтому он становится (id, created_at),
+-- а внешний ключ payments.booking_id заменяется триггерами.
+
+ALTER TABLE payments DROP CONSTRAINT payments_booking_id_fkey;
+
+ALTER TABLE bookings RENAME TO bookings_unpartitioned;
+ALTER TABLE bookings_unpartitioned RENAME CONSTRAINT bookings_pkey TO bookings_unpartitioned_pkey;
+ALTER SEQUENCE bookings_id_seq OWNED BY NONE;
+
+DROP INDEX IF EXISTS idx_bookings_travel_date;
+DROP INDEX IF EXISTS idx_bookings_created_at_id;
+DROP INDEX IF EXISTS idx_bookings_user_created_at_id;
+DROP INDEX IF EXISTS idx_bookings_status_created_at_id;
+DROP INDEX IF EXISTS idx_bookings_payment_status_created_at_id;
+DROP INDEX IF EXISTS idx_bookings_tariff_created_at_id;
+DROP INDEX IF EXISTS idx_bookings_travel_date_created_at_id;
+DROP INDEX IF EXISTS idx_bookings_search_text_trgm;
+DROP INDEX IF EXISTS idx_bookings_phone_digits_trgm;
+DROP INDEX IF EXISTS idx_bookings_search_vector;
+
+CREATE TABLE bookings (
+    id INTEGER NOT NULL DEFAULT nextval('bookings_id_seq'),
+    user_id INTEGER CONSTRAINT bookings_user_id_fkey REFERENCES users(id),
+    guest_name VARCHAR(255),
+    guest_phone VARCHAR(50),
+    guest_email VARCHAR(255),
+    from_location VARCHAR(255) NOT NULL,
+    to_location VARCHAR(255) NOT NULL,
+    travel_date DATE NOT NULL,
+    travel_time TIME NOT NULL,
+    passengers INTEGER NOT NULL,
+    tariff_id INTEGER CONSTRAINT bookings_tariff_id_fkey REFERENCES tariffs(id),
+    vehicle_id INTEGER CONSTRAINT bookings_vehicle_id_fkey REFERENCES vehicles(id),
+    total_price DECIMAL(10, 2),
+    payment_method VARCHAR(50) CONSTRAINT bookings_payment_method_check CHECK (payment_method IN ('prepay_50', 'full_payment', 'cash')),
+    payment_status VARCHAR(50) DEFAULT 'pending' CONSTRAINT bookings_payment_status_check CHECK (payment_status IN ('pending', 'partial', 'paid', 'refunded')),
+    status VARCHAR(50) DEFAULT 'new' CONSTRAINT bookings_status_check CHECK (status IN ('new', 'confirmed', 'in_progress', 'completed', 'cancelled')),
+    notes TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    guest_phone_digits VARCHAR(50)
+        GENERATED ALWAYS AS (regexp_replace(COALESCE(guest_phone, ''), '\D', '', 'g')) STORED,
+    search_text TEXT
+        GENERATED ALWAYS AS (lower(
+            COALESCE(guest_name, '') || ' ' || COALESCE(guest_email, '') || ' ' ||
+            from_location || ' ' || to_location
+        )) STORED,
+    search_vector TSVECTOR
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', COALESCE(guest_name, '')), 'A') ||
+            setweight(to_tsvector('simple', COALESCE(guest_email, '')), 'B') ||
+            setweight(to_tsvector('simple', from_location || ' ' || to_location), 'C')
+        ) STORED,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE bookings_id_seq OWNED BY bookings.id;
+
+CREATE TABLE bookings_default PARTITION OF bookings DEFAULT;
+
+-- Секции от месяца самой старой заявки до трёх месяцев вперёд
+DO $$
+DECLARE
+    month DATE := date_trunc('month', COALESCE((SELECT MIN(created_at) FROM bookings_unpartitioned), CURRENT_TIMESTAMP))::DATE;
+    last_month DATE := (date_trunc('month', CURRENT_TIMESTAMP) + INTERVAL '3 months')::DATE;
+BEGIN
+    WHILE month <= last_month LOOP
+        EXECUTE format('CREATE TABLE %I PARTITION OF bookings FOR VALUES FROM (%L) TO (%L)',
+                       'bookings_' || to_char(month, '"y"YYYY"m"MM'), month, (month + INTERVAL '1 month')::DATE);
+        month := (month + INTERVAL '1 month')::DATE;
+    END LOOP;
+END $$;
+
+-- Перенос до создания триггеров: агрегаты уже учитывают эти заявки
+INSERT INTO bookings (id, user_id, guest_name, guest_phone, guest_email, from_location, to_location,
+                      travel_date, travel_time, passengers, tariff_id, vehicle_id, total_price,
+                      payment_method, payment_status, status, notes, created_at, updated_at)
+SELECT id, user_id, guest_name, guest_phone, guest_email, from_location, to_location,
+       travel_date, travel_time, passengers, tariff_id, vehicle_id, total_price,
+       payment_method, payment_status, status, notes, created_at, updated_at
+FROM bookings_unpartitioned;
+
+DROP TABLE bookings_unpartitioned;
+
+CREATE INDEX idx_bookings_travel_date ON bookings(travel_date);
+CREATE INDEX idx_bookings_created_at_id ON bookings(created_at DESC, id DESC);
+CREATE INDEX idx_bookings_user_created_at_id ON bookings(user_id, created_at DESC, id DESC);
+CREATE INDEX idx_bookings_status_created_at_id ON bookings(status, created_at DESC, id DESC);
+CREATE INDEX idx_bookings_payment_status_created_at_id ON bookings(payment_status, created_at DESC, id DESC);
+CREATE INDEX idx_bookings_tariff_created_at_id ON bookings(tariff_id, created_at DESC, id DESC);
+CREATE INDEX idx_bookings_travel_date_created_at_id ON bookings(travel_date, created_at DESC, id DESC);
+CREATE INDEX idx_bookings_search_text_trgm ON bookings USING GIN (search_text gin_trgm_ops);
+CREATE INDEX idx_bookings_phone_digits_trgm ON bookings USING GIN (guest_phone_digits gin_trgm_ops);
+CREATE INDEX idx_bookings_search_vector ON bookings USING GIN (search_vector);
+
+CREATE TRIGGER trg_bookings_daily_stats
+AFTER INSERT OR UPDATE OR DELETE ON bookings
+FOR EACH ROW EXECUTE FUNCTION apply_booking_daily_stats();
+
+CREATE TRIGGER trg_bookings_capacity_usage
+AFTER INSERT OR UPDATE OR DELETE ON bookings
+FOR EACH ROW EXECUTE FUNCTION apply_booking_capacity_usage();
+
+-- Замена внешнего ключа payments.booking_id: платёж ссылается на существующую заявку,
+-- заявку с платежами нельзя удалить. Проверки на уровне оператора по таблицам переходов — один запрос
+-- на всю пачку строк. Отсоединение секции в архив строки не удаляет и триггеры не вызывает.
+CREATE OR REPLACE FUNCTION check_payment_bookings() RETURNS TRIGGER AS $$
+DECLARE
+    missing_id INTEGER;
+BEGIN
+    EXECUTE format(
+        'SELECT n.booking_id FROM new_payments n
+         WHERE n.booking_id IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM %I.bookings b WHERE b.id = n.booking_id)
+         LIMIT 1',
+        TG_TABLE_SCHEMA
+    ) INTO missing_id;
+
+    IF missing_id IS NOT NULL THEN
+        RAISE EXCEPTION 'booking % referenced by payment does not exist', missing_id
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_payments_booking_exists_insert
+AFTER INSERT ON payments
+REFERENCING NEW TABLE AS new_payments
+FOR EACH STATEMENT EXECUTE FUNCTION check_payment_bookings();
+
+CREATE TRIGGER trg_payments_booking_exists_update
+AFTER UPDATE ON payments
+REFERENCING NEW TABLE AS new_payments
+FOR EACH STATEMENT EXECUTE FUNCTION check_payment_bookings();
+
+CREATE OR REPLACE FUNCTION restrict_bookings_with_payments() RETURNS TRIGGER AS $$
+DECLARE
+    referenced_id INTEGER;
+BEGIN
+    EXECUTE format(
+        'SELECT o.id FROM old_bookings o
+         WHERE EXISTS (SELECT 1 FROM %I.payments p WHERE p.booking_id = o.id)
+         LIMIT 1',
+        TG_TABLE_SCHEMA
+    ) INTO referenced_id;
+
+    IF referenced_id IS NOT NULL THEN
+        RAISE EXCEPTION 'booking % still has payments', referenced_id
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_bookings_restrict_payments
+AFTER DELETE ON bookings
+REFERENCING OLD TABLE AS old_bookings
+FOR EACH STATEMENT EXECUTE FUNCTION restrict_bookings_with_payments();
@@ -0,0 +1,42 @@
+-- Проверка payments.booking_id при UPDATE только для строк, где booking_id изменился, — как у внешнего ключа.
+-- Иначе смена статуса платежа (возврат, сверка) по заявке из архивной секции падала: заявки уже нет в bookings.
+-- Новый платёж на архивную заявку по-прежнему отклоняется.
+
+CREATE OR REPLACE FUNCTION check_payment_bookings() RETURNS TRIGGER AS $$
+DECLARE
+    missing_id INTEGER;
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        EXECUTE format(
+            'SELECT n.booking_id FROM new_payments n
+             WHERE n.booking_id IS NOT NULL
+               AND NOT EXISTS (SELECT 1 FROM old_payments o WHERE o.id = n.id AND o.booking_id = n.booking_id)
+               AND NOT EXISTS (SELECT 1 FROM %I.bookings b WHERE b.id = n.booking_id)
+             LIMIT 1',
+            TG_TABLE_SCHEMA
+        ) INTO missing_id;
+    ELSE
+        EXECUTE format(
+            'SELECT n.booking_id FROM new_payments n
+             WHERE n.booking_id IS NOT NULL
+               AND NOT EXISTS (SELECT 1 FROM %I.bookings b WHERE b.id = n.booking_id)
+             LIMIT 1',
+            TG_TABLE_SCHEMA
+        ) INTO missing_id;
+    END IF;
+
+    IF missing_id IS NOT NULL THEN
+        RAISE EXCEPTION 'booking % referenced by payment does not exist', missing_id
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER trg_payments_booking_exists_update ON payments;
+
+CREATE TRIGGER trg_payments_booking_exists_update
+AFTER UPDATE ON payments
+REFERENCING OLD TABLE AS old_payments NEW TABLE AS new_payments
+FOR EACH STATEMENT EXECUTE FUNCTION check_payment_bookings();
@@ -0,0 +1,83 @@
+-- Занятость автопарка по всем часам поездки с учётом числа машин
+-- Раньше заявка занимала только час начала и одну машину, а проверка при бронировании (availability.has_capacity)
+-- требует места на все часы поездки и на все машины — длинные и многомашинные поездки пересекались с новыми.
+-- Длительность поездки сохраняется в заявке при создании (из маршрута, как в расчёте цены); для заявок без неё
+-- берётся 120 минут, как DISPATCH_DEFAULT_DURATION по умолчанию.
+
+ALTER TABLE bookings ADD COLUMN duration_minutes INTEGER;
+
+-- Машин на заявку: как PricingEngine.quote
+CREATE OR REPLACE FUNCTION booking_vehicles(passengers INTEGER, max_passengers INTEGER) RETURNS INTEGER AS $$
+    SELECT CASE
+        WHEN max_passengers > 0 THEN CEIL(GREATEST(COALESCE(passengers, 1), 1)::NUMERIC / max_passengers)::INTEGER
+        ELSE 1
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Начала часов, которые задевает поездка [начало, начало + длительность): как availability.trip_hours
+CREATE OR REPLACE FUNCTION booking_trip_hours(travel_date DATE, travel_time TIME, duration_minutes INTEGER)
+RETURNS SETOF TIMESTAMP AS $$
+    SELECT generate_series(
+        date_trunc('hour', travel_date + travel_time),
+        travel_date + travel_time + COALESCE(NULLIF(duration_minutes, 0), 120) * INTERVAL '1 minute' - INTERVAL '1 microsecond',
+        INTERVAL '1 hour'
+    )
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Будущие поездки: длительность по маршруту, чтобы пересчёт ниже учёл уже принятые длинные заявки
+UPDATE bookings b
+SET duration_minutes = r.duration_minutes
+FROM routes r
+WHERE b.travel_date >= CURRENT_DATE
+  AND b.duration_minutes IS NULL
+  AND ((LOWER(TRIM(r.from_location)) = LOWER(TRIM(b.from_location)) AND LOWER(TRIM(r.to_location)) = LOWER(TRIM(b.to_location)))
+    OR (LOWER(TRIM(r.from_location)) = LOWER(TRIM(b.to_location)) AND LOWER(TRIM(r.to_location)) = LOWER(TRIM(b.from_location))));
+
+CREATE OR REPLACE FUNCTION apply_booking_capacity_usage() RETURNS TRIGGER AS $$
+DECLARE
+    upsert_sql TEXT := format(
+        'INSERT INTO %I.booking_capacity_usage (day, category, hour, trips, passengers)
+         SELECT h::DATE, t.category, EXTRACT(HOUR FROM h)::SMALLINT,
+                $4 * %I.booking_vehicles($5, t.max_passengers), $4 * $5
+         FROM %I.tariffs t
+         CROSS JOIN %I.booking_trip_hours($1, $2, $3) h
+         WHERE t.id = $6
+         ON CONFLICT (day, category, hour) DO UPDATE
+         SET trips = booking_capacity_usage.trips + EXCLUDED.trips,
+             passengers = booking_capacity_usage.passengers + EXCLUDED.passengers',
+        TG_TABLE_SCHEMA, TG_TABLE_SCHEMA, TG_TABLE_SCHEMA, TG_TABLE_SCHEMA
+    );
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.travel_date = NEW.travel_date
+       AND OLD.travel_time = NEW.travel_time
+       AND OLD.duration_minutes IS NOT DISTINCT FROM NEW.duration_minutes
+       AND OLD.passengers = NEW.passengers
+       AND OLD.tariff_id IS NOT DISTINCT FROM NEW.tariff_id
+       AND (OLD.status = 'cancelled') = (NEW.status = 'cancelled') THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status IS DISTINCT FROM 'cancelled' THEN
+        EXECUTE upsert_sql USING OLD.travel_date, OLD.travel_time, OLD.duration_minutes, -1, OLD.passengers, OLD.tariff_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IS DISTINCT FROM 'cancelled' THEN
+        EXECUTE upsert_sql USING NEW.travel_date, NEW.travel_time, NEW.duration_minutes, 1, NEW.passengers, NEW.tariff_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Пересчёт с нуля вместо заполнения из V0007 (там — один час и одна машина на заявку)
+TRUNCATE booking_capacity_usage;
+
+INSERT INTO booking_capacity_usage (day, category, hour, trips, passengers)
+SELECT h::DATE, t.category, EXTRACT(HOUR FROM h)::SMALLINT,
+       SUM(booking_vehicles(b.passengers, t.max_passengers)), SUM(b.passengers)
+FROM bookings b
+JOIN tariffs t ON b.tariff_id = t.id
+CROSS JOIN LATERAL booking_trip_hours(b.travel_date, b.travel_time, b.duration_minutes) h
+WHERE b.status <> 'cancelled'
+GROUP BY h::DATE, t.category, EXTRACT(HOUR FROM h);
@@ -0,0 +1,59 @@
+-- Дневные агрегаты без горячей строки (day, status)
+-- Построчный триггер из V0005 обновлял одну и ту же строку на каждую заявку, и параллельные бронирования
+-- ждали друг друга до commit. Теперь агрегат разбит на шарды по соединению, а триггеры — на уровне
+-- оператора: изменения из переходных таблиц сворачиваются в одну строку на (day, status).
+-- Чтение не меняется: статистика и так суммирует строки по day/status.
+
+ALTER TABLE booking_daily_stats ADD COLUMN shard SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE booking_daily_stats DROP CONSTRAINT booking_daily_stats_pkey;
+ALTER TABLE booking_daily_stats ADD PRIMARY KEY (day, status, shard);
+
+CREATE OR REPLACE FUNCTION apply_booking_daily_stats() RETURNS TRIGGER AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changes := 'SELECT created_at, status, 1 AS sign, total_price FROM new_bookings';
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := 'SELECT created_at, status, -1 AS sign, total_price FROM old_bookings';
+    ELSE
+        changes := 'SELECT created_at, status, 1 AS sign, total_price FROM new_bookings
+                    UNION ALL
+                    SELECT created_at, status, -1 AS sign, total_price FROM old_bookings';
+    END IF;
+
+    -- Ключи по порядку, чтобы параллельные операторы не взаимоблокировались
+    EXECUTE format(
+        'INSERT INTO %I.booking_daily_stats (day, status, shard, bookings_count, revenue)
+         SELECT DATE(c.created_at), c.status, pg_backend_pid() %% 8,
+                SUM(c.sign), SUM(c.sign * COALESCE(c.total_price, 0))
+         FROM (%s) c
+         GROUP BY DATE(c.created_at), c.status
+         HAVING SUM(c.sign) <> 0 OR SUM(c.sign * COALESCE(c.total_price, 0)) <> 0
+         ORDER BY 1, 2
+         ON CONFLICT (day, status, shard) DO UPDATE
+         SET bookings_count = booking_daily_stats.bookings_count + EXCLUDED.bookings_count,
+             revenue = booking_daily_stats.revenue + EXCLUDED.revenue',
+        TG_TABLE_SCHEMA, changes
+    );
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER trg_bookings_daily_stats ON bookings;
+
+CREATE TRIGGER trg_bookings_daily_stats_insert
+AFTER INSERT ON bookings
+REFERENCING NEW TABLE AS new_bookings
+FOR EACH STATEMENT EXECUTE FUNCTION apply_booking_daily_stats();
+
+CREATE TRIGGER trg_bookings_daily_stats_update
+AFTER UPDATE ON bookings
+REFERENCING OLD TABLE AS old_bookings NEW TABLE AS new_bookings
+FOR EACH STATEMENT EXECUTE FUNCTION apply_booking_daily_stats();
+
+CREATE TRIGGER trg_bookings_daily_stats_delete
+AFTER DELETE ON bookings
+REFERENCING OLD TABLE AS old_bookings
+FOR EACH STATEMENT EXECUTE FUNCTION apply_booking_daily_stats();
@@ -0,0 +1,8 @@
+-- Поиск заявок по телефону клиента: у зарегистрированного пользователя это users.phone, у гостя — guest_phone,
+-- как в карточке поиска и выгрузке. phone_digits — телефон пользователя только цифрами, как guest_phone_digits (V0008).
+
+ALTER TABLE users
+    ADD COLUMN phone_digits VARCHAR(50)
+        GENERATED ALWAYS AS (regexp_replace(COALESCE(phone, ''), '\D', '', 'g')) STORED;
+
+CREATE INDEX idx_users_phone_digits_trgm ON users USING GIN (phone_digits gin_trgm_ops);
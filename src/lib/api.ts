@@ -36,6 +36,40 @@ export interface Booking {
   phone?: string;
 }
 
+export interface Quote {
+  tariff_id: number;
+  tariff_name: string;
+  category: string;
+  route_id: number | null;
+  distance_km: number | null;
+  duration_minutes: number | null;
+  passengers: number;
+  vehicles: number;
+  price_per_vehicle: number;
+  total_price: number;
+}
+
+export interface BookingListParams {
+  cursor?: string;
+  limit?: number;
+  status?: string;
+  payment_status?: string;
+  tariff_id?: number;
+  date_from?: string;
+  date_to?: string;
+}
+
+export interface BookingListResponse {
+  bookings: Booking[];
+  next_cursor: string | null;
+}
+
+export interface BookingSearchResponse {
+  query: string;
+  bookings: (Booking & { rank: number; customer_name?: string; customer_phone?: string; customer_email?: string })[];
+  next_offset: number | null;
+}
+
 class ApiClient {
   private getHeaders(includeAuth = false): HeadersInit {
     const headers: HeadersInit = {
@@ -124,10 +158,13 @@ class ApiClient {
     tariff_id: number;
     payment_method: string;
     notes?: string;
-  }): Promise<any> {
+  }, idempotencyKey: string = crypto.randomUUID()): Promise<any> {
     const response = await fetch(API_URLS.bookings, {
       method: 'POST',
-      headers: this.getHeaders(true),
+      headers: {
+        ...this.getHeaders(true),
+        'Idempotency-Key': idempotencyKey
+      },
       body: JSON.stringify(data)
     });
 
@@ -139,8 +176,45 @@ class ApiClient {
     return response.json();
   }
 
-  async getBookings(): Promise<{ bookings: Booking[] }> {
-    const response = await fetch(API_URLS.bookings, {
+  async getQuote(params: {
+    from: string;
+    to: string;
+    passengers: number;
+    tariff_id?: number;
+  }): Promise<Quote | { quotes: Quote[] }> {
+    const query = new URLSearchParams({
+      action: 'quote',
+      from: params.from,
+      to: params.to,
+      passengers: String(params.passengers)
+    });
+    if (params.tariff_id) {
+      query.set('tariff_id', String(params.tariff_id));
+    }
+
+    const response = await fetch(`${API_URLS.bookings}?${query.toString()}`, {
+      method: 'GET',
+      headers: this.getHeaders()
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.error || 'Failed to fetch quote');
+    }
+
+    return response.json();
+  }
+
+  async getBookings(params: BookingListParams = {}): Promise<BookingListResponse> {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== '') {
+        query.set(key, String(value));
+      }
+    });
+    const queryString = query.toString();
+
+    const response = await fetch(queryString ? `${API_URLS.bookings}?${queryString}` : API_URLS.bookings, {
       method: 'GET',
       headers: this.getHeaders(true)
     });
@@ -187,8 +261,19 @@ class ApiClient {
     return response.json();
   }
 
-  async getAdminStats(): Promise<any> {
-    const response = await fetch(`${API_URLS.admin}?resource=stats`, {
+  async getAdminStats(params: {
+    from?: string;
+    to?: string;
+    granularity?: 'day' | 'week' | 'month';
+  } = {}): Promise<any> {
+    const query = new URLSearchParams({ resource: 'stats' });
+    Object.entries(params).forEach(([key, value]) => {
+      if (value) {
+        query.set(key, value);
+      }
+    });
+
+    const response = await fetch(`${API_URLS.admin}?${query.toString()}`, {
       method: 'GET',
       headers: this.getHeaders(true)
     });
@@ -201,6 +286,27 @@ class ApiClient {
     return response.json();
   }
 
+  async searchBookings(q: string, params: { limit?: number; offset?: number } = {}): Promise<BookingSearchResponse> {
+    const query = new URLSearchParams({ resource: 'bookings', q });
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined) {
+        query.set(key, String(value));
+      }
+    });
+
+    const response = await fetch(`${API_URLS.admin}?${query.toString()}`, {
+      method: 'GET',
+      headers: this.getHeaders(true)
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.error || 'Failed to search bookings');
+    }
+
+    return response.json();
+  }
+
   async getTariffs(): Promise<any> {
     const response = await fetch(`${API_URLS.admin}?resource=tariffs`, {
       method: 'GET',
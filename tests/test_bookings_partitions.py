@@ -0,0 +1,84 @@
+"""Платежи по заявкам из архивной секции bookings
+
+Нужна база с применёнными db_migrations; всё выполняется в одной транзакции и откатывается:
+
+    TEST_DATABASE_URL=postgresql://localhost/transfer_test python -m pytest tests
+"""
+
+import os
+import sys
+from datetime import date
+
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+from psycopg2 import errors
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'admin'))
+
+import partitions
+
+DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+SCHEMA = os.environ.get('MAIN_DB_SCHEMA', 'public')
+MONTH = date(2001, 1, 1)
+
+
+@pytest.fixture
+def cursor():
+    if not DATABASE_URL:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    conn = psycopg2.connect(DATABASE_URL)
+    try:
+        yield conn.cursor()
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def archived_booking_with_payment(cursor) -> tuple:
+    """Заявка с платежом в секции MONTH, затем секция отсоединена в архив"""
+
+    partitions.ensure_range(cursor, SCHEMA, MONTH, MONTH)
+    cursor.execute(f'''
+        INSERT INTO {SCHEMA}.bookings (guest_name, guest_phone, from_location, to_location,
+                                       travel_date, travel_time, passengers, payment_method, created_at)
+        VALUES ('Архив', '+70000000000', 'Аэропорт Сочи', 'Гагра', %s, '10:00', 1, 'full_payment', %s)
+        RETURNING id
+    ''', (MONTH, MONTH.replace(day=15)))
+    booking_id = cursor.fetchone()[0]
+    cursor.execute(f'''
+        INSERT INTO {SCHEMA}.payments (booking_id, amount, payment_method, payment_status, paid_at)
+        VALUES (%s, 1000, 'full_payment', 'succeeded', %s)
+        RETURNING id
+    ''', (booking_id, MONTH.replace(day=15)))
+    payment_id = cursor.fetchone()[0]
+    partitions.archive_partition(cursor, SCHEMA, partitions.partition_name(MONTH))
+    return booking_id, payment_id
+
+
+def test_payment_of_archived_booking_can_be_updated(cursor):
+    _, payment_id = archived_booking_with_payment(cursor)
+
+    cursor.execute(f'''
+        UPDATE {SCHEMA}.payments SET payment_status = 'refunded', updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s
+    ''', (payment_id,))
+
+    assert cursor.rowcount == 1
+
+
+def test_new_payment_for_archived_booking_is_rejected(cursor):
+    booking_id, _ = archived_booking_with_payment(cursor)
+
+    with pytest.raises(errors.ForeignKeyViolation):
+        cursor.execute(f'''
+            INSERT INTO {SCHEMA}.payments (booking_id, amount, payment_method, payment_status)
+            VALUES (%s, 1000, 'full_payment', 'pending')
+        ''', (booking_id,))
+
+
+def test_payment_cannot_be_moved_to_missing_booking(cursor):
+    _, payment_id = archived_booking_with_payment(cursor)
+
+    with pytest.raises(errors.ForeignKeyViolation):
+        cursor.execute(f'UPDATE {SCHEMA}.payments SET booking_id = -1 WHERE id = %s', (payment_id,))
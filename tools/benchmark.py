@@ -0,0 +1,282 @@
+"""Микробенчмарки handler функций на заполненной локальной базе с порогами регрессии
+
+    DATABASE_URL=postgresql://localhost/transfer_bench python tools/benchmark.py --size 100k --json bench.json
+    python tools/benchmark.py --size 100k --save-baseline tools/benchmark_baseline.json
+    python tools/benchmark.py --size 100k --baseline tools/benchmark_baseline.json --tolerance 0.25
+
+handler вызываются в процессе, как в tools/devserver.py, с событиями того же
+вида, что передаёт платформа. Перед замерами база дополняется синтетическими
+заявками до --size через tools/gendata.py. Отслеживаемая метрика — p50; если
+она хуже базовой больше чем на --tolerance, скрипт завершается с кодом 1.
+
+Скрипт пишет в базу (синтетические заявки, временный администратор), поэтому
+запускается только на базе, в имени которой есть bench, test, tmp или scratch,
+или с явным --allow-writes. Администратор создаётся со случайным паролем и
+удаляется вместе с заявками бенчмарка.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import secrets
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+BENCH_ADMIN_EMAIL = 'bench-admin@example.com'
+BENCH_ADMIN_PASSWORD = secrets.token_urlsafe(24)
+BENCH_GUEST_EMAIL = 'bench-guest@example.com'
+DISPOSABLE_DB_NAME = re.compile(r'bench|test|tmp|scratch', re.IGNORECASE)
+
+
+def parse_size(value: str) -> int:
+    return SIZES.get(value.lower()) or int(value)
+
+
+def configure_environment(args) -> None:
+    """Переменные окружения функций до их импорта"""
+
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark')
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    os.environ['AVAILABILITY_ENFORCED'] = '0'
+    os.environ['TRACING_ENABLED'] = '0'
+    os.environ['IDEMPOTENCY_PURGE_PROBABILITY'] = '0'
+
+
+def ensure_dataset(conn, size: int, seed: int) -> int:
+    """Дополняет bookings синтетическими строками до size; возвращает итоговое число"""
+
+    cursor = conn.cursor()
+    cursor.execute('SELECT COUNT(*) FROM bookings')
+    existing = cursor.fetchone()[0]
+    missing = size - existing
+
+    if missing > 0:
+        from gendata import load
+
+        print(f'seeding {missing} bookings...', file=sys.stderr)
+        load(conn, users=0, bookings=missing, seed=seed, anchor=date.today())
+
+    return max(existing, size)
+
+
+def ensure_admin(conn) -> None:
+    import bcrypt
+
+    cursor = conn.cursor()
+    rounds = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+    password_hash = bcrypt.hashpw(BENCH_ADMIN_PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=rounds))
+    cursor.execute('''
+        INSERT INTO users (email, password_hash, full_name, phone, role)
+        VALUES (%s, %s, 'Benchmark', '+70000000000', 'admin')
+        ON CONFLICT (email) DO UPDATE SET password_hash = EXCLUDED.password_hash, role = 'admin'
+    ''', (BENCH_ADMIN_EMAIL, password_hash.decode('utf-8')))
+    conn.commit()
+
+
+def cleanup(conn) -> None:
+    """Заявки бенчмарка, их события и временный администратор"""
+
+    conn.rollback()
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM outbox_events WHERE aggregate_id IN (SELECT id FROM bookings WHERE guest_email = %s)',
+                   (BENCH_GUEST_EMAIL,))
+    cursor.execute('DELETE FROM bookings WHERE guest_email = %s', (BENCH_GUEST_EMAIL,))
+    cursor.execute('DELETE FROM users WHERE email = %s', (BENCH_ADMIN_EMAIL,))
+    conn.commit()
+
+
+def event(method: str, query: dict = None, body: dict = None, token: str = None) -> dict:
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['X-Authorization'] = f'Bearer {token}'
+    return {
+        'httpMethod': method,
+        'queryStringParameters': query or {},
+        'headers': headers,
+        'body': json.dumps(body, ensure_ascii=False) if body is not None else '',
+        'isBase64Encoded': False,
+        'requestContext': {'requestId': 'benchmark', 'identity': {'sourceIp': '127.0.0.1'}}
+    }
+
+
+def call(function, request: dict) -> dict:
+    response = function(request)
+    if response['statusCode'] >= 400:
+        raise RuntimeError(f'{request["httpMethod"]} {request["queryStringParameters"]} -> '
+                           f'{response["statusCode"]}: {response.get("body", "")[:200]}')
+    return response
+
+
+def build_cases(functions: dict) -> dict:
+    """Имя → функция без аргументов, выполняющая один вызов"""
+
+    auth, bookings, admin = functions['auth'], functions['bookings'], functions['admin']
+    login = event('POST', {'action': 'login'}, {'email': BENCH_ADMIN_EMAIL, 'password': BENCH_ADMIN_PASSWORD})
+    token = json.loads(call(auth, login)['body'])['token']
+    rng = random.Random(1)
+
+    def create_booking():
+        travel_date = date.today() + timedelta(days=rng.randint(1, 90))
+        return call(bookings, event('POST', body={
+            'guest_name': 'Бенчмарк',
+            'guest_phone': '+7 (999) 000-00-00',
+            'guest_email': BENCH_GUEST_EMAIL,
+            'from_location': 'Аэропорт Сочи',
+            'to_location': 'Гагра',
+            'travel_date': str(travel_date),
+            'travel_time': '10:00',
+            'passengers': 2,
+            'tariff_id': 1,
+            'payment_method': 'prepay_50'
+        }))
+
+    return {
+        'bookings.list': lambda: call(bookings, event('GET', {'limit': '50'}, token=token)),
+        'bookings.list_filtered': lambda: call(bookings, event('GET', {'limit': '50', 'status': 'confirmed'}, token=token)),
+        'bookings.quote': lambda: call(bookings, event('GET', {'action': 'quote', 'from': 'Аэропорт Сочи', 'to': 'Гагра', 'passengers': '3'})),
+        'bookings.create': create_booking,
+        'admin.stats': lambda: call(admin, event('GET', {'resource': 'stats'}, token=token)),
+        'admin.stats_month': lambda: call(admin, event('GET', {'resource': 'stats', 'granularity': 'month', 'from': str(date.today() - timedelta(days=365))}, token=token)),
+        'auth.login': lambda: call(auth, login),
+        'auth.verify': lambda: call(auth, event('GET', {'action': 'verify'}, token=token)),
+        'serialize.rows': serialization_case()
+    }
+
+
+def serialization_case():
+    """Сериализация 1000 строк заявки через responses.dumps, без базы"""
+
+    from devserver import BACKEND_DIR
+
+    sys.path.insert(0, str(BACKEND_DIR / 'bookings'))
+    try:
+        import responses
+    finally:
+        sys.path.pop(0)
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = [{
+        'id': i, 'from_location': 'Аэропорт Сочи', 'to_location': 'Гагра', 'travel_date': now.date(),
+        'travel_time': now.time(), 'passengers': 2, 'tariff_name': 'Эконом', 'category': 'economy',
+        'total_price': 2000.0, 'status': 'new', 'payment_status': 'pending', 'payment_method': 'prepay_50',
+        'created_at': now, 'user_name': 'Гость', 'user_email': 'guest@example.com', 'phone': '+79990000000'
+    } for i in range(1000)]
+    return lambda: responses.dumps({'bookings': rows})
+
+
+def measure(fn, rounds: int, warmup: int) -> dict:
+    from loadtest import percentile
+
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    samples.sort()
+    return {
+        'rounds': rounds,
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'min_ms': round(samples[0], 3),
+        'ops_per_sec': round(1000 * len(samples) / sum(samples), 1) if sum(samples) else 0
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Регрессии p50 относительно базового прогона того же размера"""
+
+    problems = []
+    for name, current in results['benchmarks'].items():
+        reference = baseline.get('benchmarks', {}).get(name)
+        if not reference:
+            continue
+        limit = reference['p50_ms'] * (1 + tolerance)
+        if current['p50_ms'] > limit:
+            problems.append(f'{name}: p50 {current["p50_ms"]} ms > {limit:.3f} ms '
+                            f'(baseline {reference["p50_ms"]} ms + {tolerance:.0%})')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Handler benchmarks with regression thresholds')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--size', type=parse_size, default='1k', help='1k, 100k, 1m or a number of bookings')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--only', action='append', help='run only these benchmarks (repeatable)')
+    parser.add_argument('--json', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='fail if p50 regresses against this results file')
+    parser.add_argument('--save-baseline', help='write results as the new baseline to this file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p50 slowdown, 0.25 = 25%%')
+    parser.add_argument('--allow-writes', action='store_true',
+                        help='run against a database whose name does not look disposable')
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error('--database-url or DATABASE_URL is required')
+
+    configure_environment(args)
+
+    import psycopg2
+    from devserver import load_functions
+
+    conn = psycopg2.connect(args.database_url)
+    dbname = conn.info.dbname
+    if not args.allow_writes and not DISPOSABLE_DB_NAME.search(dbname):
+        conn.close()
+        parser.error(f'database "{dbname}" does not look disposable (bench, test, tmp, scratch); '
+                     'the benchmark writes to it, pass --allow-writes to run anyway')
+
+    try:
+        bookings_count = ensure_dataset(conn, args.size, args.seed)
+        ensure_admin(conn)
+
+        cases = build_cases(load_functions())
+        selected = {name: fn for name, fn in cases.items() if not args.only or name in args.only}
+
+        results = {
+            'size': bookings_count,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'benchmarks': {}
+        }
+        for name, fn in selected.items():
+            rounds = max(args.rounds // 5, 5) if name == 'auth.login' else args.rounds
+            results['benchmarks'][name] = measure(fn, rounds, args.warmup)
+            item = results['benchmarks'][name]
+            print(f'{name:24} p50 {item["p50_ms"]:>9.3f} ms   p95 {item["p95_ms"]:>9.3f} ms   '
+                  f'{item["ops_per_sec"]:>9} ops/s')
+    finally:
+        cleanup(conn)
+        conn.close()
+
+    for path in filter(None, [args.json, args.save_baseline]):
+        with open(path, 'w') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('size') != results['size']:
+            print(f'warning: baseline size {baseline.get("size")} differs from {results["size"]}', file=sys.stderr)
+        problems = compare(results, baseline, args.tolerance)
+        for problem in problems:
+            print(f'REGRESSION {problem}')
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Локальный HTTP-сервер для облачных функций из backend/
+
+Каждый запрос превращается в event того же вида, что передаёт платформа
+(httpMethod, queryStringParameters, headers, body), и отдаётся в handler
+нужной функции: /auth, /bookings, /admin.
+
+Процесс сервера ведёт себя как один тёплый контейнер: вызовы handler
+выполняются по одному. Для параллельной нагрузки — несколько процессов
+на одном сокете (--processes).
+
+    DATABASE_URL=postgresql://localhost/transfer JWT_SECRET_KEY=dev \\
+        python tools/devserver.py --port 8000 --processes 4
+"""
+
+import argparse
+import base64
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from http import HTTPStatus
+from pathlib import Path
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+
+_import_lock = threading.RLock()
+
+
+class FunctionRunner:
+    """handler одной функции со своим набором модулей
+
+    У функций одинаковые имена модулей (index, db, tokens...), поэтому на время
+    вызова модули функции подставляются в sys.modules, а её каталог — в sys.path.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.path = BACKEND_DIR / name
+        self.local_names = {p.stem for p in self.path.glob('*.py')}
+        self.modules = {}
+        self.handler = self._activate(lambda: importlib.import_module('index').handler)
+
+    def __call__(self, event: dict) -> dict:
+        return self._activate(lambda: self.handler(event, None))
+
+    def _activate(self, fn):
+        with _import_lock:
+            saved = {n: sys.modules.pop(n) for n in self.local_names if n in sys.modules}
+            sys.modules.update(self.modules)
+            sys.path.insert(0, str(self.path))
+            try:
+                return fn()
+            finally:
+                sys.path.remove(str(self.path))
+                for n in self.local_names:
+                    if n in sys.modules:
+                        self.modules[n] = sys.modules.pop(n)
+                sys.modules.update(saved)
+
+
+def load_functions() -> dict:
+    return {
+        path.name: FunctionRunner(path.name)
+        for path in sorted(BACKEND_DIR.iterdir())
+        if (path / 'index.py').exists()
+    }
+
+
+def build_event(environ: dict, function_path: str) -> dict:
+    """WSGI environ → event облачной функции"""
+
+    query = parse_qs(environ.get('QUERY_STRING', ''), keep_blank_values=True)
+    headers = {}
+    for key, value in environ.items():
+        if key.startswith('HTTP_'):
+            headers['-'.join(part.capitalize() for part in key[5:].split('_'))] = value
+    if environ.get('CONTENT_TYPE'):
+        headers['Content-Type'] = environ['CONTENT_TYPE']
+
+    length = int(environ.get('CONTENT_LENGTH') or 0)
+    body = environ['wsgi.input'].read(length).decode('utf-8') if length else ''
+
+    return {
+        'httpMethod': environ['REQUEST_METHOD'],
+        'path': function_path or '/',
+        'queryStringParameters': {k: v[0] for k, v in query.items()},
+        'headers': headers,
+        'body': body,
+        'isBase64Encoded': False,
+        'requestContext': {
+            'requestId': uuid.uuid4().hex,
+            'identity': {'sourceIp': environ.get('REMOTE_ADDR', '127.0.0.1')}
+        }
+    }
+
+
+def make_app(functions: dict):
+    def app(environ, start_response):
+        path = environ.get('PATH_INFO', '/').strip('/')
+        name, _, rest = path.partition('/')
+        runner = functions.get(name)
+
+        if not runner:
+            start_response('404 Not Found', [('Content-Type', 'application/json')])
+            return [json.dumps({'error': f'Unknown function, expected one of: {", ".join(functions)}'}).encode()]
+
+        started = time.perf_counter()
+        response = runner(build_event(environ, '/' + rest))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        body = response.get('body') or ''
+        if response.get('isBase64Encoded'):
+            payload = base64.b64decode(body)
+        else:
+            payload = body.encode('utf-8')
+
+        headers = [(k, str(v)) for k, v in (response.get('headers') or {}).items()]
+        headers.append(('X-Handler-Time-Ms', f'{elapsed_ms:.2f}'))
+        status = response.get('statusCode', 200)
+        start_response(f'{status} {_reason(status)}', headers)
+        return [payload]
+
+    return app
+
+
+def _reason(status: int) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return 'Unknown'
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, code='-', size='-'):
+        if not self.server.quiet:
+            super().log_request(code, size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local runner for backend cloud functions')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--processes', type=int, default=1, help='worker processes sharing the socket')
+    parser.add_argument('--quiet', action='store_true', help='do not log every request')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, None, server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+    server.quiet = args.quiet
+
+    for _ in range(args.processes - 1):
+        if os.fork() == 0:
+            break
+
+    functions = load_functions()
+    server.set_app(make_app(functions))
+    print(f'[{os.getpid()}] Serving {", ".join("/" + n for n in functions)} on http://{args.host}:{args.port}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
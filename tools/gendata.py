@@ -0,0 +1,489 @@
+"""Генератор синтетических пользователей, заявок и платежей для больших наборов данных
+
+    DATABASE_URL=postgresql://localhost/transfer python tools/gendata.py --users 50k --bookings 2m --seed 42
+    python tools/gendata.py --bookings 500k --seed 7 --anchor 2026-06-01
+
+Строки пишутся через COPY FROM STDIN пачками по --chunk. Даты поездок
+распределены по сезону с пиком в июле–августе, маршруты и тарифы берутся из
+routes и tariffs с весами популярности, статусы заявок и платежей согласованы
+между собой (как их оставили бы handler bookings и payments). При одинаковых
+--seed, --anchor и справочниках результат одинаковый.
+
+На время загрузки пользовательские триггеры bookings и payments отключаются,
+агрегаты booking_daily_stats и booking_capacity_usage пересчитываются по
+загруженным строкам одним запросом. Если bookings секционирована, недостающие
+месячные секции создаются заранее. Всё выполняется в одной транзакции.
+"""
+
+import argparse
+import io
+import math
+import os
+import random
+import sys
+import time
+from bisect import bisect
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+CENTS = Decimal('0.01')
+
+FIRST_NAMES = ['Александр', 'Мария', 'Дмитрий', 'Анна', 'Сергей', 'Елена', 'Андрей', 'Ольга', 'Алексей',
+               'Наталья', 'Иван', 'Татьяна', 'Михаил', 'Ирина', 'Никита', 'Екатерина', 'Павел', 'Светлана',
+               'Артём', 'Юлия', 'Максим', 'Ксения', 'Владимир', 'Анастасия']
+LAST_NAMES = ['Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов',
+              'Новиков', 'Фёдоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семёнов', 'Егоров',
+              'Павлов', 'Козлов', 'Степанов', 'Николаев']
+EMAIL_DOMAINS = ['example.com', 'example.org', 'example.net']
+
+# Веса для rng.choices: значение → относительная частота
+PASSENGERS = {1: 20, 2: 35, 3: 18, 4: 15, 5: 6, 6: 4, 7: 2}
+PAYMENT_METHODS = {'prepay_50': 50, 'full_payment': 20, 'cash': 30}
+TARIFF_CATEGORIES = {'economy': 60, 'comfort': 30, 'vip': 10}
+# Часы подачи тянутся за прилётами в Адлер: утренняя и вечерняя волна
+TRAVEL_HOURS = {5: 2, 6: 4, 7: 6, 8: 8, 9: 9, 10: 9, 11: 8, 12: 7, 13: 7, 14: 8, 15: 8, 16: 7,
+                17: 7, 18: 8, 19: 8, 20: 7, 21: 5, 22: 4, 23: 2}
+
+STATUSES_PAST = {'completed': 85, 'cancelled': 12, 'confirmed': 3}
+STATUSES_TODAY = {'in_progress': 30, 'confirmed': 60, 'cancelled': 10}
+STATUSES_FUTURE = {'new': 35, 'confirmed': 55, 'cancelled': 10}
+
+SUMMER_PEAK_DAY = 215  # начало августа
+SUMMER_PEAK_WIDTH = 40
+SUMMER_PEAK_HEIGHT = 6.0
+HOLIDAY_PEAKS = ((1, 8, 1.5), (125, 6, 1.0))  # новогодние и майские праздники: день года, ширина, высота
+
+USER_BOOKING_SHARE = 0.35
+RETURN_TRIP_SHARE = 0.45
+GUEST_EMAIL_SHARE = 0.7
+FAILED_ATTEMPT_SHARE = 0.05
+MEAN_LEAD_DAYS = 12
+MAX_LEAD_DAYS = 120
+
+USER_COLUMNS = ('id', 'email', 'password_hash', 'full_name', 'phone', 'role', 'created_at', 'updated_at')
+BOOKING_COLUMNS = ('id', 'user_id', 'guest_name', 'guest_phone', 'guest_email', 'from_location', 'to_location',
+                   'travel_date', 'travel_time', 'duration_minutes', 'passengers', 'tariff_id', 'total_price',
+                   'payment_method', 'payment_status', 'status', 'created_at', 'updated_at')
+PAYMENT_COLUMNS = ('id', 'booking_id', 'amount', 'payment_method', 'payment_status', 'transaction_id',
+                   'paid_at', 'created_at', 'provider', 'updated_at')
+
+
+def parse_count(value: str) -> int:
+    value = value.lower().replace('_', '')
+    for suffix, factor in (('k', 1_000), ('m', 1_000_000)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * factor)
+    return int(value)
+
+
+def weighted(weights: dict):
+    """Значения и накопленные веса для rng.choices(..., cum_weights=...)"""
+
+    values = list(weights)
+    cumulative = []
+    total = 0
+    for value in values:
+        total += weights[value]
+        cumulative.append(total)
+    return values, cumulative
+
+
+def season_weight(day: date) -> float:
+    """Относительный спрос на поездки в этот день года"""
+
+    day_of_year = day.timetuple().tm_yday
+    weight = 1 + SUMMER_PEAK_HEIGHT * math.exp(-((day_of_year - SUMMER_PEAK_DAY) ** 2) / (2 * SUMMER_PEAK_WIDTH ** 2))
+    for peak, width, height in HOLIDAY_PEAKS:
+        distance = min(abs(day_of_year - peak), 365 - abs(day_of_year - peak))
+        weight += height * math.exp(-(distance ** 2) / (2 * width ** 2))
+    if day.weekday() >= 5:
+        weight *= 1.15
+    return weight
+
+
+def copy_value(value) -> str:
+    if value is None:
+        return '\\N'
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+    return str(value)
+
+
+def copy_rows(cursor, table: str, columns: tuple, rows) -> int:
+    """COPY пачки кортежей в текстовом формате"""
+
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write('\t'.join(map(copy_value, row)))
+        buffer.write('\n')
+        count += 1
+    buffer.seek(0)
+    cursor.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN', buffer)
+    return count
+
+
+def reserve_ids(cursor, table: str, count: int) -> int:
+    """Первый id из зарезервированного в последовательности таблицы диапазона"""
+
+    cursor.execute(f'''
+        SELECT setval(seq, GREATEST(nextval(seq), (SELECT COALESCE(MAX(id), 0) + 1 FROM {table})) + %s - 1) - %s + 1
+        FROM pg_get_serial_sequence(%s, 'id') seq
+    ''', (count, count, table))
+    return cursor.fetchone()[0]
+
+
+def money(value) -> Decimal:
+    return Decimal(value).quantize(CENTS, ROUND_HALF_UP)
+
+
+class Catalog:
+    """Маршруты и тарифы с весами выбора и матрицей цен, как в pricing.PricingEngine"""
+
+    def __init__(self, cursor):
+        cursor.execute('''
+            SELECT id, from_location, to_location, distance_km, base_price, duration_minutes
+            FROM routes
+            WHERE is_active = true
+            ORDER BY id
+        ''')
+        self.routes = cursor.fetchall()
+        cursor.execute('''
+            SELECT id, category, base_price, price_per_km, max_passengers
+            FROM tariffs
+            WHERE is_active = true
+            ORDER BY id
+        ''')
+        self.tariffs = cursor.fetchall()
+
+        if not self.routes or not self.tariffs:
+            raise SystemExit('routes and tariffs must not be empty, apply db_migrations first')
+
+        # Трансферы из аэропорта — основная часть спроса
+        self.route_choice = weighted({route: 4 if 'аэропорт' in route[1].lower() else 1 for route in self.routes})
+        self.tariff_choice = weighted({tariff: TARIFF_CATEGORIES.get(tariff[1], 10) for tariff in self.tariffs})
+        self.prices = {(route[0], tariff[0]): self.vehicle_price(route, tariff)
+                       for route in self.routes for tariff in self.tariffs}
+
+    @staticmethod
+    def vehicle_price(route, tariff) -> Decimal:
+        _, _, _, distance_km, route_base, _ = route
+        _, _, tariff_base, price_per_km, _ = tariff
+        if price_per_km is not None and distance_km is not None:
+            return money(max(Decimal(tariff_base), Decimal(distance_km) * Decimal(price_per_km)))
+        return money(max(Decimal(tariff_base), Decimal(route_base)))
+
+    def total_price(self, route, tariff, passengers: int) -> Decimal:
+        max_passengers = tariff[4]
+        vehicles = math.ceil(passengers / max_passengers) if max_passengers else 1
+        return self.prices[(route[0], tariff[0])] * vehicles
+
+
+class Generator:
+    def __init__(self, catalog: Catalog, seed: int, anchor: date, history_days: int, ahead_days: int):
+        self.catalog = catalog
+        self.seed = seed
+        self.anchor = anchor
+        self.rng = random.Random(seed)
+
+        days = [anchor - timedelta(days=history_days) + timedelta(days=i) for i in range(history_days + ahead_days + 1)]
+        self.day_choice = weighted({day: season_weight(day) for day in days})
+        self.hour_choice = weighted(TRAVEL_HOURS)
+        self.passenger_choice = weighted(PASSENGERS)
+        self.method_choice = weighted(PAYMENT_METHODS)
+        self.status_choice = {
+            'past': weighted(STATUSES_PAST),
+            'today': weighted(STATUSES_TODAY),
+            'future': weighted(STATUSES_FUTURE)
+        }
+        self.history_start = datetime.combine(days[0], datetime.min.time())
+
+    def choose(self, choice):
+        values, cumulative = choice
+        return values[bisect(cumulative, self.rng.random() * cumulative[-1])]
+
+    def person(self, index: int):
+        first = FIRST_NAMES[index % len(FIRST_NAMES)]
+        last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+        if first[-1] in 'ая' and first != 'Никита':
+            last += 'а'
+        return f'{first} {last}'
+
+    def phone(self) -> str:
+        digits = f'{self.rng.randrange(10 ** 9):09d}'
+        return f'+7 (9{digits[:2]}) {digits[2:5]}-{digits[5:7]}-{digits[7:]}'
+
+    def users(self, first_id: int, count: int, password_hash: str):
+        """Пользователи с почтой gen-<seed>-<n>@...; регистрация до начала их поездок"""
+
+        span = (datetime.combine(self.anchor, datetime.min.time()) - self.history_start).total_seconds()
+        for n in range(count):
+            created_at = self.history_start + timedelta(seconds=int(self.rng.random() * span))
+            yield (first_id + n, f'gen-{self.seed}-{n}@{EMAIL_DOMAINS[n % len(EMAIL_DOMAINS)]}', password_hash,
+                   self.person(n), self.phone(), 'client', created_at, created_at)
+
+    def booking(self, booking_id: int, user_ids: range, user_count: int):
+        """Заявка и её платежи без id: (строка bookings, [(amount, status, paid_at, created_at), ...])"""
+
+        rng = self.rng
+        catalog = self.catalog
+
+        route = self.choose(catalog.route_choice)
+        from_location, to_location = route[1], route[2]
+        if rng.random() < RETURN_TRIP_SHARE:
+            from_location, to_location = to_location, from_location
+        tariff = self.choose(catalog.tariff_choice)
+        passengers = self.choose(self.passenger_choice)
+        total_price = catalog.total_price(route, tariff, passengers)
+        method = self.choose(self.method_choice)
+
+        travel_date = self.choose(self.day_choice)
+        hour, minute = self.choose(self.hour_choice), rng.choice((0, 15, 30, 45))
+        travel_time = f'{hour:02d}:{minute:02d}:00'
+        lead = min(int(rng.expovariate(1 / MEAN_LEAD_DAYS)), MAX_LEAD_DAYS)
+        created_at = datetime.combine(travel_date - timedelta(days=lead), datetime.min.time()) \
+            + timedelta(seconds=rng.randrange(86400))
+        anchor_start = datetime.combine(self.anchor, datetime.min.time())
+        if created_at >= anchor_start:
+            created_at = anchor_start - timedelta(seconds=rng.randrange(1, 86400 * 3))
+        created_at = max(created_at, self.history_start)
+
+        if travel_date < self.anchor:
+            status = self.choose(self.status_choice['past'])
+        elif travel_date == self.anchor:
+            status = self.choose(self.status_choice['today'])
+        else:
+            status = self.choose(self.status_choice['future'])
+
+        trip_start = datetime.combine(travel_date, datetime.min.time()) + timedelta(hours=hour, minutes=minute)
+        payments, payment_status = self.payments(method, status, total_price, created_at, trip_start)
+        updated_at = max([created_at] + [p[2] or p[3] for p in payments])
+
+        if user_count and rng.random() < USER_BOOKING_SHARE:
+            index = rng.randrange(user_count)
+            user_id = user_ids[index]
+            guest_name = self.person(index)
+            guest_phone = None
+            guest_email = None
+        else:
+            user_id = None
+            guest_name = self.person(rng.randrange(len(FIRST_NAMES) * len(LAST_NAMES)))
+            guest_phone = self.phone()
+            guest_email = f'guest{booking_id}@{rng.choice(EMAIL_DOMAINS)}' if rng.random() < GUEST_EMAIL_SHARE else ''
+
+        row = (booking_id, user_id, guest_name, guest_phone, guest_email, from_location, to_location,
+               travel_date, travel_time, route[5], passengers, tariff[0], total_price, method, payment_status, status,
+               created_at, updated_at)
+        return row, payments
+
+    def payments(self, method: str, status: str, total_price: Decimal, created_at: datetime, trip_start: datetime):
+        """Платежи заявки и итоговый payment_status по правилам payments.sync_booking_statuses"""
+
+        rng = self.rng
+
+        if method == 'cash':
+            return [], 'paid' if status == 'completed' else 'pending'
+
+        first_amount = money(total_price / 2) if method == 'prepay_50' else total_price
+        paid_at = created_at + timedelta(minutes=rng.randint(1, 60))
+        payments = []
+
+        if rng.random() < FAILED_ATTEMPT_SHARE:
+            payments.append((first_amount, 'canceled', None, created_at))
+
+        if status == 'new':
+            if rng.random() < 0.6:
+                payments.append((first_amount, 'pending', None, created_at))
+            return payments, 'pending'
+
+        if status == 'cancelled':
+            if rng.random() < 0.5:
+                payments.append((first_amount, 'refunded', paid_at, created_at))
+                return payments, 'refunded'
+            if rng.random() < 0.5:
+                payments.append((first_amount, 'canceled', None, created_at))
+            return payments, 'pending'
+
+        payments.append((first_amount, 'succeeded', paid_at, created_at))
+        if method == 'full_payment':
+            return payments, 'paid'
+
+        if status == 'completed':
+            payments.append((total_price - first_amount, 'succeeded', trip_start, trip_start))
+            return payments, 'paid'
+        return payments, 'partial'
+
+
+def rebuild_rollups(cursor, first_id: int, last_id: int) -> None:
+    """Добавляет загруженные заявки в агрегаты вместо построчных триггеров"""
+
+    cursor.execute('''
+        INSERT INTO booking_daily_stats (day, status, bookings_count, revenue)
+        SELECT DATE(created_at), status, COUNT(*), COALESCE(SUM(total_price), 0)
+        FROM bookings
+        WHERE id BETWEEN %s AND %s
+        GROUP BY DATE(created_at), status
+        ON CONFLICT (day, status, shard) DO UPDATE
+        SET bookings_count = booking_daily_stats.bookings_count + EXCLUDED.bookings_count,
+            revenue = booking_daily_stats.revenue + EXCLUDED.revenue
+    ''', (first_id, last_id))
+    # каждый час поездки с числом машин — как триггер apply_booking_capacity_usage (V0014)
+    cursor.execute('''
+        INSERT INTO booking_capacity_usage (day, category, hour, trips, passengers)
+        SELECT h::DATE, t.category, EXTRACT(HOUR FROM h)::SMALLINT,
+               SUM(booking_vehicles(b.passengers, t.max_passengers)), SUM(b.passengers)
+        FROM bookings b
+        JOIN tariffs t ON b.tariff_id = t.id
+        CROSS JOIN LATERAL booking_trip_hours(b.travel_date, b.travel_time, b.duration_minutes) h
+        WHERE b.id BETWEEN %s AND %s AND b.status <> 'cancelled'
+        GROUP BY h::DATE, t.category, EXTRACT(HOUR FROM h)
+        ON CONFLICT (day, category, hour) DO UPDATE
+        SET trips = booking_capacity_usage.trips + EXCLUDED.trips,
+            passengers = booking_capacity_usage.passengers + EXCLUDED.passengers
+    ''', (first_id, last_id))
+
+
+def user_triggers(cursor) -> list:
+    """Пользовательские триггеры bookings и payments: (таблица, имя)"""
+
+    cursor.execute('''
+        SELECT tgrelid::regclass::text, tgname FROM pg_trigger
+        WHERE tgrelid IN ('bookings'::regclass, 'payments'::regclass) AND NOT tgisinternal AND tgparentid = 0
+        ORDER BY 1, 2
+    ''')
+    return cursor.fetchall()
+
+
+def prepare_partitions(cursor, first_day: date, last_day: date) -> list:
+    """Месячные секции под created_at загружаемых заявок, если bookings секционирована (V0012)"""
+
+    from devserver import BACKEND_DIR
+
+    sys.path.insert(0, str(BACKEND_DIR / 'admin'))
+    try:
+        import partitions
+    finally:
+        sys.path.pop(0)
+
+    cursor.execute('SELECT current_schema()')
+    schema = cursor.fetchone()[0]
+    if not partitions.is_partitioned(cursor, schema):
+        return []
+    return partitions.ensure_range(cursor, schema, first_day, last_day)
+
+
+def hash_password(password: str) -> str:
+    import bcrypt
+
+    rounds = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def load(conn, users: int, bookings: int, seed: int, anchor: date, history_days: int = 730, ahead_days: int = 120,
+         chunk: int = 50_000, password: str = 'password123', keep_triggers: bool = False) -> dict:
+    """Загрузка в одной транзакции; возвращает число строк по таблицам и время"""
+
+    cursor = conn.cursor()
+    generator = Generator(Catalog(cursor), seed, anchor, history_days, ahead_days)
+
+    cursor.execute('SELECT 1 FROM users WHERE email LIKE %s LIMIT 1', (f'gen-{seed}-%',))
+    if users and cursor.fetchone():
+        raise SystemExit(f'users for seed {seed} are already loaded, pick another --seed')
+
+    counts = {'users': 0, 'bookings': 0, 'payments': 0}
+    started = time.perf_counter()
+
+    user_ids = range(0)
+    if users:
+        first_user = reserve_ids(cursor, 'users', users)
+        user_ids = range(first_user, first_user + users)
+        counts['users'] = copy_rows(cursor, 'users', USER_COLUMNS,
+                                    generator.users(first_user, users, hash_password(password)))
+        print(f'users: {counts["users"]} in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+    if bookings:
+        prepare_partitions(cursor, generator.history_start.date(), anchor)
+
+    triggers = [] if keep_triggers else user_triggers(cursor)
+    for table, name in triggers:
+        cursor.execute(f'ALTER TABLE {table} DISABLE TRIGGER {name}')
+
+    first_booking = reserve_ids(cursor, 'bookings', bookings) if bookings else 0
+    # id платежей заранее неизвестно сколько: резервируем с запасом и возвращаем последовательность назад
+    next_payment = reserve_ids(cursor, 'payments', bookings * 3) if bookings else 0
+    payment_start = next_payment
+
+    for offset in range(0, bookings, chunk):
+        size = min(chunk, bookings - offset)
+        booking_rows = []
+        payment_rows = []
+        for booking_id in range(first_booking + offset, first_booking + offset + size):
+            row, payments = generator.booking(booking_id, user_ids, len(user_ids))
+            booking_rows.append(row)
+            for amount, status, paid_at, created_at in payments:
+                payment_rows.append((next_payment, booking_id, amount, row[12], status,
+                                     f'gen_{seed}_{next_payment}', paid_at, created_at, 'file',
+                                     paid_at or created_at))
+                next_payment += 1
+
+        counts['bookings'] += copy_rows(cursor, 'bookings', BOOKING_COLUMNS, booking_rows)
+        counts['payments'] += copy_rows(cursor, 'payments', PAYMENT_COLUMNS, payment_rows)
+        elapsed = time.perf_counter() - started
+        print(f'bookings: {counts["bookings"]}/{bookings}, payments: {counts["payments"]} '
+              f'in {elapsed:.1f}s', file=sys.stderr)
+
+    if bookings:
+        cursor.execute("SELECT setval(pg_get_serial_sequence('payments', 'id'), %s, false)", (next_payment,))
+        if not keep_triggers:
+            rebuild_rollups(cursor, first_booking, first_booking + bookings - 1)
+
+    for table, name in triggers:
+        cursor.execute(f'ALTER TABLE {table} ENABLE TRIGGER {name}')
+
+    conn.commit()
+
+    for table in ('users', 'bookings', 'payments'):
+        cursor.execute(f'ANALYZE {table}')
+    conn.commit()
+
+    counts['seconds'] = round(time.perf_counter() - started, 1)
+    counts['booking_ids'] = [first_booking, first_booking + bookings - 1] if bookings else None
+    counts['payment_ids'] = [payment_start, next_payment - 1] if counts['payments'] else None
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-load synthetic users, bookings and payments via COPY')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--users', type=parse_count, default=parse_count('10k'), help='e.g. 50k')
+    parser.add_argument('--bookings', type=parse_count, default=parse_count('100k'), help='e.g. 2m')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--anchor', type=date.fromisoformat, default=date.today(),
+                        help='"today" for the dataset, YYYY-MM-DD; fix it for reproducible runs')
+    parser.add_argument('--history-days', type=int, default=730, help='travel dates before the anchor')
+    parser.add_argument('--ahead-days', type=int, default=120, help='travel dates after the anchor')
+    parser.add_argument('--chunk', type=parse_count, default=parse_count('50k'), help='bookings per COPY')
+    parser.add_argument('--password', default='password123', help='password of every generated user')
+    parser.add_argument('--keep-triggers', action='store_true',
+                        help='keep booking and payment triggers on instead of rebuilding rollups at the end')
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error('--database-url or DATABASE_URL is required')
+
+    import psycopg2
+
+    conn = psycopg2.connect(args.database_url)
+    try:
+        counts = load(conn, args.users, args.bookings, args.seed, args.anchor, args.history_days,
+                      args.ahead_days, args.chunk, args.password, args.keep_triggers)
+    finally:
+        conn.close()
+
+    rate = counts['bookings'] / counts['seconds'] if counts['seconds'] else 0
+    print(f'loaded {counts["users"]} users, {counts["bookings"]} bookings, {counts["payments"]} payments '
+          f'in {counts["seconds"]}s ({rate:,.0f} bookings/s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Время холодного импорта функций из backend/ по данным python -X importtime
+
+    python tools/importtime.py
+    python tools/importtime.py --function bookings --repeat 9 --json importtime.json
+
+Для каждой функции с разделением index/app в чистом интерпретаторе
+замеряются две фазы:
+
+    preflight — import index и ответ на OPTIONS, как при первом preflight;
+    full      — import app, то есть всё, что загружается к первому запросу.
+
+Скрипт завершается с кодом 1, если preflight загрузил тяжёлый модуль из
+PREFLIGHT_FORBIDDEN или превысил --preflight-budget-ms (медиана по --repeat).
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+
+PREFLIGHT_FORBIDDEN = ('psycopg2', 'jwt', 'bcrypt', 'orjson', 'brotli')
+
+PHASES = {
+    'preflight': (
+        'import index\n'
+        "index.handler({'httpMethod': 'OPTIONS', 'headers': {}}, None)\n"
+    ),
+    'full': 'import app\n'
+}
+
+REPORT_MODULES = '''
+import json, sys
+print(json.dumps(sorted(sys.modules)))
+'''
+
+
+def parse_importtime(stderr: str) -> list:
+    """Строки «import time: self | cumulative | name» → [(имя, self_us, cumulative_us, глубина)]"""
+
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def measure(function: str, phase: str) -> dict:
+    """Один запуск фазы в отдельном процессе: время импортов и загруженные модули"""
+
+    baseline = _run_python(function, '')
+    result = _run_python(function, PHASES[phase])
+
+    baseline_names = {name for name, *_ in baseline['entries']}
+    fresh = [e for e in result['entries'] if e[0] not in baseline_names]
+
+    return {
+        'total_ms': sum(e[2] for e in fresh if e[3] == 0) / 1000,
+        'modules': result['modules'],
+        'direct': [e for e in fresh if e[3] == 1]
+    }
+
+
+def _run_python(function: str, code: str) -> dict:
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code + REPORT_MODULES],
+        cwd=BACKEND_DIR / function,
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f'{function}: {completed.stderr.strip().splitlines()[-1]}')
+    return {
+        'entries': parse_importtime(completed.stderr),
+        'modules': json.loads(completed.stdout.strip().splitlines()[-1])
+    }
+
+
+def heavy_modules(modules: list) -> list:
+    return sorted({m.split('.')[0] for m in modules if m.split('.')[0] in PREFLIGHT_FORBIDDEN})
+
+
+def run(args) -> dict:
+    report = {}
+
+    for function in args.function:
+        report[function] = {}
+        for phase in PHASES:
+            runs = [measure(function, phase) for _ in range(args.repeat)]
+            slowest = {}
+            for item in runs:
+                for name, _, cumulative_us, _ in item['direct']:
+                    slowest.setdefault(name, []).append(cumulative_us / 1000)
+
+            report[function][phase] = {
+                'median_ms': round(statistics.median(r['total_ms'] for r in runs), 2),
+                'min_ms': round(min(r['total_ms'] for r in runs), 2),
+                'heavy_modules': heavy_modules(runs[0]['modules']),
+                'slowest': [
+                    {'module': name, 'ms': round(statistics.median(times), 2)}
+                    for name, times in sorted(slowest.items(), key=lambda kv: -statistics.median(kv[1]))[:args.top]
+                ]
+            }
+
+    return report
+
+
+def check(report: dict, budget_ms: float) -> list:
+    problems = []
+    for function, phases in report.items():
+        preflight = phases['preflight']
+        if preflight['heavy_modules']:
+            problems.append(f'{function}: preflight imports {", ".join(preflight["heavy_modules"])}')
+        if budget_ms and preflight['median_ms'] > budget_ms:
+            problems.append(f'{function}: preflight takes {preflight["median_ms"]} ms, budget {budget_ms} ms')
+    return problems
+
+
+def print_report(report: dict) -> None:
+    for function, phases in report.items():
+        print(f'\n{function}')
+        for phase, item in phases.items():
+            heavy = ', '.join(item['heavy_modules']) or '-'
+            print(f'  {phase:<10} median {item["median_ms"]:>8.2f} ms   min {item["min_ms"]:>8.2f} ms   heavy: {heavy}')
+            for entry in item['slowest']:
+                print(f'      {entry["ms"]:>8.2f} ms  {entry["module"]}')
+
+
+def main():
+    functions = sorted(p.name for p in BACKEND_DIR.iterdir() if (p / 'app.py').exists())
+
+    parser = argparse.ArgumentParser(description='Cold-start import benchmark for the backend functions')
+    parser.add_argument('--function', action='append', choices=functions, help='repeatable; default: all')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per phase')
+    parser.add_argument('--top', type=int, default=8, help='slowest direct imports of index/app to show')
+    parser.add_argument('--preflight-budget-ms', type=float, default=0, help='fail if the preflight median is slower')
+    parser.add_argument('--json', help='write the report as JSON to this file')
+    args = parser.parse_args()
+    args.function = args.function or functions
+
+    report = run(args)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    problems = check(report, args.preflight_budget_ms)
+    for problem in problems:
+        print(f'FAIL {problem}')
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
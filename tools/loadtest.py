@@ -0,0 +1,216 @@
+"""Нагрузочные сценарии для функций, запущенных через tools/devserver.py
+
+    python tools/loadtest.py --scenario guest_booking_burst --concurrency 16 --duration 30
+    python tools/loadtest.py --scenario all --json results.json
+
+Для каждого эндпоинта печатаются число запросов, ошибки, p50/p95/p99 и RPS.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+
+LOCATIONS = [
+    ('Аэропорт Сочи', 'Гагра'),
+    ('Аэропорт Сочи', 'Пицунда'),
+    ('Аэропорт Сочи', 'Сухум'),
+    ('Гагра', 'Новый Афон'),
+    ('Сухум', 'Гудаута'),
+    ('Пицунда', 'Рица')
+]
+
+
+class Client:
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, body: dict = None, token: str = None) -> tuple:
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if token:
+            request.add_header('X-Authorization', f'Bearer {token}')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, endpoint: str, elapsed_ms: float, ok: bool) -> None:
+        with self._lock:
+            stats = self.samples.setdefault(endpoint, {'latencies': [], 'errors': 0})
+            stats['latencies'].append(elapsed_ms)
+            if not ok:
+                stats['errors'] += 1
+
+    def report(self, wall_seconds: float) -> dict:
+        result = {}
+        for endpoint, stats in sorted(self.samples.items()):
+            latencies = sorted(stats['latencies'])
+            result[endpoint] = {
+                'requests': len(latencies),
+                'errors': stats['errors'],
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'rps': round(len(latencies) / wall_seconds, 2) if wall_seconds else 0
+            }
+        return result
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * pct / 100
+    low = int(k)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (k - low)
+
+
+def timed(recorder: Recorder, endpoint: str, fn, expected=(200, 304)):
+    started = time.perf_counter()
+    status, payload = fn()
+    recorder.record(endpoint, (time.perf_counter() - started) * 1000, status in expected)
+    return status, payload
+
+
+def login(client: Client, email: str, password: str) -> str:
+    status, payload = client.request('POST', '/auth?action=login', {'email': email, 'password': password})
+    if status != 200:
+        raise SystemExit(f'Login as {email} failed with {status}: {payload[:200]!r}')
+    return json.loads(payload)['token']
+
+
+def guest_booking_burst(client: Client, recorder: Recorder, args, rng: random.Random) -> None:
+    from_location, to_location = rng.choice(LOCATIONS)
+    body = {
+        'guest_name': f'Нагрузка {rng.randint(1, 10 ** 6)}',
+        'guest_phone': f'+7 (9{rng.randint(10, 99)}) {rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(10, 99)}',
+        'from_location': from_location,
+        'to_location': to_location,
+        'travel_date': str(date.today() + timedelta(days=rng.randint(1, 90))),
+        'travel_time': f'{rng.randint(6, 22):02d}:{rng.choice(["00", "30"])}',
+        'passengers': rng.randint(1, 6),
+        'tariff_id': rng.randint(1, 3),
+        'payment_method': 'prepay_50'
+    }
+    timed(recorder, 'GET bookings?action=quote', lambda: client.request(
+        'GET', f'/bookings?action=quote&from={urllib.parse.quote(from_location)}&to={urllib.parse.quote(to_location)}&passengers={body["passengers"]}'))
+    timed(recorder, 'POST bookings', lambda: client.request('POST', '/bookings', body))
+
+
+def admin_dashboard(client: Client, recorder: Recorder, args, rng: random.Random) -> None:
+    token = args.admin_token
+    timed(recorder, 'GET admin?resource=stats', lambda: client.request('GET', '/admin?resource=stats', token=token))
+    timed(recorder, 'GET admin?resource=tariffs', lambda: client.request('GET', '/admin?resource=tariffs', token=token))
+    timed(recorder, 'GET admin?resource=vehicles', lambda: client.request('GET', '/admin?resource=vehicles', token=token))
+    timed(recorder, 'GET bookings', lambda: client.request('GET', '/bookings?limit=50', token=token))
+
+
+def login_storm(client: Client, recorder: Recorder, args, rng: random.Random) -> None:
+    if rng.random() < 0.8:
+        timed(recorder, 'POST auth?action=login', lambda: client.request(
+            'POST', '/auth?action=login', {'email': args.admin_email, 'password': args.admin_password}))
+    else:
+        timed(recorder, 'POST auth?action=login (bad)', lambda: client.request(
+            'POST', '/auth?action=login', {'email': f'nobody{rng.randint(1, 10 ** 6)}@example.com', 'password': 'wrong-password'}),
+            expected=(401,))
+
+
+SCENARIOS = {
+    'guest_booking_burst': guest_booking_burst,
+    'admin_dashboard': admin_dashboard,
+    'login_storm': login_storm
+}
+
+
+def run(args) -> dict:
+    client = Client(args.base_url, args.timeout)
+    recorder = Recorder()
+    scenarios = list(SCENARIOS.values()) if args.scenario == 'all' else [SCENARIOS[args.scenario]]
+
+    if admin_dashboard in scenarios:
+        args.admin_token = login(client, args.admin_email, args.admin_password)
+
+    deadline = time.monotonic() + args.duration
+    remaining = [args.requests] if args.requests else None
+    remaining_lock = threading.Lock()
+
+    def worker(worker_id: int) -> None:
+        rng = random.Random(args.seed + worker_id)
+        while time.monotonic() < deadline:
+            if remaining is not None:
+                with remaining_lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+            scenario = scenarios[rng.randrange(len(scenarios))]
+            try:
+                scenario(client, recorder, args, rng)
+            except OSError as e:
+                recorder.record(f'{scenario.__name__} (connection error)', 0.0, False)
+                if args.verbose:
+                    print(f'worker {worker_id}: {e}')
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - started
+
+    return {
+        'scenario': args.scenario,
+        'concurrency': args.concurrency,
+        'wall_seconds': round(wall_seconds, 2),
+        'endpoints': recorder.report(wall_seconds)
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"scenario={report['scenario']} concurrency={report['concurrency']} wall={report['wall_seconds']}s")
+    print(f"{'endpoint':40} {'req':>7} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>8}")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"{endpoint:40} {stats['requests']:>7} {stats['errors']:>5} "
+              f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats['rps']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load generator for the backend functions')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--scenario', choices=[*SCENARIOS, 'all'], default='all')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--requests', type=int, default=0, help='stop after this many scenario iterations')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--admin-email', default='admin@transfer-abkhazia.ru')
+    parser.add_argument('--admin-password', default='admin123')
+    parser.add_argument('--json', help='write the report as JSON to this file')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()